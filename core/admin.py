@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Profile, LinkInteres
+from django.utils import timezone
+from .models import Profile, LinkInteres, Tarea, ProgramacionTarea
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
@@ -12,3 +13,24 @@ class LinkInteresAdmin(admin.ModelAdmin):
     list_editable = ('orden', 'activo')
     search_fields = ('titulo', 'url', 'descripcion')
     list_filter = ('tipo', 'activo')
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nombre', 'estado', 'intentos', 'max_intentos', 'ejecutar_desde', 'iniciada', 'terminada', 'worker')
+    list_filter = ('estado', 'nombre')
+    search_fields = ('nombre', 'clave', 'ultimo_error')
+    readonly_fields = ('creada', 'iniciada', 'terminada', 'worker', 'ultimo_error')
+    date_hierarchy = 'creada'
+    actions = ['reintentar']
+
+    @admin.action(description="Reintentar las tareas seleccionadas")
+    def reintentar(self, request, queryset):
+        n = queryset.exclude(estado=Tarea.EJECUTANDO).update(
+            estado=Tarea.PENDIENTE, intentos=0, ejecutar_desde=timezone.now(), terminada=None,
+        )
+        self.message_user(request, f"{n} tareas vuelven a la cola.")
+
+@admin.register(ProgramacionTarea)
+class ProgramacionTareaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'cada_segundos', 'activa', 'proxima_ejecucion', 'ultima_ejecucion')
+    list_editable = ('cada_segundos', 'activa')
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registra las tareas de la cola declaradas en <app>/tareas.py
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tareas')
@@ -0,0 +1,186 @@
+"""
+Cola de tareas en segundo plano respaldada por la base de datos.
+
+Reemplaza los threading.Thread / Timer que se lanzaban desde las vistas y
+AppConfig.ready (mueren al reciclar un worker de gunicorn, corren una vez
+por worker y no dejan rastro). Las tareas se guardan en core.Tarea y las
+ejecuta `python manage.py run_worker`:
+
+    # <app>/tareas.py (se autodescubren)
+    @tarea('orden_compra.sync_proveedores', cada=3600)
+    def sync_proveedores():
+        ...
+
+    encolar('licitaciones.persistir', clave='lic:2026-01', normalizados=[...])
+
+  - clave: deduplicación; mientras exista una tarea pendiente o en curso con
+    la misma clave, encolar() devuelve esa en vez de crear otra.
+  - reintentos con backoff exponencial + jitter hasta max_intentos.
+  - `cada`: programación periódica (core.ProgramacionTarea), editable desde
+    el admin.
+  - TAREAS_EAGER=True ejecuta en el acto (desarrollo sin worker).
+"""
+import logging
+import os
+import random
+import socket
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger('tareas')
+
+Definicion = namedtuple('Definicion', ['funcion', 'cada', 'max_intentos'])
+
+_registro = {}
+
+
+def tarea(nombre, cada=None, max_intentos=None):
+    """Registra `funcion` como tarea; con `cada` (segundos) además se programa."""
+    def decorador(funcion):
+        _registro[nombre] = Definicion(funcion, cada, max_intentos)
+        return funcion
+    return decorador
+
+
+def registradas():
+    return dict(_registro)
+
+
+def identificador_worker():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def encolar(nombre, clave=None, ejecutar_en=None, max_intentos=None, **kwargs):
+    """
+    Encola la tarea `nombre` con `kwargs` (serializables a JSON). Con
+    TAREAS_EAGER se ejecuta de inmediato y se retorna None; igual que en el
+    worker, si la tarea falla el error se registra y no llega a quien encola.
+    """
+    from .models import Tarea
+
+    if settings.TAREAS_EAGER:
+        try:
+            _registro[nombre].funcion(**kwargs)
+        except Exception:
+            logger.exception("Tarea %s falló (TAREAS_EAGER)", nombre)
+        return None
+
+    if clave:
+        activa = Tarea.objects.activas().filter(clave=clave).first()
+        if activa:
+            return activa
+    definicion = _registro.get(nombre)
+    datos = {
+        'nombre': nombre,
+        'kwargs': kwargs,
+        'clave': clave,
+        'ejecutar_desde': ejecutar_en or timezone.now(),
+        'max_intentos': max_intentos or (definicion and definicion.max_intentos) or settings.TAREAS_MAX_INTENTOS,
+    }
+    try:
+        with transaction.atomic():
+            return Tarea.objects.create(**datos)
+    except IntegrityError:
+        # Otro proceso encoló la misma clave entre la consulta y el insert
+        return Tarea.objects.activas().filter(clave=clave).first()
+
+
+def backoff(intento):
+    base = settings.TAREAS_BACKOFF_BASE * (2 ** max(0, intento - 1))
+    return min(settings.TAREAS_BACKOFF_MAX, base) * random.uniform(0.75, 1.25)
+
+
+def programar_periodicas():
+    """Sincroniza las tareas con `cada` y encola las que corresponden."""
+    from .models import ProgramacionTarea
+
+    ahora = timezone.now()
+    for nombre, definicion in _registro.items():
+        if definicion.cada:
+            ProgramacionTarea.objects.get_or_create(nombre=nombre, defaults={
+                'cada_segundos': definicion.cada, 'proxima_ejecucion': ahora,
+            })
+
+    with transaction.atomic():
+        vencidas = ProgramacionTarea.objects.select_for_update(skip_locked=True).filter(
+            activa=True, proxima_ejecucion__lte=ahora,
+        )
+        for prog in vencidas:
+            if prog.nombre in _registro:
+                encolar(prog.nombre, clave=f'periodica:{prog.nombre}')
+            prog.ultima_ejecucion = ahora
+            prog.proxima_ejecucion = ahora + timedelta(seconds=prog.cada_segundos)
+            prog.save(update_fields=['ultima_ejecucion', 'proxima_ejecucion'])
+
+
+def recuperar_colgadas():
+    """Devuelve a la cola las tareas de workers que murieron a mitad de ejecución."""
+    from .models import Tarea
+
+    limite = timezone.now() - timedelta(seconds=settings.TAREAS_TIMEOUT)
+    colgadas = Tarea.objects.filter(estado=Tarea.EJECUTANDO, iniciada__lt=limite)
+    colgadas.filter(intentos__gte=F('max_intentos')).update(
+        estado=Tarea.FALLIDA, terminada=timezone.now(), ultimo_error='Worker interrumpido.',
+    )
+    return colgadas.update(
+        estado=Tarea.PENDIENTE, worker='', ultimo_error='Worker interrumpido; se reintenta.',
+    )
+
+
+def reclamar(worker):
+    """Toma la siguiente tarea pendiente (o None)."""
+    from .models import Tarea
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        candidata = Tarea.objects.select_for_update(skip_locked=True).filter(
+            estado=Tarea.PENDIENTE, ejecutar_desde__lte=ahora,
+        ).order_by('ejecutar_desde', 'pk').first()
+        if candidata is None:
+            return None
+        # El UPDATE condicional cubre las BD sin SELECT ... FOR UPDATE (SQLite)
+        tomada = Tarea.objects.filter(pk=candidata.pk, estado=Tarea.PENDIENTE).update(
+            estado=Tarea.EJECUTANDO, iniciada=ahora, worker=worker, intentos=candidata.intentos + 1,
+        )
+    if not tomada:
+        return None
+    candidata.refresh_from_db()
+    return candidata
+
+
+def ejecutar(t):
+    """Ejecuta una tarea reclamada y registra el resultado o el reintento."""
+    from .models import Tarea
+
+    definicion = _registro.get(t.nombre)
+    try:
+        if definicion is None:
+            raise LookupError(f"Tarea no registrada: {t.nombre}")
+        definicion.funcion(**t.kwargs)
+    except Exception:
+        error = traceback.format_exc(limit=5)
+        if t.intentos >= t.max_intentos or definicion is None:
+            t.estado = Tarea.FALLIDA
+            t.terminada = timezone.now()
+            logger.error("Tarea %s #%s falló definitivamente: %s", t.nombre, t.pk, error.strip().splitlines()[-1])
+        else:
+            t.estado = Tarea.PENDIENTE
+            t.ejecutar_desde = timezone.now() + timedelta(seconds=backoff(t.intentos))
+            logger.warning("Tarea %s #%s falló (intento %s/%s), reintento a las %s",
+                           t.nombre, t.pk, t.intentos, t.max_intentos, t.ejecutar_desde)
+        t.ultimo_error = error
+        t.save(update_fields=['estado', 'terminada', 'ejecutar_desde', 'ultimo_error'])
+        return False
+    else:
+        t.estado = Tarea.OK
+        t.terminada = timezone.now()
+        t.save(update_fields=['estado', 'terminada'])
+        return True
+    finally:
+        close_old_connections()
@@ -5,6 +5,7 @@ import json
 import os
 from datetime import date
 import django.utils.timezone
+from core.cola import encolar, tarea
 
 # Reuse the counter logic from reservations to maintain the daily limit globally
 # We'll use a shared counter file in the root media or somewhere accessible
@@ -48,34 +49,37 @@ def _log_event(msg):
     except:
         pass
 
-def _safe_email(to_list, subject, html_body):
-    if not to_list or not any(to_list):
-        return
-
+@tarea('core.enviar_correo', max_intentos=4)
+def _enviar_correo(to_list, subject, html_body):
     daily_limit = getattr(settings, 'EMAIL_DAILY_LIMIT', 200)
+    with _counter_lock:
+        current = _get_daily_count()
+    if current >= daily_limit:
+        _log_event(f"[BLOQUEADO] Límite diario ({daily_limit}) alcanzado. No se envió: {subject}")
+        return
 
-    def _send():
-        with _counter_lock:
-            current = _get_daily_count()
-            if current >= daily_limit:
-                _log_event(f"[BLOQUEADO] Límite diario ({daily_limit}) alcanzado. No se envió: {subject}")
-                return
-            new_count = _increment_daily_count()
+    try:
+        send_mail(
+            subject=subject,
+            message='',
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[r for r in to_list if r],
+            html_message=html_body,
+            fail_silently=False,
+        )
+    except Exception as e:
+        _log_event(f"[ERROR] Falló envío a {to_list}: {str(e)}")
+        raise  # la cola lo reintenta con backoff
 
-        try:
-            send_mail(
-                subject=subject,
-                message='',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[r for r in to_list if r],
-                html_message=html_body,
-                fail_silently=False,
-            )
-            _log_event(f"[SUCCESS] Enviado a {to_list} | {subject}")
-        except Exception as e:
-            _log_event(f"[ERROR] Falló envío a {to_list}: {str(e)}")
+    # Solo los envíos exitosos consumen cupo: los reintentos no lo gastan de nuevo
+    with _counter_lock:
+        _increment_daily_count()
+    _log_event(f"[SUCCESS] Enviado a {to_list} | {subject}")
 
-    threading.Thread(target=_send, daemon=True).start()
+def _safe_email(to_list, subject, html_body):
+    if not to_list or not any(to_list):
+        return
+    encolar('core.enviar_correo', to_list=list(to_list), subject=subject, html_body=html_body)
 
 def _base_template(titulo, contenido_html):
     return f"""
@@ -0,0 +1,75 @@
+"""
+Management command: run_worker
+Ejecuta las tareas de la cola en base de datos (core/cola.py): correos,
+persistencia de los visores de Mercado Público y las tareas periódicas
+(sync de proveedores de OC, chequeo de BD, purga de tareas antiguas).
+
+Uso:
+    python manage.py run_worker            # bucle continuo
+    python manage.py run_worker --once     # procesa lo pendiente y termina
+
+Se pueden levantar varios workers: cada tarea la toma uno solo.
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import cola
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano encoladas en la base de datos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesar lo pendiente y terminar.')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Segundos de espera cuando la cola está vacía.')
+
+    def handle(self, *args, **options):
+        self._detener = False
+        signal.signal(signal.SIGTERM, self._senal)
+        signal.signal(signal.SIGINT, self._senal)
+
+        worker = cola.identificador_worker()
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker {worker} iniciado. Tareas registradas: {', '.join(sorted(cola.registradas()))}"
+        ))
+
+        ultimo_mantenimiento = 0.0
+        ok = fallidas = 0
+        while not self._detener:
+            if time.monotonic() - ultimo_mantenimiento > 30:
+                try:
+                    recuperadas = cola.recuperar_colgadas()
+                    if recuperadas:
+                        self.stdout.write(self.style.WARNING(f"{recuperadas} tareas colgadas vuelven a la cola."))
+                    cola.programar_periodicas()
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"Error en mantenimiento de la cola: {e}"))
+                finally:
+                    close_old_connections()
+                ultimo_mantenimiento = time.monotonic()
+
+            t = cola.reclamar(worker)
+            if t is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            inicio = time.monotonic()
+            exito = cola.ejecutar(t)
+            duracion = time.monotonic() - inicio
+            if exito:
+                ok += 1
+                self.stdout.write(f"✓ {t.nombre} #{t.pk} ({duracion:.1f}s)")
+            else:
+                fallidas += 1
+                self.stdout.write(self.style.ERROR(f"✗ {t.nombre} #{t.pk} intento {t.intentos}/{t.max_intentos} ({t.estado})"))
+
+        self.stdout.write(self.style.SUCCESS(f"Worker detenido: {ok} tareas completadas, {fallidas} con error."))
+
+    def _senal(self, signum, frame):
+        # Termina la tarea en curso antes de salir
+        self._detener = True
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
@@ -44,3 +45,70 @@ class LinkInteres(models.Model):
 
     def __str__(self):
         return f"{self.titulo} ({self.tipo})"
+
+
+class TareaQuerySet(models.QuerySet):
+    def activas(self):
+        return self.filter(estado__in=[Tarea.PENDIENTE, Tarea.EJECUTANDO])
+
+
+class Tarea(models.Model):
+    """Tarea en segundo plano de la cola en base de datos (ver core/cola.py)."""
+    PENDIENTE = 'PENDIENTE'
+    EJECUTANDO = 'EJECUTANDO'
+    OK = 'OK'
+    FALLIDA = 'FALLIDA'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EJECUTANDO, 'En ejecución'),
+        (OK, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    nombre = models.CharField(max_length=100, db_index=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    clave = models.CharField(max_length=200, null=True, blank=True,
+                             help_text="Deduplicación: una sola tarea activa por clave")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=5)
+    ejecutar_desde = models.DateTimeField(default=timezone.now)
+    creada = models.DateTimeField(auto_now_add=True)
+    iniciada = models.DateTimeField(null=True, blank=True)
+    terminada = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    ultimo_error = models.TextField(blank=True)
+
+    objects = TareaQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Tarea en segundo plano"
+        verbose_name_plural = "Tareas en segundo plano"
+        ordering = ['-creada']
+        indexes = [models.Index(fields=['estado', 'ejecutar_desde'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave'], condition=models.Q(estado__in=['PENDIENTE', 'EJECUTANDO']),
+                name='tarea_clave_activa_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} #{self.pk} ({self.estado})"
+
+
+class ProgramacionTarea(models.Model):
+    """Ejecución periódica de una tarea registrada con @tarea(..., cada=N)."""
+    nombre = models.CharField(max_length=100, unique=True)
+    cada_segundos = models.PositiveIntegerField()
+    activa = models.BooleanField(default=True)
+    proxima_ejecucion = models.DateTimeField()
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Programación de tarea"
+        verbose_name_plural = "Programaciones de tareas"
+        ordering = ['nombre']
+
+    def __str__(self):
+        return f"{self.nombre} cada {self.cada_segundos}s"
@@ -0,0 +1,249 @@
+"""
+Perfilado de queries por endpoint (opt-in con PERF_PROFILING_ENABLED).
+
+Por cada request resuelta a una vista DRF registra:
+  - cantidad de queries y tiempo total en base de datos,
+  - huellas de SQL repetidas (típico N+1 en serializers),
+  - tiempo y queries dentro de `serializer.data` + render de la respuesta.
+
+Las muestras se agrupan por "Vista.acción" en una ventana móvil en memoria
+(PERF_PROFILING_WINDOW muestras por endpoint) y se consultan en
+/api/admin/perf/. Con varios workers cada proceso tiene su propio registro.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+_medicion_actual = ContextVar('perf_medicion_actual', default=None)
+
+_NUMEROS_RE = re.compile(r'\b\d+\b')
+_LISTA_PARAMS_RE = re.compile(r'(%s|\?)(\s*,\s*(%s|\?))+')
+_ESPACIOS_RE = re.compile(r'\s+')
+
+
+def fingerprint_sql(sql):
+    """Normaliza un SQL para agrupar queries iguales con distintos parámetros."""
+    sql = _NUMEROS_RE.sub('N', sql)
+    sql = _LISTA_PARAMS_RE.sub(r'\1, ...', sql)
+    return _ESPACIOS_RE.sub(' ', sql).strip()
+
+
+class Medicion:
+    """Acumulador de una request (o de un bloque medido con QueryBudget)."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.huellas = Counter()
+        self.serializacion_ms = 0.0
+        self.serializacion_queries = 0
+        self._profundidad_serializer = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - inicio) * 1000
+            self.queries += 1
+            self.huellas[fingerprint_sql(sql)] += 1
+
+    def duplicadas(self, limite=5):
+        return [
+            {'sql': sql, 'veces': veces}
+            for sql, veces in self.huellas.most_common(limite) if veces > 1
+        ]
+
+    def medir(self):
+        """Context manager: instala el wrapper en todas las conexiones."""
+        return _Instalada(self)
+
+
+class _Instalada:
+    def __init__(self, medicion):
+        self.medicion = medicion
+        self._wrappers = []
+
+    def __enter__(self):
+        self._token = _medicion_actual.set(self.medicion)
+        for conn in connections.all():
+            wrapper = conn.execute_wrapper(self.medicion)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        return self.medicion
+
+    def __exit__(self, *exc):
+        for wrapper in reversed(self._wrappers):
+            wrapper.__exit__(*exc)
+        _medicion_actual.reset(self._token)
+        return False
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[idx]
+
+
+class PerfRegistry:
+    """Ventana móvil de muestras por endpoint, segura entre threads."""
+
+    def __init__(self, ventana=200):
+        self.ventana = ventana
+        self._lock = threading.Lock()
+        self._muestras = defaultdict(lambda: deque(maxlen=self.ventana))
+        self._duplicadas = defaultdict(Counter)
+        self._excedidos = Counter()
+
+    def registrar(self, endpoint, medicion, total_ms, presupuesto=None):
+        muestra = (medicion.queries, medicion.db_ms, medicion.serializacion_ms,
+                   medicion.serializacion_queries, total_ms)
+        with self._lock:
+            self._muestras[endpoint].append(muestra)
+            for sql, veces in medicion.huellas.items():
+                if veces > 1:
+                    self._duplicadas[endpoint][sql] = max(self._duplicadas[endpoint][sql], veces)
+            if presupuesto is not None and medicion.queries > presupuesto:
+                self._excedidos[endpoint] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._duplicadas.clear()
+            self._excedidos.clear()
+
+    def reporte(self):
+        with self._lock:
+            copia = {k: list(v) for k, v in self._muestras.items()}
+            duplicadas = {k: v.most_common(5) for k, v in self._duplicadas.items()}
+            excedidos = dict(self._excedidos)
+
+        filas = []
+        for endpoint, muestras in copia.items():
+            queries, db_ms, ser_ms, ser_queries, total_ms = (list(c) for c in zip(*muestras))
+            fila = {'endpoint': endpoint, 'muestras': len(muestras), 'presupuesto_excedido': excedidos.get(endpoint, 0)}
+            for nombre, valores in (('queries', queries), ('db_ms', db_ms), ('serializacion_ms', ser_ms),
+                                    ('serializacion_queries', ser_queries), ('total_ms', total_ms)):
+                fila[nombre] = {
+                    'p50': round(_percentil(valores, 50), 2),
+                    'p95': round(_percentil(valores, 95), 2),
+                    'p99': round(_percentil(valores, 99), 2),
+                    'max': round(max(valores), 2),
+                }
+            fila['sql_duplicado'] = [{'sql': sql, 'veces': veces} for sql, veces in duplicadas.get(endpoint, [])]
+            filas.append(fila)
+        filas.sort(key=lambda f: f['queries']['p95'], reverse=True)
+        return filas
+
+
+registry = PerfRegistry(ventana=getattr(settings, 'PERF_PROFILING_WINDOW', 200))
+
+
+def nombre_endpoint(view_func, method):
+    """'ViewSet.accion' para viewsets, 'Vista.METODO' para APIViews y vistas sueltas."""
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return f'{view_func.__module__}.{view_func.__name__}.{method}'
+    actions = getattr(view_func, 'actions', None) or {}
+    accion = actions.get(method.lower(), method)
+    return f'{cls.__module__}.{cls.__name__}.{accion}'
+
+
+def presupuesto_declarado(view_func, method):
+    """
+    Presupuesto de queries declarado en la vista con `query_budget`: un entero
+    para todas las acciones o un dict {'list': 4, 'retrieve': 3, ...}.
+    """
+    cls = getattr(view_func, 'cls', None)
+    presupuesto = getattr(cls, 'query_budget', None)
+    if isinstance(presupuesto, dict):
+        actions = getattr(view_func, 'actions', None) or {}
+        return presupuesto.get(actions.get(method.lower(), method.lower()))
+    return presupuesto
+
+
+def _instalar_hook_serializers():
+    """
+    Envuelve BaseSerializer.data para medir el tiempo y las queries de la
+    serialización (solo el serializer más externo de cada request).
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    original = BaseSerializer.data
+    if getattr(original.fget, '_perf_hook', False):
+        return
+
+    def data(self):
+        medicion = _medicion_actual.get()
+        if medicion is None or medicion._profundidad_serializer:
+            return original.fget(self)
+        medicion._profundidad_serializer += 1
+        queries_antes = medicion.queries
+        inicio = time.perf_counter()
+        try:
+            return original.fget(self)
+        finally:
+            medicion.serializacion_ms += (time.perf_counter() - inicio) * 1000
+            medicion.serializacion_queries += medicion.queries - queries_antes
+            medicion._profundidad_serializer -= 1
+
+    data._perf_hook = True
+    BaseSerializer.data = property(data)
+
+
+class QueryProfilingMiddleware:
+    """
+    Registra queries/tiempos por endpoint DRF. Se desactiva solo
+    (MiddlewareNotUsed) si PERF_PROFILING_ENABLED es False.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _instalar_hook_serializers()
+
+    def __call__(self, request):
+        medicion = Medicion()
+        inicio = time.perf_counter()
+        request._perf_medicion = medicion
+        with medicion.medir():
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        endpoint = getattr(request, '_perf_endpoint', None)
+        if endpoint:
+            registry.registrar(endpoint, medicion, total_ms, getattr(request, '_perf_presupuesto', None))
+            if getattr(settings, 'PERF_PROFILING_HEADERS', False):
+                response['X-Query-Count'] = str(medicion.queries)
+                response['X-DB-Time-Ms'] = f'{medicion.db_ms:.1f}'
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Solo se perfilan vistas DRF (APIView/ViewSet); admin y estáticos quedan fuera
+        if getattr(view_func, 'cls', None) is None:
+            return None
+        request._perf_endpoint = nombre_endpoint(view_func, request.method)
+        request._perf_presupuesto = presupuesto_declarado(view_func, request.method)
+        return None
+
+    def process_template_response(self, request, response):
+        # Django renderiza la respuesta DRF justo después de este hook; el
+        # render (JSON) se suma al tiempo de serialización.
+        medicion = getattr(request, '_perf_medicion', None)
+        if medicion is not None:
+            inicio = time.perf_counter()
+
+            def fin_render(rendered):
+                medicion.serializacion_ms += (time.perf_counter() - inicio) * 1000
+
+            response.add_post_render_callback(fin_render)
+        return response
@@ -0,0 +1,68 @@
+"""
+Presupuestos de queries para usar en tests/CI.
+
+Las vistas declaran su presupuesto con `query_budget` (entero o dict por
+acción, ver core.perf_middleware.presupuesto_declarado) y los tests lo
+verifican con (ver prestamo_llaves/tests.py):
+
+    from core.query_budget import assert_query_budget
+
+    assert_query_budget(self.client, 'get', '/api/activos/')
+
+o, para un bloque arbitrario:
+
+    with QueryBudget(3, 'armar reporte'):
+        armar_reporte()
+
+Si se supera el presupuesto se lanza QueryBudgetExceeded (AssertionError)
+con el detalle de las queries repetidas, que es lo que hace fallar el CI.
+"""
+from django.urls import resolve
+from urllib.parse import urlsplit
+
+from .perf_middleware import Medicion, presupuesto_declarado, nombre_endpoint
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget:
+    def __init__(self, presupuesto, etiqueta='bloque'):
+        self.presupuesto = presupuesto
+        self.etiqueta = etiqueta
+        self.medicion = Medicion()
+        self._instalada = self.medicion.medir()
+
+    def __enter__(self):
+        self._instalada.__enter__()
+        return self.medicion
+
+    def __exit__(self, exc_type, exc, tb):
+        self._instalada.__exit__(exc_type, exc, tb)
+        if exc_type is None and self.medicion.queries > self.presupuesto:
+            raise QueryBudgetExceeded(self.mensaje())
+        return False
+
+    def mensaje(self):
+        lineas = [f'{self.etiqueta}: {self.medicion.queries} queries (presupuesto {self.presupuesto}).']
+        for dup in self.medicion.duplicadas():
+            lineas.append(f"  x{dup['veces']}: {dup['sql']}")
+        return '\n'.join(lineas)
+
+
+def assert_query_budget(client, method, url, presupuesto=None, **kwargs):
+    """
+    Ejecuta la request con el cliente de test y falla si la vista supera su
+    presupuesto. Sin `presupuesto` explícito se usa el `query_budget` de la vista.
+    Retorna la respuesta para seguir haciendo asserts sobre ella.
+    """
+    match = resolve(urlsplit(url).path)
+    if presupuesto is None:
+        presupuesto = presupuesto_declarado(match.func, method.upper())
+    if presupuesto is None:
+        raise ValueError(f'La vista de {url} no declara query_budget para {method.upper()}.')
+
+    with QueryBudget(presupuesto, nombre_endpoint(match.func, method.upper())):
+        response = getattr(client, method.lower())(url, **kwargs)
+    return response
@@ -66,6 +66,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.perf_middleware.QueryProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -235,29 +236,103 @@ RESERVAS_ADMIN_EMAIL = config('RESERVAS_ADMIN_EMAIL', default='')
 EMAIL_DAILY_LIMIT   = 200
 
 # ────────────────────────────────────────────────────────────
-# 🚀 GUARDIÁN DE SEGURIDAD: ALERTAR SI LA DB ESTÁ VACÍA
-# ────────────────────────────────────────────────────────────
-import sys
-# Solo ejecutamos el check si no es una migración o collectstatic
-if not any(arg in sys.argv for arg in ['migrate', 'makemigrations', 'collectstatic']):
-    try:
-        from django.db import connections
-        from django.db.utils import OperationalError
-        def check_db_integrity():
-            try:
-                with connections['default'].cursor() as cursor:
-                    cursor.execute("SELECT count(*) FROM information_schema.tables WHERE table_schema = 'public'")
-                    if cursor.fetchone()[0] == 0:
-                        print("\n" + "!"*80)
-                        print("⚠️  AVISO DE SEGURIDAD: LA BASE DE DATOS ACTUAL ESTÁ TOTALMENTE VACÍA.")
-                        print("Si esto no es un servidor nuevo, podrías haber perdido la conexión con")
-                        print("los datos del Sandbox. Verifica tus volúmenes de Docker.")
-                        print("!"*80 + "\n")
-            except (OperationalError, Exception):
-                pass # Ignorar si la DB aún no está levantada
-        
-        # Intentar el check (con manejo de errores para no bloquear el arranque)
-        import threading
-        threading.Timer(5.0, check_db_integrity).start()
-    except:
-        pass
+# CARGAS MASIVAS (Excel) Y DOCUMENTOS EN LOTE
+# ────────────────────────────────────────────────────────────
+BULK_UPLOAD_BATCH_SIZE = config('BULK_UPLOAD_BATCH_SIZE', default=500, cast=int)
+
+# Generación de PDFs en lote (Recepciones Conformes)
+PDF_BATCH_WORKERS = config('PDF_BATCH_WORKERS', default=4, cast=int)
+PDF_BATCH_MAX = config('PDF_BATCH_MAX', default=500, cast=int)
+# Lotes de hasta PDF_BATCH_SYNC_MAX RCs se generan en el request; los mayores van a la
+# cola (tarea 'servicios.lote_pdf_rc') y se descargan desde MEDIA_ROOT/pdf_lotes
+PDF_BATCH_SYNC_MAX = config('PDF_BATCH_SYNC_MAX', default=20, cast=int)
+# Horas que se conservan los lotes generados antes de borrarlos
+PDF_BATCH_TTL_HORAS = config('PDF_BATCH_TTL_HORAS', default=24, cast=int)
+# PDFs en caché bajo MEDIA_ROOT/pdf_cache; con X_ACCEL los entrega nginx directamente
+PDF_CACHE_X_ACCEL = config('PDF_CACHE_X_ACCEL', default=False, cast=bool)
+
+# ────────────────────────────────────────────────────────────
+# PERFILADO DE QUERIES POR ENDPOINT (/api/admin/perf/)
+# ────────────────────────────────────────────────────────────
+PERF_PROFILING_ENABLED = config('PERF_PROFILING_ENABLED', default=False, cast=bool)
+# Muestras por endpoint para los percentiles
+PERF_PROFILING_WINDOW = config('PERF_PROFILING_WINDOW', default=200, cast=int)
+# Agrega X-Query-Count / X-DB-Time-Ms a las respuestas perfiladas
+PERF_PROFILING_HEADERS = config('PERF_PROFILING_HEADERS', default=False, cast=bool)
+
+# ────────────────────────────────────────────────────────────
+# API MERCADO PÚBLICO (cliente compartido: licitaciones/mp_client.py)
+# ────────────────────────────────────────────────────────────
+MP_API_BASE_URL = config('MP_API_BASE_URL', default='https://api.mercadopublico.cl/servicios/v1/publico')
+MP_TICKETS = config(
+    'MP_TICKETS',
+    default='F23CBE04-6C9D-40C4-985C-7F5FCD6070B6,F8537A18-6766-4DEF-9E59-426B4FEE2844',
+    cast=Csv(),
+)
+# Tasa máxima por proceso (token bucket) y ráfaga permitida
+MP_RATE_PER_SECOND = config('MP_RATE_PER_SECOND', default=3.0, cast=float)
+MP_RATE_BURST = config('MP_RATE_BURST', default=5, cast=int)
+MP_MAX_RETRIES = config('MP_MAX_RETRIES', default=3, cast=int)
+MP_TIMEOUT = config('MP_TIMEOUT', default=10, cast=int)
+MP_POOL_SIZE = config('MP_POOL_SIZE', default=10, cast=int)
+MP_VERIFY_SSL = config('MP_VERIFY_SSL', default=False, cast=bool)
+# Circuit breaker: saturaciones seguidas antes de abrir y segundos abierto
+MP_BREAKER_THRESHOLD = config('MP_BREAKER_THRESHOLD', default=5, cast=int)
+MP_BREAKER_RESET = config('MP_BREAKER_RESET', default=30, cast=int)
+# Consultas por rango de días (visores): días en paralelo y tiempo máximo por request
+MP_RANGE_CONCURRENCY = config('MP_RANGE_CONCURRENCY', default=4, cast=int)
+MP_RANGE_BUDGET_SECONDS = config('MP_RANGE_BUDGET_SECONDS', default=25, cast=float)
+# Caché de respuestas MP (licitaciones/mp_cache.py): 'db' o 'django' (usa CACHES[MP_CACHE_ALIAS])
+MP_CACHE_BACKEND = config('MP_CACHE_BACKEND', default='db')
+MP_CACHE_ALIAS = config('MP_CACHE_ALIAS', default='default')
+MP_CACHE_MAX_BYTES = config('MP_CACHE_MAX_BYTES', default=200 * 1024 * 1024, cast=int)
+# Tiempo extra (pasado el TTL) en que se sirve la copia vieja mientras se revalida
+MP_CACHE_STALE_SECONDS = config('MP_CACHE_STALE_SECONDS', default=24 * 3600, cast=int)
+MP_CACHE_WAIT_SECONDS = config('MP_CACHE_WAIT_SECONDS', default=10, cast=int)
+MP_CACHE_PRUNE_EVERY = config('MP_CACHE_PRUNE_EVERY', default=50, cast=int)
+# Filas por lote al persistir licitaciones/OCs (licitaciones/mp_persist.py)
+MP_UPSERT_BATCH_SIZE = config('MP_UPSERT_BATCH_SIZE', default=500, cast=int)
+# Descargas de detalle en paralelo de sync_licitaciones --full (el rate limit lo pone MP_RATE_PER_SECOND)
+MP_SYNC_ENRICH_WORKERS = config('MP_SYNC_ENRICH_WORKERS', default=4, cast=int)
+# Reparación de OCs sin proveedor (sync_oc_providers): OCs por ejecución, consultas en
+# paralelo y backoff por OC (segundos, se duplica con cada intento fallido)
+MP_OC_PROVEEDOR_LOTE = config('MP_OC_PROVEEDOR_LOTE', default=200, cast=int)
+MP_OC_PROVEEDOR_WORKERS = config('MP_OC_PROVEEDOR_WORKERS', default=4, cast=int)
+MP_OC_PROVEEDOR_BACKOFF_BASE = config('MP_OC_PROVEEDOR_BACKOFF_BASE', default=3600, cast=int)
+MP_OC_PROVEEDOR_BACKOFF_MAX = config('MP_OC_PROVEEDOR_BACKOFF_MAX', default=7 * 24 * 3600, cast=int)
+
+# ────────────────────────────────────────────────────────────
+# IMPRESORAS (sondeo SNMP: impresoras/services.py)
+# ────────────────────────────────────────────────────────────
+# Segundos máximos por impresora y sondeos simultáneos al refrescar toda la flota
+PRINTERS_POLL_DEADLINE = config('PRINTERS_POLL_DEADLINE', default=15, cast=float)
+PRINTERS_POLL_CONCURRENCY = config('PRINTERS_POLL_CONCURRENCY', default=32, cast=int)
+# Filas por respuesta GETBULK al leer la tabla de consumibles (se reduce sola ante tooBig)
+PRINTERS_SNMP_MAX_REPETITIONS = config('PRINTERS_SNMP_MAX_REPETITIONS', default=8, cast=int)
+# Segundos que se confía en el mapa de consumibles cacheado por modelo antes de releer la tabla
+PRINTERS_SUPPLY_LAYOUT_TTL = config('PRINTERS_SUPPLY_LAYOUT_TTL', default=24 * 3600, cast=int)
+# Monitoreo en segundo plano (tarea 'impresoras.monitorear') e historial de toner
+PRINTERS_MONITOR_INTERVAL = config('PRINTERS_MONITOR_INTERVAL', default=900, cast=int)
+PRINTERS_HISTORY_RAW_DAYS = config('PRINTERS_HISTORY_RAW_DAYS', default=7, cast=int)
+PRINTERS_HISTORY_HOURLY_DAYS = config('PRINTERS_HISTORY_HOURLY_DAYS', default=90, cast=int)
+PRINTERS_HISTORY_DAYS = config('PRINTERS_HISTORY_DAYS', default=730, cast=int)
+PRINTERS_FORECAST_DAYS = config('PRINTERS_FORECAST_DAYS', default=60, cast=int)
+# Descubrimiento de impresoras (impresoras/discovery.py): hosts por escaneo, sondeos
+# simultáneos y segundos de espera por host
+PRINTERS_DISCOVERY_MAX_HOSTS = config('PRINTERS_DISCOVERY_MAX_HOSTS', default=4096, cast=int)
+PRINTERS_DISCOVERY_CONCURRENCY = config('PRINTERS_DISCOVERY_CONCURRENCY', default=256, cast=int)
+PRINTERS_DISCOVERY_TIMEOUT = config('PRINTERS_DISCOVERY_TIMEOUT', default=1.0, cast=float)
+
+# ────────────────────────────────────────────────────────────
+# COLA DE TAREAS EN SEGUNDO PLANO (core/cola.py, python manage.py run_worker)
+# ────────────────────────────────────────────────────────────
+# True: las tareas se ejecutan en el acto, sin worker (desarrollo local)
+TAREAS_EAGER = config('TAREAS_EAGER', default=False, cast=bool)
+TAREAS_MAX_INTENTOS = config('TAREAS_MAX_INTENTOS', default=5, cast=int)
+TAREAS_BACKOFF_BASE = config('TAREAS_BACKOFF_BASE', default=30, cast=int)
+TAREAS_BACKOFF_MAX = config('TAREAS_BACKOFF_MAX', default=3600, cast=int)
+# Una tarea EJECUTANDO por más de esto se considera de un worker caído y se reencola
+TAREAS_TIMEOUT = config('TAREAS_TIMEOUT', default=1800, cast=int)
+TAREAS_RETENCION_DIAS = config('TAREAS_RETENCION_DIAS', default=7, cast=int)
+# El chequeo de "BD vacía" que corría aquí en un threading.Timer es ahora la
+# tarea periódica core.verificar_integridad_bd (core/tareas.py).
@@ -0,0 +1,35 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from core import emails  # noqa: F401  registra core.enviar_correo
+from core.cola import tarea
+from core.models import Tarea
+
+logger = logging.getLogger('tareas')
+
+
+@tarea('core.verificar_integridad_bd', cada=6 * 3600, max_intentos=1)
+def verificar_integridad_bd():
+    """Alerta si la base de datos está vacía (antes un threading.Timer en settings.py)."""
+    if connections['default'].vendor != 'postgresql':
+        return
+    with connections['default'].cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM information_schema.tables WHERE table_schema = 'public'")
+        if cursor.fetchone()[0] == 0:
+            logger.critical(
+                "⚠️  AVISO DE SEGURIDAD: LA BASE DE DATOS ACTUAL ESTÁ TOTALMENTE VACÍA. "
+                "Si esto no es un servidor nuevo, podrías haber perdido la conexión con "
+                "los datos del Sandbox. Verifica tus volúmenes de Docker."
+            )
+
+
+@tarea('core.purgar_tareas', cada=24 * 3600, max_intentos=1)
+def purgar_tareas():
+    """Elimina las tareas terminadas más antiguas que TAREAS_RETENCION_DIAS."""
+    limite = timezone.now() - timedelta(days=settings.TAREAS_RETENCION_DIAS)
+    borradas, _ = Tarea.objects.filter(estado__in=[Tarea.OK, Tarea.FALLIDA], terminada__lt=limite).delete()
+    logger.info("Purgadas %s tareas terminadas", borradas)
@@ -24,7 +24,7 @@ from rest_framework_simplejwt.views import (
 from core.views import (
     UserProfileView, UserViewSet, GroupViewSet, PermissionListView, 
     ChangePasswordView, AvatarUploadView, PasswordResetRequestView, PasswordResetConfirmView,
-    LinkInteresViewSet
+    LinkInteresViewSet, PerfReportView
 )
 
 router = DefaultRouter()
@@ -42,6 +42,7 @@ urlpatterns = [
     path('api/auth/password-reset-request/', PasswordResetRequestView.as_view(), name='password_reset_request'),
     path('api/auth/password-reset-confirm/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
     path('api/admin/permissions/', PermissionListView.as_view(), name='admin-permissions'),
+    path('api/admin/perf/', PerfReportView.as_view(), name='admin-perf'),
     path('api/', include(router.urls)),
     path('api/', include('prestamo_llaves.urls')),
     path('api/', include('establecimientos.urls')),
@@ -11,6 +11,7 @@ from django.contrib.auth import update_session_auth_hash
 from .serializers import UserManagementSerializer, GroupSerializer, PermissionSerializer, LinkInteresSerializer
 from .models import LinkInteres
 from .emails import enviar_correo_reset_password
+from .perf_middleware import registry as perf_registry
 
 class LinkInteresViewSet(viewsets.ModelViewSet):
     queryset = LinkInteres.objects.all()
@@ -79,6 +80,25 @@ class PermissionListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     pagination_class = None
 
+class PerfReportView(APIView):
+    """
+    Percentiles de queries/tiempos por endpoint registrados por
+    QueryProfilingMiddleware (solo del proceso que atiende la request).
+    DELETE reinicia las muestras.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'enabled': getattr(settings, 'PERF_PROFILING_ENABLED', False),
+            'window': perf_registry.ventana,
+            'endpoints': perf_registry.reporte(),
+        })
+
+    def delete(self, request):
+        perf_registry.limpiar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 class AvatarUploadView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -1,8 +1,22 @@
 from django.contrib import admin
-from .models import Printer
+from .models import Printer, PrinterSample, SupplyLayout
 
 @admin.register(Printer)
 class PrinterAdmin(admin.ModelAdmin):
     list_display = ("name", "ip_address", "type", "last_check", "last_ok")
     list_filter = ("type", "enabled", "last_ok")
     search_fields = ("name", "ip_address", "location")
+
+
+@admin.register(PrinterSample)
+class PrinterSampleAdmin(admin.ModelAdmin):
+    list_display = ("printer", "taken_at", "resolution", "ok", "black", "cyan", "magenta", "yellow")
+    list_filter = ("resolution", "ok")
+    date_hierarchy = "taken_at"
+    list_select_related = ("printer",)
+
+
+@admin.register(SupplyLayout)
+class SupplyLayoutAdmin(admin.ModelAdmin):
+    list_display = ("model", "updated_at")
+    search_fields = ("model",)
@@ -0,0 +1,232 @@
+"""
+SNMP discovery of printers on the school networks.
+
+Targets are CIDR blocks ("10.12.0.0/22"), ranges ("10.12.0.1-10.12.3.254")
+or single addresses, comma separated, up to PRINTERS_DISCOVERY_MAX_HOSTS
+hosts. All probes share one lightweight SnmpDispatcher (pysnmp v1arch: one
+UDP transport, no per-target engine configuration, which made SnmpEngine
+probes CPU-bound past a few hundred hosts) on a single event loop,
+throttled by a semaphore (PRINTERS_DISCOVERY_CONCURRENCY).
+
+`iter_discovery` yields events as the scan advances, so the API can stream
+them (SSE) instead of waiting for the whole block:
+
+    ("progress", {"scanned": 512, "total": 1022, "found": 3})
+    ("found", {"ip": ..., "name": ..., "serial_number": ..., "status": "new"})
+    ("done", {"scanned": ..., "found": ..., "missing": [...]})
+
+Each found device is compared with the existing Printer rows: "known" (same
+IP), "moved" (same serial number, different IP), "replaced" (same IP, other
+serial number) or "new". Printers registered inside the scanned range that
+did not answer are reported as "missing".
+"""
+import asyncio
+import ipaddress
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+try:
+    from pysnmp.hlapi.v1arch.asyncio import (
+        CommunityData,
+        ObjectIdentity,
+        ObjectType,
+        SnmpDispatcher,
+        UdpTransportTarget,
+        get_cmd,
+    )
+except Exception:
+    CommunityData = None
+
+from .models import Printer
+from .services import PollingError
+
+PRINTER_KEYWORDS = (
+    "printer", "laserjet", "designjet", "epson", "canon", "brother", "ricoh",
+    "lexmark", "xerox", "konica", "kyocera", "sharp",
+)
+PROGRESS_EVERY = 64
+
+Event = Tuple[str, Dict[str, object]]
+
+
+def parse_targets(spec: str) -> List[ipaddress.IPv4Address]:
+    """Expands "cidr, start-end, ip" into addresses. Raises ValueError."""
+    addresses: Dict[ipaddress.IPv4Address, None] = {}
+    limit = settings.PRINTERS_DISCOVERY_MAX_HOSTS
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "/" in part:
+            network = ipaddress.IPv4Network(part, strict=False)
+            if network.num_addresses > limit + 2:
+                raise ValueError(f"{part} has more than {limit} hosts.")
+            hosts = network.hosts() if network.prefixlen < 31 else iter(network)
+        elif "-" in part:
+            start, end = (ipaddress.IPv4Address(value.strip()) for value in part.split("-", 1))
+            if end < start:
+                raise ValueError(f"Invalid range {part}.")
+            if int(end) - int(start) + 1 > limit:
+                raise ValueError(f"{part} has more than {limit} hosts.")
+            hosts = (ipaddress.IPv4Address(value) for value in range(int(start), int(end) + 1))
+        else:
+            hosts = iter([ipaddress.IPv4Address(part)])
+        for host in hosts:
+            addresses[host] = None
+            if len(addresses) > limit:
+                raise ValueError(f"The scan is limited to {limit} hosts.")
+    if not addresses:
+        raise ValueError("No addresses to scan.")
+    return list(addresses)
+
+
+async def _probe(dispatcher, ip: str, community: str, port: int, timeout: float) -> Optional[Dict[str, str]]:
+    """sysDescr, printer name and serial number of `ip`, or None if it is not a printer."""
+    try:
+        target = await UdpTransportTarget.create((ip, port), timeout=timeout, retries=0)
+        res = await get_cmd(
+            dispatcher,
+            CommunityData(community, mpModel=1),  # v2c
+            target,
+            ObjectType(ObjectIdentity("1.3.6.1.2.1.1.1.0")),  # sysDescr
+            ObjectType(ObjectIdentity("1.3.6.1.2.1.43.5.1.1.16.1")),  # prtGeneralPrinterName
+            ObjectType(ObjectIdentity("1.3.6.1.2.1.43.5.1.1.17.1")),  # prtGeneralSerialNumber
+            lookupMib=False,
+        )
+    except Exception:
+        return None
+    if not res:
+        return None
+    err_ind, err_status, _, vb = res
+    if err_ind or err_status or not vb:
+        return None
+
+    def text(position: int) -> str:
+        if len(vb) <= position or vb[position][1].__class__.__name__ in ("NoSuchObject", "NoSuchInstance", "EndOfMibView"):
+            return ""
+        return str(vb[position][1]).strip()
+
+    descr, name, serial = text(0), text(1), text(2)
+    # Printer-MIB answering is proof enough; otherwise fall back to sysDescr keywords
+    if not (name or serial) and not any(word in descr.lower() for word in PRINTER_KEYWORDS):
+        return None
+    if name in ("0", ""):
+        name = descr[:30] + "..." if len(descr) > 30 else descr
+    return {"ip": ip, "name": name, "description": descr, "serial_number": serial}
+
+
+async def discover(
+    addresses: Sequence[ipaddress.IPv4Address],
+    community: str = "public",
+    port: int = 161,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Event]:
+    """Async generator of ("progress" | "found", data) events in arrival order."""
+    if CommunityData is None:
+        raise PollingError("pysnmp not installed or import failed.")
+    concurrency = concurrency or settings.PRINTERS_DISCOVERY_CONCURRENCY
+    timeout = timeout or settings.PRINTERS_DISCOVERY_TIMEOUT
+    dispatcher = SnmpDispatcher()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(ip: str) -> Optional[Dict[str, str]]:
+        async with semaphore:
+            return await _probe(dispatcher, ip, community, port, timeout)
+
+    # Create the tasks lazily: a /20 should not hold thousands of pending coroutines
+    pending = set()
+    queue = iter(str(address) for address in addresses)
+    scanned = found = 0
+    total = len(addresses)
+    try:
+        while True:
+            while len(pending) < concurrency * 2:
+                ip = next(queue, None)
+                if ip is None:
+                    break
+                pending.add(asyncio.ensure_future(probe(ip)))
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                scanned += 1
+                device = task.result()
+                if device:
+                    found += 1
+                    yield "found", device
+                if scanned % PROGRESS_EVERY == 0 or scanned == total:
+                    yield "progress", {"scanned": scanned, "total": total, "found": found}
+    finally:
+        for task in pending:
+            task.cancel()
+        dispatcher.close()
+
+
+class FleetDiff:
+    """Compares discovered devices with the registered printers."""
+
+    def __init__(self, addresses: Sequence[ipaddress.IPv4Address]):
+        scanned = {str(address) for address in addresses}
+        printers = list(Printer.objects.only("id", "name", "ip_address", "serial_number"))
+        self.by_ip = {printer.ip_address: printer for printer in printers}
+        self.by_serial = {printer.serial_number: printer for printer in printers if printer.serial_number}
+        self.expected = {printer.ip_address: printer for printer in printers if printer.ip_address in scanned}
+        self.seen = set()
+
+    def classify(self, device: Dict[str, str]) -> Dict[str, object]:
+        ip, serial = device["ip"], device.get("serial_number") or ""
+        self.seen.add(ip)
+        at_ip = self.by_ip.get(ip)
+        same_serial = self.by_serial.get(serial) if serial else None
+        if same_serial and same_serial.ip_address != ip:
+            status, printer = "moved", same_serial
+            device["previous_ip"] = same_serial.ip_address
+            self.seen.add(same_serial.ip_address)  # found, just elsewhere: not missing
+        elif at_ip and serial and at_ip.serial_number and at_ip.serial_number != serial:
+            status, printer = "replaced", at_ip
+        elif at_ip:
+            status, printer = "known", at_ip
+        else:
+            status, printer = "new", None
+        device["status"] = status
+        device["printer_id"] = printer.id if printer else None
+        return device
+
+    def missing(self) -> List[Dict[str, object]]:
+        return [
+            {"printer_id": printer.id, "name": printer.name, "ip": ip}
+            for ip, printer in self.expected.items()
+            if ip not in self.seen
+        ]
+
+
+def iter_discovery(spec: str, community: str = "public", port: int = 161) -> Iterator[Event]:
+    """Synchronous version of `discover` for Django views, with the diff applied."""
+    addresses = parse_targets(spec)
+    diff = FleetDiff(addresses)
+    loop = asyncio.new_event_loop()
+    agen = discover(addresses, community=community, port=port)
+    scanned = found = 0
+    try:
+        while True:
+            try:
+                kind, data = loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+            if kind == "found":
+                found += 1
+                data = diff.classify(data)
+            else:
+                scanned = data["scanned"]
+            yield kind, data
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+    yield "done", {"scanned": scanned, "total": len(addresses), "found": found, "missing": diff.missing()}
+
+
+def scan_network_range(start_ip: str, end_ip: str, community: str = "public") -> List[Dict[str, object]]:
+    """Printers found between two addresses (blocking; see iter_discovery for streaming)."""
+    return [data for kind, data in iter_discovery(f"{start_ip}-{end_ip}", community) if kind == "found"]
@@ -0,0 +1,91 @@
+"""
+Management command: benchmark_snmp
+Compares the SNMP round trips and time per phase of the three ways the
+poller reads a printer, against a local simulated agent (impresoras.snmp_fake)
+that answers with a fixed latency to imitate the WAN links to the schools:
+
+  walk    GET identity + GETNEXT walks of the supply table (SNMPv1 path)
+  bulk    GET identity + GETBULK of the supply columns (first v2c poll)
+  cached  one multi-OID GET with the model's SupplyLayout (later polls)
+
+Usage:
+    python manage.py benchmark_snmp --latency 40 --iterations 5 --extra-supplies 4
+"""
+import asyncio
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from impresoras.models import Printer, SupplyLayout
+from impresoras.services import CommunityData, PollingError, SnmpEngine, _poll_once
+from impresoras.snmp_fake import FakeSnmpAgent, printer_oids
+
+
+class Command(BaseCommand):
+    help = "Benchmarks walk vs. GETBULK vs. cached multi-OID GET supply reads against a simulated agent."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--latency", type=float, default=40, help="Agent latency per request, in ms.")
+        parser.add_argument("--iterations", type=int, default=5, help="Polls per mode.")
+        parser.add_argument("--extra-supplies", type=int, default=0, help="Supplies besides the 4 toners.")
+
+    def handle(self, *args, **options):
+        if CommunityData is None:
+            raise PollingError("pysnmp not installed or import failed.")
+        iterations = max(1, options["iterations"])
+        oids = printer_oids(
+            black=(40, 100), cyan=(55, 100), magenta=(70, 100), yellow=(85, 100),
+            extra_supplies=max(0, options["extra_supplies"]),
+        )
+        with FakeSnmpAgent(oids, latency=options["latency"] / 1000) as agent:
+            printer = Printer(
+                name="benchmark", location="local", ip_address=agent.host, snmp_port=agent.port,
+                type=Printer.TYPE_COLOR, community=agent.community,
+            )
+            report = asyncio.run(self._run(printer, agent, iterations))
+
+        self.stdout.write(
+            f"[benchmark_snmp] latency {options['latency']:g} ms, "
+            f"{4 + max(0, options['extra_supplies'])} supplies, {iterations} polls per mode"
+        )
+        baseline = report["walk"]["total"]
+        for mode, data in report.items():
+            phases = ", ".join(f"{name} {ms:.1f} ms" for name, ms in data["phases"].items())
+            self.stdout.write(
+                f"  {mode:<7} {data['round_trips']:>3} round trips {data['requests']}, "
+                f"{data['total']:.1f} ms/poll ({phases}) {baseline / data['total']:.1f}x"
+            )
+
+    async def _run(self, printer, agent, iterations):
+        engine = SnmpEngine()
+        try:
+            # Warm-up (imports, transport) and the layout the "cached" mode reads with
+            first = await _poll_once(engine, printer, agent.community, 1)
+            layout = SupplyLayout(model=first.model, supplies=first.supplies)
+            modes = {
+                "walk": {"mp_model": 1, "bulk": False},
+                "bulk": {"mp_model": 1},
+                "cached": {"mp_model": 1, "layout": layout},
+            }
+            report = {}
+            for mode, kwargs in modes.items():
+                agent.requests.clear()
+                phases = defaultdict(float)
+                round_trips = 0
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    result = await _poll_once(engine, printer, agent.community, **kwargs)
+                    round_trips += result.round_trips
+                    for name, ms in result.timings.items():
+                        phases[name] += ms
+                total = (time.perf_counter() - start) * 1000 / iterations
+                report[mode] = {
+                    "round_trips": round_trips // iterations,
+                    "requests": {kind: count // iterations for kind, count in agent.requests.items()},
+                    "phases": {name: ms / iterations for name, ms in phases.items()},
+                    "total": total,
+                }
+            return report
+        finally:
+            engine.close_dispatcher()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('impresoras', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='printer',
+            name='last_community',
+            field=models.CharField(blank=True, max_length=128),
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='last_snmp_version',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
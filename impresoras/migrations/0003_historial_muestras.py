@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('impresoras', '0002_credenciales_snmp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrinterSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('resolution', models.PositiveIntegerField(choices=[(0, 'Lectura'), (3600, 'Promedio por hora'), (86400, 'Promedio por día')], default=0)),
+                ('ok', models.BooleanField()),
+                ('black', models.FloatField(blank=True, null=True)),
+                ('cyan', models.FloatField(blank=True, null=True)),
+                ('magenta', models.FloatField(blank=True, null=True)),
+                ('yellow', models.FloatField(blank=True, null=True)),
+                ('error_mask', models.PositiveIntegerField(default=0)),
+                ('printer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='samples', to='impresoras.printer')),
+            ],
+            options={
+                'verbose_name': 'Muestra de impresora',
+                'verbose_name_plural': 'Muestras de impresoras',
+                'ordering': ['printer', 'taken_at'],
+                'indexes': [models.Index(fields=['printer', 'resolution', 'taken_at'], name='printer_sample_idx'), models.Index(fields=['resolution', 'taken_at'], name='printer_sample_res_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('impresoras', '0003_historial_muestras'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplyLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255, unique=True)),
+                ('supplies', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Modelo de impresora',
+                'verbose_name_plural': 'Modelos de impresoras',
+            },
+        ),
+        migrations.AddField(
+            model_name='printer',
+            name='supply_layout',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='printers', to='impresoras.supplylayout'),
+        ),
+    ]
@@ -1,5 +1,25 @@
 from django.db import models
 
+
+class SupplyLayout(models.Model):
+    """
+    Printer-MIB supply indexes of one printer model (sysDescr). Once known,
+    a poll reads every level with a single multi-OID GET instead of walking
+    the supply table (see services._poll_once).
+    """
+    model = models.CharField(max_length=255, unique=True)
+    # [{"index": 1, "description": "Black Toner"}, ...]
+    supplies = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Modelo de impresora"
+        verbose_name_plural = "Modelos de impresoras"
+
+    def __str__(self):
+        return self.model
+
+
 class Printer(models.Model):
     TYPE_BW = "B/N"
     TYPE_COLOR = "COLOR"
@@ -29,6 +49,12 @@ class Printer(models.Model):
     serial_number = models.CharField(max_length=120, blank=True)
     last_connected = models.BooleanField(null=True, blank=True)
     last_woke = models.BooleanField(null=True, blank=True)
+    # Community and SNMP version (pysnmp mpModel: 0 = v1, 1 = v2c) that last answered
+    last_community = models.CharField(max_length=128, blank=True)
+    last_snmp_version = models.PositiveSmallIntegerField(null=True, blank=True)
+    supply_layout = models.ForeignKey(
+        SupplyLayout, null=True, blank=True, on_delete=models.SET_NULL, related_name="printers"
+    )
 
     class Meta:
         ordering = ["name"]
@@ -49,3 +75,39 @@ class Printer(models.Model):
             "magenta": self.last_magenta,
             "yellow": self.last_yellow,
         }
+
+
+class PrinterSample(models.Model):
+    """One toner/error reading of a printer (see impresoras/monitoring.py)."""
+    RES_RAW = 0
+    RES_HOUR = 3600
+    RES_DAY = 86400
+    RESOLUTION_CHOICES = [
+        (RES_RAW, "Lectura"),
+        (RES_HOUR, "Promedio por hora"),
+        (RES_DAY, "Promedio por día"),
+    ]
+
+    printer = models.ForeignKey(Printer, on_delete=models.CASCADE, related_name="samples")
+    taken_at = models.DateTimeField()
+    # Seconds covered by the sample: 0 for a single reading, 3600/86400 once downsampled
+    resolution = models.PositiveIntegerField(choices=RESOLUTION_CHOICES, default=RES_RAW)
+    ok = models.BooleanField()
+    black = models.FloatField(null=True, blank=True)
+    cyan = models.FloatField(null=True, blank=True)
+    magenta = models.FloatField(null=True, blank=True)
+    yellow = models.FloatField(null=True, blank=True)
+    # Bits of services.ERROR_BITS seen during the sample
+    error_mask = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["printer", "taken_at"]
+        verbose_name = "Muestra de impresora"
+        verbose_name_plural = "Muestras de impresoras"
+        indexes = [
+            models.Index(fields=["printer", "resolution", "taken_at"], name="printer_sample_idx"),
+            models.Index(fields=["resolution", "taken_at"], name="printer_sample_res_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.printer_id} @ {self.taken_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,203 @@
+"""
+Background monitoring of the printer fleet.
+
+The periodic task 'impresoras.monitorear' (impresoras/tareas.py) polls every
+enabled printer with poll_fleet every PRINTERS_MONITOR_INTERVAL seconds,
+refreshes the cached last_* fields and appends one PrinterSample per
+printer. The API only reads that cached state.
+
+History stays compact by downsampling (compact_history, daily):
+  - raw readings older than PRINTERS_HISTORY_RAW_DAYS -> hourly averages
+  - hourly samples older than PRINTERS_HISTORY_HOURLY_DAYS -> daily averages
+  - daily samples older than PRINTERS_HISTORY_DAYS are deleted
+
+toner_forecasts estimates how fast each toner is being used since its last
+refill and how many days are left until it is empty.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Printer, PrinterSample
+from .services import ERROR_BITS, PollResult, poll_fleet, store_fleet_results
+
+COLORS = ("black", "cyan", "magenta", "yellow")
+ERROR_MASKS = {label: 1 << bit for bit, label in ERROR_BITS.items()}
+OFFLINE_MASK = ERROR_MASKS["Offline"]
+# A rise of more points than this between samples is taken as a toner replacement
+REFILL_JUMP = 20
+
+
+def error_mask(errors: Sequence[str]) -> int:
+    mask = 0
+    for label in errors:
+        mask |= ERROR_MASKS.get(label, 0)
+    return mask
+
+
+def errors_from_mask(mask: int) -> List[str]:
+    return [label for bit, label in ERROR_BITS.items() if mask & (1 << bit)]
+
+
+def record_samples(printers: Sequence[Printer], outcomes: Dict[int, Union[PollResult, Exception]], taken_at=None) -> int:
+    """Appends one raw PrinterSample per polled printer (unreachable ones as Offline)."""
+    taken_at = taken_at or timezone.now()
+    samples = []
+    for printer in printers:
+        outcome = outcomes.get(printer.pk)
+        if outcome is None:
+            continue
+        if isinstance(outcome, PollResult):
+            samples.append(PrinterSample(
+                printer=printer, taken_at=taken_at, ok=outcome.ok,
+                error_mask=error_mask(outcome.errors), **outcome.to_levels(),
+            ))
+        else:
+            samples.append(PrinterSample(printer=printer, taken_at=taken_at, ok=False, error_mask=OFFLINE_MASK))
+    PrinterSample.objects.bulk_create(samples)
+    return len(samples)
+
+
+def monitor_fleet() -> Dict[str, int]:
+    """Polls every enabled printer, updates the cached state and stores the samples."""
+    printers = list(Printer.objects.filter(enabled=True))
+    if not printers:
+        return {"printers": 0, "ok": 0, "failed": 0}
+    outcomes = poll_fleet(printers)
+    taken_at = timezone.now()
+    store_fleet_results(printers, outcomes)
+    record_samples(printers, outcomes, taken_at)
+    results = [outcome for outcome in outcomes.values() if isinstance(outcome, PollResult)]
+    return {
+        "printers": len(printers),
+        "ok": len(results),
+        "failed": len(printers) - len(results),
+        # SNMP requests sent and polls served by a cached SupplyLayout (single GET)
+        "round_trips": sum(result.round_trips for result in results),
+        "layout_hits": sum(1 for result in results if result.layout_hit),
+    }
+
+
+# --- Downsampling and retention -------------------------------------------
+
+def _bucket_start(moment: datetime, seconds: int) -> datetime:
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=dt_timezone.utc)
+
+
+def _mean(values: List[Optional[float]]) -> Optional[float]:
+    present = [value for value in values if value is not None]
+    return round(sum(present) / len(present), 1) if present else None
+
+
+def _downsample(source: int, target: int, older_than: datetime) -> Tuple[int, int]:
+    """Replaces the `source` samples before `older_than` with `target` averages, per printer."""
+    older_than = _bucket_start(older_than, target)  # never cut a bucket in half
+    pending = PrinterSample.objects.filter(resolution=source, taken_at__lt=older_than)
+    removed = created = 0
+    for printer_id in pending.values_list("printer_id", flat=True).distinct().order_by():
+        buckets = defaultdict(list)
+        rows = pending.filter(printer_id=printer_id).order_by("taken_at").values_list(
+            "taken_at", "ok", "error_mask", *COLORS
+        )
+        for taken_at, ok, mask, *levels in rows.iterator(chunk_size=2000):
+            buckets[_bucket_start(taken_at, target)].append((ok, mask, levels))
+
+        aggregated = []
+        for start, readings in buckets.items():
+            mask = 0
+            for _, reading_mask, _ in readings:
+                mask |= reading_mask
+            aggregated.append(PrinterSample(
+                printer_id=printer_id,
+                taken_at=start,
+                resolution=target,
+                ok=all(ok for ok, _, _ in readings),
+                error_mask=mask,
+                **{color: _mean([levels[i] for _, _, levels in readings]) for i, color in enumerate(COLORS)},
+            ))
+        with transaction.atomic():
+            removed += pending.filter(printer_id=printer_id).delete()[0]
+            created += len(PrinterSample.objects.bulk_create(aggregated))
+    return removed, created
+
+
+def compact_history(now=None) -> Dict[str, int]:
+    now = now or timezone.now()
+    raw_removed, hourly = _downsample(
+        PrinterSample.RES_RAW, PrinterSample.RES_HOUR, now - timedelta(days=settings.PRINTERS_HISTORY_RAW_DAYS)
+    )
+    hourly_removed, daily = _downsample(
+        PrinterSample.RES_HOUR, PrinterSample.RES_DAY, now - timedelta(days=settings.PRINTERS_HISTORY_HOURLY_DAYS)
+    )
+    expired, _ = PrinterSample.objects.filter(
+        taken_at__lt=now - timedelta(days=settings.PRINTERS_HISTORY_DAYS)
+    ).delete()
+    return {
+        "raw_compacted": raw_removed,
+        "hourly_created": hourly,
+        "hourly_compacted": hourly_removed,
+        "daily_created": daily,
+        "expired": expired,
+    }
+
+
+# --- Depletion forecast ----------------------------------------------------
+
+def _forecast(points: List[Tuple[float, float]], now_days: float) -> Optional[Dict[str, object]]:
+    """Least-squares depletion rate over (day, level) points since the last refill."""
+    if not points:
+        return None
+    start = 0
+    for i in range(1, len(points)):
+        if points[i][1] - points[i - 1][1] > REFILL_JUMP:
+            start = i
+    points = points[start:]
+    level = points[-1][1]
+    forecast = {"level": level, "rate_per_day": None, "days_left": None, "empty_on": None, "samples": len(points)}
+    if len(points) < 3 or points[-1][0] - points[0][0] < 1:
+        return forecast  # not enough history since the refill
+
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return forecast
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+    rate = -slope
+    forecast["rate_per_day"] = round(rate, 2)
+    if rate > 0.01:
+        days_left = max(level, 0) / rate - (now_days - points[-1][0])
+        days_left = max(days_left, 0)
+        forecast["days_left"] = round(days_left, 1)
+        forecast["empty_on"] = (timezone.now() + timedelta(days=days_left)).date().isoformat()
+    return forecast
+
+
+def toner_forecasts(printers: Sequence[Printer], days: Optional[int] = None) -> Dict[int, Dict[str, object]]:
+    """{printer.pk: {color: forecast or None}} from the last `days` (PRINTERS_FORECAST_DAYS) of history."""
+    days = days or settings.PRINTERS_FORECAST_DAYS
+    now = timezone.now()
+    series = defaultdict(lambda: defaultdict(list))
+    rows = PrinterSample.objects.filter(
+        printer__in=printers, taken_at__gte=now - timedelta(days=days)
+    ).order_by("printer_id", "taken_at").values_list("printer_id", "taken_at", *COLORS)
+    for printer_id, taken_at, *levels in rows.iterator(chunk_size=2000):
+        x = taken_at.timestamp() / 86400
+        for color, level in zip(COLORS, levels):
+            if level is not None:
+                series[printer_id][color].append((x, level))
+
+    now_days = now.timestamp() / 86400
+    return {
+        printer.pk: {
+            color: _forecast(series[printer.pk][color], now_days)
+            for color in (COLORS if printer.is_color else ("black",))
+        }
+        for printer in printers
+    }
@@ -1,5 +1,10 @@
+import asyncio
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from django.conf import settings
 from django.utils import timezone
 import subprocess
 
@@ -11,6 +16,7 @@ try:
         ObjectType,
         SnmpEngine,
         UdpTransportTarget,
+        bulk_cmd,
         get_cmd,
         walk_cmd,
     )
@@ -19,7 +25,16 @@ except Exception:
     CommunityData = None
     SnmpOctetString = None
 
-from .models import Printer
+from .models import Printer, SupplyLayout
+
+SYS_DESCR_OID = "1.3.6.1.2.1.1.1.0"
+SERIAL_OID = "1.3.6.1.2.1.43.5.1.1.17.1"
+ERROR_STATE_OID = "1.3.6.1.2.1.25.3.5.1.2.1"
+SUPPLY_DESC_OID = "1.3.6.1.2.1.43.11.1.1.6.1"
+SUPPLY_MAX_OID = "1.3.6.1.2.1.43.11.1.1.8.1"
+SUPPLY_LEVEL_OID = "1.3.6.1.2.1.43.11.1.1.9.1"
+IDENTITY_OIDS = (SYS_DESCR_OID, SERIAL_OID, ERROR_STATE_OID)
+MISSING_VALUES = ("NoSuchObject", "NoSuchInstance", "EndOfMibView")
 
 class PollingError(Exception):
     """Raised when we cannot obtain SNMP status from a printer."""
@@ -36,6 +51,16 @@ class PollResult:
     errors: List[str] = field(default_factory=list)
     ok: bool = True
     message: str = ""
+    # Credentials that answered, remembered on the printer for the next poll
+    community: Optional[str] = None
+    mp_model: Optional[int] = None
+    # sysDescr and supply indexes, cached per model as a SupplyLayout
+    model: Optional[str] = None
+    supplies: List[Dict[str, object]] = field(default_factory=list)
+    layout_hit: bool = False
+    # Milliseconds per phase ("cached", "identify", "supplies", "total") and SNMP requests sent
+    timings: Dict[str, float] = field(default_factory=dict)
+    round_trips: int = 0
 
     def to_levels(self) -> Dict[str, Optional[float]]:
         return {
@@ -99,201 +124,444 @@ def _safe_percent(level: Optional[int], maximum: Optional[int]) -> Optional[floa
     except Exception:
         return None
 
-def poll_printer(printer: Printer) -> PollResult:
-    if CommunityData is None:
-        raise PollingError("pysnmp not installed or import failed.")
-
-    host = printer.ip_address
-    port = printer.snmp_port or 161
-    community_candidates = []
+def _credential_candidates(printer: Printer) -> List[Tuple[str, int]]:
+    """(community, mpModel) pairs to try, the last combination that worked first."""
+    communities = []
     if printer.community:
-        community_candidates.append(printer.community)
-    if "public" not in community_candidates:
-        community_candidates.append("public")
+        communities.append(printer.community)
+    if "public" not in communities:
+        communities.append("public")
+    candidates = [(community, mp_model) for community in communities for mp_model in (1, 0)]  # v2c, then v1
+    last_good = (printer.last_community, printer.last_snmp_version)
+    if last_good in candidates:
+        candidates.remove(last_good)
+        candidates.insert(0, last_good)
+    return candidates
+
+
+class PollTimings:
+    """Milliseconds per phase and SNMP round trips of one poll."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.round_trips = 0
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.phases[name] = round(self.phases.get(name, 0) + elapsed, 1)
+
+
+def _value(var_bind) -> Optional[object]:
+    value = var_bind[1]
+    return None if value.__class__.__name__ in MISSING_VALUES else value
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except Exception:
+        return None
+
 
-    async def wake_printer(engine, community, target, context) -> bool:
+async def _get_values(engine, community, target, context, oids: Sequence[str], timings: PollTimings) -> Optional[List]:
+    """
+    One GET of all `oids`; None stands for the ones the agent does not have.
+    Raises PollingError when the agent does not answer at all (timeout or
+    wrong community) so the caller moves on to the next credentials.
+    SNMPv1 fails the whole request on the first unknown OID (noSuchName
+    with its error-index): that OID is dropped and the rest asked again.
+    Returns None if the agent rejects the request for any other reason.
+    """
+    values: List = [None] * len(oids)
+    pending = list(range(len(oids)))
+    while pending:
+        timings.round_trips += 1
         try:
             res = await get_cmd(
                 engine,
                 community,
                 target,
                 context,
-                ObjectType(ObjectIdentity("1.3.6.1.2.1.1.1.0")),
+                *(ObjectType(ObjectIdentity(oids[position])) for position in pending),
+                lookupMib=False,
             )
-            if res:
-                err_ind, err_status, _, _ = res
-                return not err_ind and not err_status
-        except Exception:
-            return False
-        return False
-
-    async def walk_values(engine, community, target, context, oid: str) -> Dict[int, int]:
-        results: Dict[int, int] = {}
-        async for (error_indication, error_status, error_index, var_binds) in walk_cmd(
-            engine,
-            community,
-            target,
-            context,
-            ObjectType(ObjectIdentity(oid)),
-            lexicographicMode=False,
-        ):
-            if error_indication:
-                raise PollingError(str(error_indication))
-            if error_status:
-                raise PollingError(error_status.prettyPrint())
-            try:
-                current_oid = var_binds[0][0].prettyPrint()
-                index = int(current_oid.split(".")[-1])
-                value = int(var_binds[0][1])
-            except Exception:
+        except Exception as exc:
+            raise PollingError(str(exc)) from exc
+        err_ind, err_status, err_index, var_binds = res
+        if err_ind:
+            raise PollingError(str(err_ind))
+        if err_status:
+            if str(err_status) == "noSuchName" and 0 < int(err_index) <= len(pending):
+                del pending[int(err_index) - 1]
                 continue
-            results[index] = value
-        return results
-
-    async def _async_poll(community_str: str, mp_model: int) -> PollResult:
-        engine = SnmpEngine()
-        community = CommunityData(community_str, mpModel=mp_model)
-        target = await UdpTransportTarget.create(
-            (host, port),
-            timeout=3,
-            retries=1,
-        )
-        context = ContextData()
-
-        async def read_once() -> Dict[str, any]:
-            timeout = 1 if mp_model == 1 else 0.5 # Faster for scan
-            target_with_timeout = await UdpTransportTarget.create(
-                (host, port),
-                timeout=timeout,
-                retries=0,
-            )
-            desc_map = await walk_values(engine, community, target_with_timeout, context, "1.3.6.1.2.1.43.11.1.1.6.1")
-            level_map = await walk_values(engine, community, target_with_timeout, context, "1.3.6.1.2.1.43.11.1.1.9.1")
-            max_map = await walk_values(engine, community, target, context, "1.3.6.1.2.1.43.11.1.1.8.1")
-            supplies = []
-            for index in sorted(level_map.keys()):
-                supplies.append(
-                    {
-                        "index": index,
-                        "description": desc_map.get(index, ""),
-                        "level": level_map.get(index),
-                        "maximum": max_map.get(index),
-                    }
-                )
-            return {"supplies": supplies, "desc_map": desc_map, "level_map": level_map, "max_map": max_map}
-
-        supplies = []
-        desc_map = {}
-        level_map = {}
-        max_map = {}
-        serial_number = None
-        wake_result = await wake_printer(engine, community, target, context)
+            return None
+        if len(var_binds) != len(pending):
+            return None
+        for position, var_bind in zip(pending, var_binds):
+            values[position] = _value(var_bind)
+        break
+    return values
+
+
+async def _walk_values(engine, community, target, context, oid: str, timings: PollTimings) -> Dict[int, object]:
+    results: Dict[int, object] = {}
+    timings.round_trips += 1  # the last GETNEXT leaves the subtree
+    async for (error_indication, error_status, error_index, var_binds) in walk_cmd(
+        engine,
+        community,
+        target,
+        context,
+        ObjectType(ObjectIdentity(oid)),
+        lexicographicMode=False,
+        lookupMib=False,
+    ):
+        timings.round_trips += 1
+        if error_indication:
+            raise PollingError(str(error_indication))
+        if error_status:
+            raise PollingError(error_status.prettyPrint())
         try:
-            serial_res = await get_cmd(
-                engine,
-                community,
-                target,
-                context,
-                ObjectType(ObjectIdentity("1.3.6.1.2.1.43.5.1.1.17.1")),
-            )
-            if serial_res:
-                err_ind, err_status, _, vb = serial_res
-                if not err_ind and not err_status:
-                    serial_number = str(vb[0][1]).strip()
+            index = int(var_binds[0][0][-1])
         except Exception:
-            pass
-        data = await read_once()
-        supplies = data["supplies"]
-        desc_map = data["desc_map"]
-        level_map = data["level_map"]
-        max_map = data["max_map"]
-        connected = wake_result or bool(supplies)
-
-        errors: List[str] = []
+            continue
+        results[index] = var_binds[0][1]
+    return results
+
+
+async def _bulk_columns(
+    engine, community, target, context, columns: Sequence[str], timings: PollTimings, max_repetitions: int
+) -> List[Dict[int, object]]:
+    """
+    Reads whole table columns with GETBULK, all columns in the same request
+    and `max_repetitions` rows per response. Returns {index: value} per column.
+    """
+    prefixes = [tuple(int(part) for part in column.split(".")) for column in columns]
+    results: List[Dict[int, object]] = [{} for _ in columns]
+    cursors = list(prefixes)
+    pending = list(range(len(columns)))
+    while pending:
+        timings.round_trips += 1
         try:
-            result = await get_cmd(
+            res = await bulk_cmd(
                 engine,
                 community,
                 target,
                 context,
-                ObjectType(ObjectIdentity("1.3.6.1.2.1.25.3.5.1.2.1")),
+                0,
+                max_repetitions,
+                *(ObjectType(ObjectIdentity(cursors[column])) for column in pending),
+                lookupMib=False,
+            )
+        except Exception as exc:
+            raise PollingError(str(exc)) from exc
+        err_ind, err_status, _, var_binds = res
+        if err_ind:
+            raise PollingError(str(err_ind))
+        if err_status:
+            if str(err_status) == "tooBig" and max_repetitions > 1:
+                max_repetitions //= 2  # response over the agent's PDU size: ask for fewer rows
+                continue
+            raise PollingError(err_status.prettyPrint())
+
+        # The response is row-major: one var-bind per pending column, per row
+        width = len(pending)
+        advanced = set()
+        finished = set()
+        for position, var_bind in enumerate(var_binds):
+            column = pending[position % width]
+            if column in finished:
+                continue
+            oid = tuple(var_bind[0])
+            prefix = prefixes[column]
+            if _value(var_bind) is None or oid[:len(prefix)] != prefix or oid <= cursors[column]:
+                finished.add(column)
+                continue
+            results[column][oid[-1]] = var_bind[1]
+            cursors[column] = oid
+            advanced.add(column)
+        # A column stays open while its rows filled the response without leaving it
+        pending = [column for column in pending if column in advanced and column not in finished]
+    return results
+
+
+def _layout_oids(layout: SupplyLayout) -> List[str]:
+    oids = list(IDENTITY_OIDS)
+    for supply in layout.supplies:
+        oids.append(f"{SUPPLY_LEVEL_OID}.{supply['index']}")
+        oids.append(f"{SUPPLY_MAX_OID}.{supply['index']}")
+    return oids
+
+
+async def _poll_once(
+    engine,
+    printer: Printer,
+    community_str: str,
+    mp_model: int,
+    layout: Optional[SupplyLayout] = None,
+    bulk: bool = True,
+) -> PollResult:
+    """
+    One SNMP read of the printer with a single community/version.
+
+    With a cached `layout` of the printer model everything (identity, error
+    state and every supply level/max) comes back in a single multi-OID GET.
+    Otherwise one GET identifies the printer and the supply table is read
+    with GETBULK (v2c) or walked (v1, or `bulk=False`).
+    """
+    host = printer.ip_address
+    port = printer.snmp_port or 161
+    community = CommunityData(community_str, mpModel=mp_model)
+    target = await UdpTransportTarget.create(
+        (host, port),
+        timeout=3,
+        retries=1,
+    )
+    context = ContextData()
+    timings = PollTimings()
+
+    identity = None
+    supplies: List[Dict[str, object]] = []
+    layout_hit = False
+    if layout is not None and layout.supplies:
+        with timings.phase("cached"):
+            values = await _get_values(engine, community, target, context, _layout_oids(layout), timings)
+        if values is not None:
+            identity, readings = values[:len(IDENTITY_OIDS)], values[len(IDENTITY_OIDS):]
+            same_model = identity[0] is not None and str(identity[0]).strip()[:255] == layout.model
+            # The layout holds every index seen on the model: skip the ones this unit lacks
+            if same_model and any(value is not None for value in readings[0::2]):
+                layout_hit = True
+                for position, supply in enumerate(layout.supplies):
+                    if readings[2 * position] is None:
+                        continue
+                    supplies.append({
+                        "index": supply["index"],
+                        "description": supply.get("description", ""),
+                        "level": _to_int(readings[2 * position]),
+                        "maximum": _to_int(readings[2 * position + 1]),
+                    })
+
+    if identity is None:
+        with timings.phase("identify"):
+            identity = await _get_values(engine, community, target, context, IDENTITY_OIDS, timings)
+        if identity is None:
+            raise PollingError("El agente SNMP rechazó la consulta.")
+
+    if not layout_hit:
+        with timings.phase("supplies"):
+            if bulk and mp_model == 1:
+                desc_map, max_map, level_map = await _bulk_columns(
+                    engine, community, target, context,
+                    (SUPPLY_DESC_OID, SUPPLY_MAX_OID, SUPPLY_LEVEL_OID),
+                    timings, settings.PRINTERS_SNMP_MAX_REPETITIONS,
+                )
+            else:
+                timeout = 1 if mp_model == 1 else 0.5 # Faster for scan
+                target_with_timeout = await UdpTransportTarget.create(
+                    (host, port),
+                    timeout=timeout,
+                    retries=0,
+                )
+                desc_map = await _walk_values(engine, community, target_with_timeout, context, SUPPLY_DESC_OID, timings)
+                level_map = await _walk_values(engine, community, target_with_timeout, context, SUPPLY_LEVEL_OID, timings)
+                max_map = await _walk_values(engine, community, target, context, SUPPLY_MAX_OID, timings)
+        for index in sorted(level_map.keys()):
+            supplies.append(
+                {
+                    "index": index,
+                    "description": str(desc_map.get(index, "")),
+                    "level": _to_int(level_map.get(index)),
+                    "maximum": _to_int(max_map.get(index)),
+                }
             )
-            if result:
-                error_indication, error_status, _, var_binds = result
-                if not error_indication and not error_status:
-                    decoded_errors = _decode_error_state(var_binds[0][1])
-                    errors.extend(decoded_errors)
-        except Exception:
-            pass
 
-        color_levels: Dict[str, Optional[float]] = {
-            "black": None,
-            "cyan": None,
-            "magenta": None,
-            "yellow": None,
-        }
+    sys_descr, serial_value, error_value = identity
+    wake_result = sys_descr is not None
+    serial_number = str(serial_value).strip() if serial_value is not None else None
+    connected = wake_result or bool(supplies)
 
-        index_color_map = {
-            1: "black",
-            2: "cyan",
-            3: "magenta",
-            4: "yellow",
-        }
+    errors: List[str] = []
+    if error_value is not None:
+        errors.extend(_decode_error_state(error_value))
 
-        for supply in supplies:
-            color = _guess_color(supply["description"])
-            if not color and printer.type == Printer.TYPE_COLOR:
-                color = index_color_map.get(supply["index"])
-            if not color:
-                continue
-            percent = _safe_percent(supply["level"], supply["maximum"])
-            if color_levels[color] is None:
-                color_levels[color] = percent
-
-        if printer.type == Printer.TYPE_BW and supplies and color_levels["black"] is None:
-            first_supply = supplies[0]
-            color_levels["black"] = _safe_percent(first_supply["level"], first_supply["maximum"])
-
-        messages = []
-        is_ok = not errors and bool(supplies)
-        if errors:
-            messages.append(", ".join(errors))
-        if not supplies:
-            messages.append("No se encontraron datos de consumibles.")
-
-        return PollResult(
-            black=color_levels["black"],
-            cyan=color_levels["cyan"],
-            magenta=color_levels["magenta"],
-            yellow=color_levels["yellow"],
-            errors=errors,
-            ok=is_ok,
-            message="; ".join(messages) if messages else "OK",
-            serial_number=serial_number,
-            connected=connected,
-            woke=wake_result,
-        )
+    color_levels: Dict[str, Optional[float]] = {
+        "black": None,
+        "cyan": None,
+        "magenta": None,
+        "yellow": None,
+    }
+
+    index_color_map = {
+        1: "black",
+        2: "cyan",
+        3: "magenta",
+        4: "yellow",
+    }
+
+    for supply in supplies:
+        color = _guess_color(supply["description"])
+        if not color and printer.type == Printer.TYPE_COLOR:
+            color = index_color_map.get(supply["index"])
+        if not color:
+            continue
+        percent = _safe_percent(supply["level"], supply["maximum"])
+        if color_levels[color] is None:
+            color_levels[color] = percent
+
+    if printer.type == Printer.TYPE_BW and supplies and color_levels["black"] is None:
+        first_supply = supplies[0]
+        color_levels["black"] = _safe_percent(first_supply["level"], first_supply["maximum"])
+
+    messages = []
+    is_ok = not errors and bool(supplies)
+    if errors:
+        messages.append(", ".join(errors))
+    if not supplies:
+        messages.append("No se encontraron datos de consumibles.")
+
+    return PollResult(
+        black=color_levels["black"],
+        cyan=color_levels["cyan"],
+        magenta=color_levels["magenta"],
+        yellow=color_levels["yellow"],
+        errors=errors,
+        ok=is_ok,
+        message="; ".join(messages) if messages else "OK",
+        serial_number=serial_number,
+        connected=connected,
+        woke=wake_result,
+        community=community_str,
+        mp_model=mp_model,
+        model=str(sys_descr).strip()[:255] if sys_descr is not None else None,
+        supplies=[{"index": supply["index"], "description": supply["description"]} for supply in supplies],
+        layout_hit=layout_hit,
+        timings=timings.phases,
+        round_trips=timings.round_trips,
+    )
 
+
+async def poll_printer_async(
+    engine,
+    printer: Printer,
+    deadline: Optional[float] = None,
+    layout: Optional[SupplyLayout] = None,
+) -> PollResult:
+    """
+    Polls one printer on the running loop with `engine`, trying every
+    community/version (last good one first) and then the snmpwalk CLI.
+    `deadline` (loop time) bounds the CLI fallback, which runs in a thread.
+    `layout` is the cached SupplyLayout of the printer model, if any.
+    """
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
     last_error: Optional[Exception] = None
-    for community_str in community_candidates:
-        for mp_model in (1, 0):  # v2c first, then fallback to v1
-            try:
-                import asyncio
-                return asyncio.run(_async_poll(community_str, mp_model))
-            except Exception as exc:
-                last_error = exc
-                continue
-    
+    candidates = _credential_candidates(printer)
+    for community_str, mp_model in candidates:
+        try:
+            result = await _poll_once(engine, printer, community_str, mp_model, layout=layout)
+        except Exception as exc:
+            last_error = exc
+            continue
+        result.timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
     # Fallback to snmpwalk CLI
-    for community_str in community_candidates:
-        cli_result = _poll_with_snmpwalk(host, port, community_str)
+    for community_str in dict.fromkeys(community for community, _ in candidates):
+        timeout = 10.0
+        if deadline is not None:
+            timeout = min(timeout, (deadline - loop.time()) / 4)
+            if timeout <= 0:
+                break
+        cli_result = await asyncio.to_thread(
+            _poll_with_snmpwalk, printer.ip_address, printer.snmp_port or 161, community_str, timeout
+        )
         if cli_result:
+            cli_result.community = community_str
+            cli_result.mp_model = 0
+            cli_result.timings["total"] = round((time.perf_counter() - started) * 1000, 1)
             return cli_result
     if last_error:
         raise PollingError(str(last_error)) from last_error
     raise PollingError("Could not obtain SNMP data.")
 
-def _poll_with_snmpwalk(host: str, port: int, community: str) -> Optional[PollResult]:
+
+def _load_layouts(printers: Sequence[Printer]) -> Dict[int, SupplyLayout]:
+    """Cached SupplyLayouts of the printers, skipping those older than PRINTERS_SUPPLY_LAYOUT_TTL."""
+    ids = {printer.supply_layout_id for printer in printers if printer.supply_layout_id}
+    if not ids:
+        return {}
+    fresh_since = timezone.now() - timedelta(seconds=settings.PRINTERS_SUPPLY_LAYOUT_TTL)
+    return SupplyLayout.objects.filter(pk__in=ids, updated_at__gte=fresh_since).in_bulk()
+
+
+def poll_printer(printer: Printer) -> PollResult:
+    if CommunityData is None:
+        raise PollingError("pysnmp not installed or import failed.")
+    layout = _load_layouts([printer]).get(printer.supply_layout_id)
+
+    async def run() -> PollResult:
+        engine = SnmpEngine()
+        try:
+            return await poll_printer_async(engine, printer, layout=layout)
+        finally:
+            engine.close_dispatcher()
+
+    return asyncio.run(run())
+
+
+def poll_fleet(
+    printers: Sequence[Printer],
+    deadline: Optional[float] = None,
+    concurrency: Optional[int] = None,
+) -> Dict[int, Union[PollResult, Exception]]:
+    """
+    Polls all printers concurrently on one event loop with a shared
+    SnmpEngine. Each printer gets `deadline` seconds (PRINTERS_POLL_DEADLINE)
+    once it starts; at most `concurrency` (PRINTERS_POLL_CONCURRENCY) run at
+    the same time. Returns {printer.pk: PollResult or the exception}.
+    """
+    if CommunityData is None:
+        raise PollingError("pysnmp not installed or import failed.")
+    deadline = deadline or settings.PRINTERS_POLL_DEADLINE
+    concurrency = concurrency or settings.PRINTERS_POLL_CONCURRENCY
+    layouts = _load_layouts(printers)
+
+    async def run() -> List[Union[PollResult, Exception]]:
+        loop = asyncio.get_running_loop()
+        engine = SnmpEngine()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def poll_one(printer: Printer) -> Union[PollResult, Exception]:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(
+                        poll_printer_async(
+                            engine,
+                            printer,
+                            deadline=loop.time() + deadline,
+                            layout=layouts.get(printer.supply_layout_id),
+                        ),
+                        timeout=deadline,
+                    )
+                except asyncio.TimeoutError:
+                    return PollingError(f"Sin respuesta SNMP en {deadline:g} s.")
+                except Exception as exc:
+                    return exc
+
+        try:
+            return await asyncio.gather(*(poll_one(printer) for printer in printers))
+        finally:
+            engine.close_dispatcher()
+
+    results = asyncio.run(run()) if printers else []
+    return {printer.pk: result for printer, result in zip(printers, results)}
+
+def _poll_with_snmpwalk(host: str, port: int, community: str, timeout: float = 10) -> Optional[PollResult]:
     def run_walk(oid: str) -> Dict[int, str]:
         try:
             result = subprocess.run(
@@ -301,7 +569,7 @@ def _poll_with_snmpwalk(host: str, port: int, community: str) -> Optional[PollRe
                 check=False,
                 capture_output=True,
                 text=True,
-                timeout=10,
+                timeout=timeout,
             )
         except FileNotFoundError:
             return {}
@@ -388,9 +656,26 @@ def _poll_with_snmpwalk(host: str, port: int, community: str) -> Optional[PollRe
         message="OK (snmpwalk fallback)" if supplies else "No supplies found via snmpwalk.",
     )
 
-def poll_and_store_printer(printer: Printer) -> PollResult:
-    result = poll_printer(printer)
-    printer.last_check = timezone.now()
+POLL_FIELDS = [
+    "last_check",
+    "last_ok",
+    "last_message",
+    "last_black",
+    "last_cyan",
+    "last_magenta",
+    "last_yellow",
+    "last_errors",
+    "serial_number",
+    "last_connected",
+    "last_woke",
+    "last_community",
+    "last_snmp_version",
+    "supply_layout",
+]
+
+
+def _apply_result(printer: Printer, result: PollResult, checked_at) -> None:
+    printer.last_check = checked_at
     printer.last_ok = result.ok
     printer.last_message = result.message
     printer.last_black = result.black
@@ -402,90 +687,74 @@ def poll_and_store_printer(printer: Printer) -> PollResult:
         printer.serial_number = result.serial_number
     printer.last_connected = result.connected
     printer.last_woke = result.woke
-    printer.save(
-        update_fields=[
-            "last_check",
-            "last_ok",
-            "last_message",
-            "last_black",
-            "last_cyan",
-            "last_magenta",
-            "last_yellow",
-            "last_errors",
-            "serial_number",
-            "last_connected",
-            "last_woke",
-        ]
+    if result.community is not None:
+        printer.last_community = result.community
+        printer.last_snmp_version = result.mp_model
+
+
+def _store_layouts(printers: Sequence[Printer], results: Dict[int, Union[PollResult, Exception]]) -> None:
+    """
+    Merges the supply indexes read by full polls into the SupplyLayout of
+    each model. Units of one model may differ (optional drums, trays), so a
+    layout keeps every index seen and cached reads skip the missing ones.
+    """
+    fresh: Dict[str, Dict[int, Dict[str, object]]] = {}
+    for printer in printers:
+        outcome = results.get(printer.pk)
+        if isinstance(outcome, PollResult) and outcome.model and outcome.supplies and not outcome.layout_hit:
+            seen = fresh.setdefault(outcome.model, {})
+            for supply in outcome.supplies:
+                seen[supply["index"]] = supply
+    if not fresh:
+        return
+    for model, supplies in SupplyLayout.objects.filter(model__in=fresh).values_list("model", "supplies"):
+        for supply in supplies:
+            fresh[model].setdefault(supply["index"], supply)
+    SupplyLayout.objects.bulk_create(
+        [
+            SupplyLayout(model=model, supplies=[seen[index] for index in sorted(seen)])
+            for model, seen in fresh.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["model"],
+        update_fields=["supplies", "updated_at"],
     )
-    return result
+    ids = dict(SupplyLayout.objects.filter(model__in=fresh).values_list("model", "id"))
+    for printer in printers:
+        outcome = results.get(printer.pk)
+        if isinstance(outcome, PollResult) and outcome.model in ids:
+            printer.supply_layout_id = ids[outcome.model]
 
-async def probe_ip(ip: str, community: str = "public") -> Optional[Dict[str, str]]:
-    """Probes a single IP for SNMP printer info."""
-    if CommunityData is None:
-        return None
-    
-    engine = SnmpEngine()
-    comm_data = CommunityData(community, mpModel=1) # v2c
-    try:
-        target = await UdpTransportTarget.create((ip, 161), timeout=0.5, retries=0)
-        # Try to get sysDescr and Printer Name
-        res = await get_cmd(
-            engine,
-            comm_data,
-            target,
-            ContextData(),
-            ObjectType(ObjectIdentity("1.3.6.1.2.1.1.1.0")), # sysDescr
-            ObjectType(ObjectIdentity("1.3.6.1.2.1.43.5.1.1.16.1")), # prtGeneralPrinterName
-        )
-        if res:
-            err_ind, err_status, _, vb = res
-            if not err_ind and not err_status:
-                descr = str(vb[0][1])
-                name = str(vb[1][1]) if len(vb) > 1 else "Unknown Printer"
-                # If name is "0" or empty, use descr snippet
-                if name in ("0", ""):
-                    name = descr[:30] + "..." if len(descr) > 30 else descr
-                
-                # Check if it looks like a printer
-                is_printer = any(x in descr.lower() for x in ["printer", "laserjet", "designjet", "epson", "canon", "brother", "ricoh", "lexmark", "xerox", "konica", "kyocera", "sharp"])
-                if is_printer:
-                    return {
-                        "ip": ip,
-                        "name": name.strip(),
-                        "description": descr.strip(),
-                    }
-    except Exception:
-        pass
-    return None
 
-import ipaddress
+def poll_and_store_printer(printer: Printer) -> PollResult:
+    result = poll_printer(printer)
+    _store_layouts([printer], {printer.pk: result})
+    _apply_result(printer, result, timezone.now())
+    printer.save(update_fields=POLL_FIELDS)
+    return result
 
-def scan_network_range(start_ip: str, end_ip: str, community: str = "public") -> List[Dict[str, str]]:
-    """Scans a range of IPs for SNMP printers."""
-    try:
-        start = ipaddress.IPv4Address(start_ip)
-        end = ipaddress.IPv4Address(end_ip)
-    except ValueError:
-        return []
 
-    found = []
-    
-    async def run_scan():
-        tasks = []
-        # Limit to 255 IPs to avoid overflow/long wait
-        count = 0
-        current = start
-        while current <= end and count < 256:
-            tasks.append(probe_ip(str(current), community))
-            current += 1
-            count += 1
-        
-        import asyncio
-        results = await asyncio.gather(*tasks)
-        return [r for r in results if r]
-
-    import asyncio
-    try:
-        return asyncio.run(run_scan())
-    except Exception:
-        return []
+def store_fleet_results(printers: Sequence[Printer], results: Dict[int, Union[PollResult, Exception]]) -> int:
+    """
+    Writes the outcome of `poll_fleet` with a single bulk_update (after
+    upserting the supply layouts read by full polls). Printers
+    that did not answer keep their last levels and are marked unreachable.
+    """
+    checked_at = timezone.now()
+    _store_layouts(printers, results)
+    touched = []
+    for printer in printers:
+        outcome = results.get(printer.pk)
+        if isinstance(outcome, PollResult):
+            _apply_result(printer, outcome, checked_at)
+        elif outcome is not None:
+            printer.last_check = checked_at
+            printer.last_ok = False
+            printer.last_message = str(outcome)
+            printer.last_connected = False
+        else:
+            continue
+        touched.append(printer)
+    if touched:
+        Printer.objects.bulk_update(touched, POLL_FIELDS)
+    return sum(1 for printer in touched if isinstance(results[printer.pk], PollResult))
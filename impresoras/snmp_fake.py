@@ -0,0 +1,190 @@
+"""
+Simulated SNMP agent (v1/v2c) for local tests of the printer poller.
+
+Runs a UDP responder in a thread that answers GET, GETNEXT and GETBULK
+from an in-memory OID table, optionally with a fixed per-request latency to
+imitate the WAN links to the schools, and counts every request received.
+
+    with FakeSnmpAgent(printer_oids(black=(40, 100))) as agent:
+        printer = Printer(ip_address="127.0.0.1", snmp_port=agent.port, ...)
+        poll_printer(printer)
+        assert agent.requests["GET"] > 0
+"""
+import asyncio
+import bisect
+import threading
+from collections import Counter
+
+from pyasn1.codec.ber import decoder, encoder
+from pysnmp.proto import api
+from pysnmp.proto.rfc1902 import Integer, ObjectName, OctetString
+
+
+def _oid(text):
+    return tuple(int(part) for part in text.strip(".").split("."))
+
+
+def printer_oids(
+    black=(40, 100), cyan=None, magenta=None, yellow=None, serial="SN-FAKE", error_bits=0,
+    descr="FAKE LaserJet printer", extra_supplies=0,
+):
+    """
+    OID table of a Printer-MIB device; each color is (level, maximum).
+    `extra_supplies` adds drums/fusers after the toners (longer supply table).
+    """
+    table = {
+        "1.3.6.1.2.1.1.1.0": OctetString(descr),
+        "1.3.6.1.2.1.43.5.1.1.16.1": OctetString("Fake Printer"),
+        "1.3.6.1.2.1.43.5.1.1.17.1": OctetString(serial),
+        "1.3.6.1.2.1.25.3.5.1.2.1": OctetString(error_bits.to_bytes(2, "big")),
+    }
+    supplies = [("Black Toner", black), ("Cyan Toner", cyan), ("Magenta Toner", magenta), ("Yellow Toner", yellow)]
+    supplies += [(f"Imaging Unit {number}", (80, 100)) for number in range(1, extra_supplies + 1)]
+    for index, (description, values) in enumerate(supplies, start=1):
+        if values is None:
+            continue
+        level, maximum = values
+        table[f"1.3.6.1.2.1.43.11.1.1.6.1.{index}"] = OctetString(description)
+        table[f"1.3.6.1.2.1.43.11.1.1.8.1.{index}"] = Integer(maximum)
+        table[f"1.3.6.1.2.1.43.11.1.1.9.1.{index}"] = Integer(level)
+    return table
+
+
+class _Protocol(asyncio.DatagramProtocol):
+    def __init__(self, agent):
+        self.agent = agent
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        reply = self.agent._handle(data)
+        if reply is None:
+            return
+        if self.agent.latency:
+            asyncio.get_running_loop().call_later(self.agent.latency, self.transport.sendto, reply, addr)
+        else:
+            self.transport.sendto(reply, addr)
+
+
+class FakeSnmpAgent:
+    def __init__(self, oids, community="public", latency=0.0, host="127.0.0.1", port=0, v1=True):
+        self.table = {_oid(k): v for k, v in oids.items()}
+        self.keys = sorted(self.table)
+        self.community = community
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.v1 = v1
+        self.requests = Counter()
+        self._loop = None
+        self._thread = None
+        self._transport = None
+
+    # -- lookups --------------------------------------------------------
+    def _next(self, oid):
+        position = bisect.bisect_right(self.keys, oid)
+        return self.keys[position] if position < len(self.keys) else None
+
+    def _handle(self, data):
+        try:
+            version = int(api.decodeMessageVersion(data))
+            if version not in api.PROTOCOL_MODULES or (version == api.SNMP_VERSION_1 and not self.v1):
+                return None
+            proto = api.PROTOCOL_MODULES[version]
+            message, _ = decoder.decode(data, asn1Spec=proto.Message())
+        except Exception:
+            return None
+        if str(proto.apiMessage.get_community(message)) != self.community:
+            return None  # wrong community: stay silent like real agents
+
+        request = proto.apiMessage.get_pdu(message)
+        response_message = proto.apiMessage.get_response(message)
+        response = proto.apiMessage.get_pdu(response_message)
+        proto.apiPDU.set_defaults(response)
+        var_binds = []
+        error_index = 0
+
+        requested = [tuple(oid) for oid, _ in proto.apiPDU.get_varbinds(request)]
+        if request.isSameTypeWith(proto.GetRequestPDU()):
+            self.requests["GET"] += 1
+            for position, oid in enumerate(requested, start=1):
+                value = self.table.get(oid)
+                if value is None:
+                    if version == api.SNMP_VERSION_1:
+                        proto.apiPDU.set_error_status(response, 2)
+                        error_index = error_index or position
+                        value = proto.Null("")
+                    else:
+                        value = proto.NoSuchInstance("")
+                var_binds.append((oid, value))
+        elif request.isSameTypeWith(proto.GetNextRequestPDU()):
+            self.requests["GETNEXT"] += 1
+            for position, oid in enumerate(requested, start=1):
+                following = self._next(oid)
+                if following is None:
+                    if version == api.SNMP_VERSION_1:
+                        proto.apiPDU.set_error_status(response, 2)
+                        error_index = error_index or position
+                        var_binds.append((oid, proto.Null("")))
+                    else:
+                        var_binds.append((oid, proto.EndOfMibView("")))
+                else:
+                    var_binds.append((following, self.table[following]))
+        elif version != api.SNMP_VERSION_1 and request.isSameTypeWith(proto.GetBulkRequestPDU()):
+            self.requests["GETBULK"] += 1
+            non_repeaters = int(proto.apiBulkPDU.get_non_repeaters(request))
+            max_repetitions = int(proto.apiBulkPDU.get_max_repetitions(request))
+            for oid in requested[:non_repeaters]:
+                following = self._next(oid)
+                var_binds.append((following or oid, self.table[following] if following else proto.EndOfMibView("")))
+            repeaters = requested[non_repeaters:]
+            cursors = list(repeaters)
+            for _ in range(max(0, max_repetitions)):
+                if not repeaters:
+                    break
+                done = True
+                for column, oid in enumerate(cursors):
+                    following = self._next(oid) if oid is not None else None
+                    if following is None:
+                        var_binds.append((oid or repeaters[column], proto.EndOfMibView("")))
+                        cursors[column] = None
+                    else:
+                        var_binds.append((following, self.table[following]))
+                        cursors[column] = following
+                        done = False
+                if done:
+                    break
+        else:
+            return None
+
+        if error_index:
+            proto.apiPDU.set_error_index(response, error_index)
+        proto.apiPDU.set_request_id(response, proto.apiPDU.get_request_id(request))
+        proto.apiPDU.set_varbinds(response, [(ObjectName(oid), value) for oid, value in var_binds])
+        return encoder.encode(response_message)
+
+    # -- lifecycle ------------------------------------------------------
+    def __enter__(self):
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._transport, _ = self._loop.run_until_complete(
+                self._loop.create_datagram_endpoint(lambda: _Protocol(self), local_addr=(self.host, self.port))
+            )
+            self.port = self._transport.get_extra_info("sockname")[1]
+            ready.set()
+            self._loop.run_forever()
+            self._transport.close()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, daemon=True, name="fake-snmp-agent")
+        self._thread.start()
+        ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
@@ -0,0 +1,22 @@
+import logging
+
+from django.conf import settings
+
+from core.cola import tarea
+from .monitoring import compact_history, monitor_fleet
+
+logger = logging.getLogger('tareas')
+
+
+@tarea('impresoras.monitorear', cada=settings.PRINTERS_MONITOR_INTERVAL, max_intentos=1)
+def monitorear_impresoras():
+    """Sondea la flota y guarda el estado y una muestra de toner por impresora."""
+    resumen = monitor_fleet()
+    logger.info("Monitoreo de impresoras: %s", resumen)
+
+
+@tarea('impresoras.compactar_historial', cada=24 * 3600, max_intentos=1)
+def compactar_historial():
+    """Promedia por hora/día las muestras antiguas y elimina las vencidas."""
+    resumen = compact_history()
+    logger.info("Historial de impresoras compactado: %s", resumen)
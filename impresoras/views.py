@@ -1,9 +1,28 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
+from core.cola import encolar
 from .models import Printer
 from .serializers import PrinterSerializer
-from .services import poll_and_store_printer, PollingError
+from .discovery import iter_discovery, parse_targets
+from .monitoring import COLORS, errors_from_mask, record_samples, toner_forecasts
+from .services import poll_fleet, store_fleet_results, PollingError
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets EventSource clients (Accept: text/event-stream) reach scan_stream."""
+    media_type = "text/event-stream"
+    format = "sse"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
 
 class PrinterViewSet(viewsets.ModelViewSet):
     queryset = Printer.objects.all().order_by("name")
@@ -15,42 +34,124 @@ class PrinterViewSet(viewsets.ModelViewSet):
     def refresh(self, request, pk=None):
         printer = self.get_object()
         try:
-            poll_and_store_printer(printer)
-            serializer = self.get_serializer(printer)
-            return Response({"success": True, "printer": serializer.data})
+            outcomes = poll_fleet([printer])
         except PollingError as exc:
             return Response({"success": False, "error": str(exc)}, status=status.HTTP_200_OK)
         except Exception as exc:
             return Response({"success": False, "error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        store_fleet_results([printer], outcomes)
+        record_samples([printer], outcomes)
+        outcome = outcomes[printer.pk]
+        if isinstance(outcome, Exception):
+            return Response({"success": False, "error": str(outcome)}, status=status.HTTP_200_OK)
+        serializer = self.get_serializer(printer)
+        return Response({
+            "success": True,
+            "printer": serializer.data,
+            "poll": {"round_trips": outcome.round_trips, "timings": outcome.timings, "layout_hit": outcome.layout_hit},
+        })
 
     @action(detail=False, methods=["post"])
     def refresh_all(self, request):
-        results = []
-        any_error = False
-        printers = self.get_queryset().filter(enabled=True)
-        for printer in printers:
-            try:
-                poll_and_store_printer(printer)
-                results.append({"id": printer.id, "ok": True})
-            except PollingError as exc:
-                any_error = True
-                results.append({"id": printer.id, "ok": False, "error": str(exc)})
-            except Exception as exc:
-                any_error = True
-                results.append({"id": printer.id, "ok": False, "error": str(exc)})
-        
-        return Response({"success": not any_error, "results": results})
+        # The fleet is polled by the 'impresoras.monitorear' task; this only
+        # moves the next run forward and answers with the cached state.
+        encolar("impresoras.monitorear", clave="impresoras:monitorear")
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response({"success": True, "queued": True, "printers": serializer.data}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def history(self, request, pk=None):
+        printer = self.get_object()
+        try:
+            days = min(int(request.query_params.get("days", 7)), settings.PRINTERS_HISTORY_DAYS)
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = printer.samples.filter(
+            taken_at__gte=timezone.now() - timedelta(days=days)
+        ).order_by("taken_at").values_list("taken_at", "resolution", "ok", "error_mask", *COLORS)
+        samples = [
+            {
+                "t": taken_at,
+                "resolution": resolution,
+                "ok": ok,
+                "errors": errors_from_mask(mask),
+                **dict(zip(COLORS, levels)),
+            }
+            for taken_at, resolution, ok, mask, *levels in rows
+        ]
+        return Response({"printer": printer.id, "days": days, "samples": samples})
+
+    @action(detail=True, methods=["get"])
+    def forecast(self, request, pk=None):
+        printer = self.get_object()
+        return Response({"printer": printer.id, "toner": toner_forecasts([printer])[printer.pk]})
+
+    @action(detail=False, methods=["get"])
+    def forecasts(self, request):
+        printers = list(self.get_queryset().filter(enabled=True))
+        return Response([
+            {"printer": pk, "toner": toner} for pk, toner in toner_forecasts(printers).items()
+        ])
+
+    @staticmethod
+    def _scan_spec(params):
+        """Targets of a scan: ?targets=cidr,start-end,ip or the legacy start_ip/end_ip."""
+        targets = params.get("targets") or params.get("cidr")
+        if targets:
+            return targets
+        start_ip, end_ip = params.get("start_ip"), params.get("end_ip")
+        if start_ip and end_ip:
+            return f"{start_ip}-{end_ip}"
+        return None
 
     @action(detail=False, methods=["post"])
     def scan(self, request):
-        start_ip = request.data.get("start_ip")
-        end_ip = request.data.get("end_ip")
+        spec = self._scan_spec(request.data)
         community = request.data.get("community", "public")
-        
-        if not start_ip or not end_ip:
-            return Response({"error": "Missing start_ip or end_ip"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        from .services import scan_network_range
-        found = scan_network_range(start_ip, end_ip, community)
-        
-        return Response({"success": True, "found": found})
+        if not spec:
+            return Response({"error": "Missing targets (or start_ip and end_ip)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            parse_targets(spec)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        found, summary = [], {}
+        try:
+            for kind, data in iter_discovery(spec, community):
+                if kind == "found":
+                    found.append(data)
+                elif kind == "done":
+                    summary = data
+        except PollingError as exc:
+            return Response({"success": False, "error": str(exc)}, status=status.HTTP_200_OK)
+        return Response({
+            "success": True,
+            "found": found,
+            "scanned": summary.get("scanned", 0),
+            "total": summary.get("total", 0),
+            "missing": summary.get("missing", []),
+        })
+
+    @action(detail=False, methods=["get"], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def scan_stream(self, request):
+        """Same scan as `scan`, streamed as Server-Sent Events (progress, found, done)."""
+        spec = self._scan_spec(request.query_params)
+        community = request.query_params.get("community", "public")
+        if not spec:
+            return Response({"error": "Missing targets (or start_ip and end_ip)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            parse_targets(spec)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def events():
+            try:
+                for kind, data in iter_discovery(spec, community):
+                    yield f"event: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+            except Exception as exc:
+                yield f"event: error\ndata: {json.dumps({'error': str(exc)})}\n\n"
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -1,1468 +1,206 @@
-import os
+"""
+Management command: sync_licitaciones
+Sincroniza las licitaciones de Mercado Público del organismo en la base
+local (LicitacionMP).
+
+  1. Listados por día en paralelo (RangeFetcher sobre el cliente MP
+     compartido: rate limit, reintentos y caché).
+  2. Con --full, enriquecimiento del detalle técnico con un pool acotado de
+     workers (MP_SYNC_ENRICH_WORKERS); se escribe por lotes.
+
+El avance queda en PuntoControlSync: la última fecha sincronizada completa y
+la cola de licitaciones pendientes de enriquecer, así una ejecución
+interrumpida se retoma donde quedó.
+
+Uso:
+    python manage.py sync_licitaciones --days 7 --full
+    python manage.py sync_licitaciones --since-last --full   # solo lo nuevo/cambiado
+"""
 import time
-from datetime import datetime, timedelta
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils.timezone import make_aware
-from licitaciones.models import LicitacionMP
+from django.db import close_old_connections
+
+from licitaciones.models import LicitacionMP, PuntoControlSync
+from licitaciones.mp_cache import get_cache
+from licitaciones.mp_client import get_client
+from licitaciones.mp_persist import ResultadoUpsert, upsert_licitaciones
+from licitaciones.mp_range import RangeFetcher
 from licitaciones.views import mercado_publico_request, normalize_mp_document
 
+LOTE_ENRIQUECIMIENTO = 50
+
+
 class Command(BaseCommand):
     help = 'Sincroniza licitaciones de Mercado Público para SLEP Iquique y las guarda en la base de datos local.'
 
     def add_arguments(self, parser):
         parser.add_argument('--days', type=int, default=7, help='Número de días hacia atrás para sincronizar')
         parser.add_argument('--full', action='store_true', help='Si se activa, también descarga el detalle técnico de cada licitación')
+        parser.add_argument('--since-last', action='store_true',
+                            help='Solo los días posteriores al último punto de control y las licitaciones que cambiaron')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Descargas de detalle en paralelo (default: MP_SYNC_ENRICH_WORKERS)')
+        parser.add_argument('--organismo', default='1820906', help='CodigoOrganismo (default: SLEP Iquique)')
 
     def handle(self, *args, **options):
-        days = options['days']
         do_full = options['full']
-        codigo_organismo = "1820906" # SLEP Iquique
-        
-        self.stdout.write(self.style.SUCCESS(f'Iniciando sincronización de los últimos {days} días...'))
-        
-        target_dates = []
-        for i in range(days + 1):
-            date_dt = datetime.now() - timedelta(days=i)
-            target_dates.append(date_dt.strftime('%d%m%Y'))
+        since_last = options['since_last']
+        codigo_organismo = options['organismo']
+        workers = options['workers'] or settings.MP_SYNC_ENRICH_WORKERS
 
-        for date_str in target_dates:
-            self.stdout.write(f"Consultando fecha: {date_str}...")
-            try:
-                basic_list = mercado_publico_request('licitaciones', {
-                    'fecha': date_str,
-                    'CodigoOrganismo': codigo_organismo
-                })
-                
-                if not basic_list:
-                    self.stdout.write(f"  - No hay resultados para {date_str}.")
-                    continue
+        punto, _ = PuntoControlSync.objects.get_or_create(clave=f'licitaciones:{codigo_organismo}')
+        hoy = date.today()
+        if since_last and punto.ultima_fecha_completa:
+            desde = min(hoy, punto.ultima_fecha_completa + timedelta(days=1))
+        else:
+            desde = hoy - timedelta(days=options['days'])
+        fechas = [desde + timedelta(days=i) for i in range((hoy - desde).days + 1)]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Iniciando sincronización del {desde:%d-%m-%Y} al {hoy:%d-%m-%Y} ({len(fechas)} días)...'
+        ))
+
+        client, cache = get_client(), get_cache()
+        llamadas_inicio = client.llamadas
+        cache_inicio = Counter(cache.stats)
+        inicio = time.monotonic()
+
+        # --- ETAPA 1: listados por día ---
+        total = ResultadoUpsert()
+        candidatos = []
+
+        def fetch_dia(date_str):
+            return mercado_publico_request('licitaciones', {'fecha': date_str, 'CodigoOrganismo': codigo_organismo})
 
-                self.stdout.write(f"  - Encontradas {len(basic_list)} licitaciones. Procesando...")
-                
-                for item_raw in basic_list:
-                    codigo = item_raw.get('CodigoExterno')
-                    if not codigo: continue
-                    
-                    normalized = normalize_mp_document(item_raw, has_full_detail=False)
-                    
-                    lic_obj, created = LicitacionMP.objects.update_or_create(
-                        codigo_externo=codigo,
-                        defaults={
-                            'nombre': normalized['Nombre'],
-                            'estado_nombre': normalized['Estado'],
-                            'codigo_estado': normalized['CodigoEstado'],
-                            'fecha_creacion': self.parse_iso_date(normalized['Fechas']['FechaCreacion']),
-                            'fecha_cierre': self.parse_iso_date(normalized['Fechas']['FechaCierre']),
-                            'json_data': normalized
-                        }
-                    )
-                    
-                    if do_full and not lic_obj.is_enriquecida:
-                        self.stdout.write(f"    -> Descargando detalle técnico para {codigo}...")
-                        full_results = mercado_publico_request('licitaciones', {'codigo': codigo})
-                        if full_results and len(full_results) > 0:
-                            full_norm = normalize_mp_document(full_results[0], has_full_detail=True)
-                            lic_obj.json_data = full_norm
-                            lic_obj.is_enriquecida = True
-                            lic_obj.save()
-                            self.stdout.write(self.style.SUCCESS(f"    [OK] {codigo} enriquecida."))
-                        time.sleep(1)
+        fetcher = RangeFetcher(fetch_dia, presupuesto=24 * 3600)
+        for date_str, nuevos in fetcher.iterar_sync([f.strftime('%d%m%Y') for f in fechas]):
+            normalizados = [normalize_mp_document(item, has_full_detail=False) for item in nuevos]
+            resultado = upsert_licitaciones(normalizados)
+            total.sumar(resultado)
+            self.stdout.write(f"  {date_str}: {resultado}")
+            for codigo, error in resultado.fallidos:
+                self.stdout.write(self.style.ERROR(f"    [ERROR] {codigo}: {error}"))
 
-                self.stdout.write(self.style.SUCCESS(f"Finalizado día {date_str}."))
-                
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Error procesando {date_str}: {str(e)}"))
-            
-            time.sleep(0.5)
+            if do_full:
+                # Nuevas o modificadas (estado, cierre) siempre; en modo completo
+                # también las del día que aún no tienen detalle
+                candidatos.extend(resultado.cambiados)
+                if not since_last:
+                    candidatos.extend(LicitacionMP.objects.filter(
+                        codigo_externo__in=[n['CodigoExterno'] for n in normalizados], is_enriquecida=False,
+                    ).values_list('codigo_externo', flat=True))
 
-        self.stdout.write(self.style.SUCCESS('Sincronización completada exitosamente.'))
+        for date_str in fetcher.fallidas + fetcher.pendientes:
+            self.stdout.write(self.style.ERROR(f"  {date_str}: no se pudo consultar; se reintentará en la próxima ejecución."))
 
-    def parse_iso_date(self, date_str):
-        if not date_str: return None
-        try:
-            dt = datetime.fromisoformat(date_str.replace('Z', ''))
-            return make_aware(dt)
-        except:
-            return None
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
- Riverside, 
-Riverside, 
+        punto.ultima_fecha_completa = self._avance(punto.ultima_fecha_completa, fechas, set(fetcher.dias_ok), hoy)
+        punto.save(update_fields=['ultima_fecha_completa', 'actualizado'])
+
+        # --- ETAPA 2: enriquecimiento en paralelo ---
+        enriquecidas = 0
+        if do_full:
+            pendientes = list(dict.fromkeys(list(punto.pendientes_enriquecer) + candidatos))
+            if punto.pendientes_enriquecer:
+                self.stdout.write(f"Retomando {len(punto.pendientes_enriquecer)} enriquecimientos pendientes de la ejecución anterior.")
+            punto.pendientes_enriquecer = pendientes
+            punto.save(update_fields=['pendientes_enriquecer', 'actualizado'])
+            enriquecidas = self._enriquecer(punto, workers)
+
+        # --- RESUMEN ---
+        duracion = max(time.monotonic() - inicio, 0.001)
+        cache_fin = cache.stats
+        ahorradas = sum(cache_fin[k] - cache_inicio[k] for k in ('hit', 'stale', 'coalesced'))
+        procesados = total.total + enriquecidas
+        resumen = {
+            'desde': desde.isoformat(),
+            'hasta': hoy.isoformat(),
+            'dias_ok': len(fetcher.dias_ok),
+            'dias_fallidos': len(fetcher.fallidas) + len(fetcher.pendientes),
+            'licitaciones': total.total,
+            'nuevas': total.creados,
+            'actualizadas': total.actualizados,
+            'sin_cambios': total.sin_cambios,
+            'errores': len(total.fallidos),
+            'enriquecidas': enriquecidas,
+            'pendientes_enriquecer': len(punto.pendientes_enriquecer),
+            'segundos': round(duracion, 1),
+            'items_por_segundo': round(procesados / duracion, 1),
+            'llamadas_api': client.llamadas - llamadas_inicio,
+            'llamadas_ahorradas_cache': ahorradas,
+        }
+        punto.ultimo_resumen = resumen
+        punto.save(update_fields=['ultimo_resumen', 'actualizado'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sincronización completada: {total}. {enriquecidas} enriquecidas, "
+            f"{resumen['pendientes_enriquecer']} pendientes de enriquecer."
+        ))
+        self.stdout.write(
+            f"  {procesados} items en {resumen['segundos']}s ({resumen['items_por_segundo']} items/s) | "
+            f"{resumen['llamadas_api']} llamadas a MP, {ahorradas} ahorradas por la caché | "
+            f"sincronizado completo hasta {punto.ultima_fecha_completa or '-'}"
+        )
+
+    @staticmethod
+    def _avance(actual, fechas, ok, hoy):
+        """Última fecha hasta la que todos los días están sincronizados (hoy nunca está completo)."""
+        for f in fechas:
+            if actual and f <= actual:
+                continue
+            if f >= hoy or f.strftime('%d%m%Y') not in ok:
+                break
+            if actual and f > actual + timedelta(days=1):
+                break
+            actual = f
+        return actual
+
+    def _enriquecer(self, punto, workers):
+        pendientes = list(punto.pendientes_enriquecer)
+        if not pendientes:
+            return 0
+        self.stdout.write(f"Descargando detalle técnico de {len(pendientes)} licitaciones ({workers} en paralelo)...")
+
+        def detalle(codigo):
+            try:
+                full_results = mercado_publico_request('licitaciones', {'codigo': codigo})
+                return normalize_mp_document(full_results[0], has_full_detail=True) if full_results else None
+            finally:
+                close_old_connections()
+
+        restantes = set(pendientes)
+        lote, enriquecidas = [], 0
+
+        def escribir():
+            nonlocal enriquecidas
+            resultado = upsert_licitaciones(lote)
+            fallidos = {codigo for codigo, _ in resultado.fallidos}
+            restantes.difference_update(n['CodigoExterno'] for n in lote if n['CodigoExterno'] not in fallidos)
+            enriquecidas += len(lote) - len(fallidos)
+            punto.pendientes_enriquecer = [c for c in pendientes if c in restantes]
+            punto.save(update_fields=['pendientes_enriquecer', 'actualizado'])
+            lote.clear()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futuros = {executor.submit(detalle, codigo): codigo for codigo in pendientes}
+            for futuro in as_completed(futuros):
+                codigo = futuros[futuro]
+                try:
+                    norm = futuro.result()
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f"    [PENDIENTE] {codigo}: {e}"))
+                    continue
+                if norm is None:
+                    # MP no tiene detalle para el código: no reintentar indefinidamente
+                    restantes.discard(codigo)
+                    continue
+                lote.append(norm)
+                if len(lote) >= LOTE_ENRIQUECIMIENTO:
+                    escribir()
+        escribir()
+        self.stdout.write(self.style.SUCCESS(f"    [OK] {enriquecidas} licitaciones enriquecidas."))
+        return enriquecidas
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licitaciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaMPCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('endpoint', models.CharField(max_length=50)),
+                ('params', models.JSONField(default=dict)),
+                ('payload', models.JSONField(blank=True, null=True)),
+                ('tamano', models.PositiveIntegerField(default=0, help_text='Bytes del payload serializado')),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('fresco_hasta', models.DateTimeField(help_text='Hasta cuándo se sirve sin revalidar')),
+                ('stale_hasta', models.DateTimeField(help_text='Hasta cuándo se puede servir mientras se revalida')),
+                ('ultimo_acceso', models.DateTimeField(db_index=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('refrescando_hasta', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Respuesta MP en caché',
+                'verbose_name_plural': 'Respuestas MP en caché',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licitaciones', '0002_respuestampcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='licitacionmp',
+            name='json_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 de json_data (ver mp_persist.py)', max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licitaciones', '0003_licitacionmp_json_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('ultima_fecha_completa', models.DateField(blank=True, null=True)),
+                ('pendientes_enriquecer', models.JSONField(blank=True, default=list)),
+                ('ultimo_resumen', models.JSONField(blank=True, default=dict)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Punto de control de sincronización',
+                'verbose_name_plural': 'Puntos de control de sincronización',
+            },
+        ),
+    ]
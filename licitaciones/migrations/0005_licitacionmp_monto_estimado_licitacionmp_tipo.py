@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licitaciones', '0004_puntocontrolsync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='licitacionmp',
+            name='monto_estimado',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='licitacionmp',
+            name='tipo',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50),
+        ),
+    ]
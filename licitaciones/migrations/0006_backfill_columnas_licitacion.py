@@ -0,0 +1,38 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+
+def _monto(valor):
+    if valor in (None, ''):
+        return None
+    try:
+        return Decimal(str(valor)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def backfill_columnas(apps, schema_editor):
+    LicitacionMP = apps.get_model('licitaciones', 'LicitacionMP')
+    lote = []
+    for lic in LicitacionMP.objects.only('pk', 'json_data').iterator(chunk_size=500):
+        data = lic.json_data or {}
+        lic.tipo = (data.get('Tipo') or '')[:50]
+        lic.monto_estimado = _monto(data.get('MontoEstimado'))
+        lote.append(lic)
+        if len(lote) >= 500:
+            LicitacionMP.objects.bulk_update(lote, ['tipo', 'monto_estimado'])
+            lote = []
+    if lote:
+        LicitacionMP.objects.bulk_update(lote, ['tipo', 'monto_estimado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licitaciones', '0005_licitacionmp_monto_estimado_licitacionmp_tipo'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_columnas, migrations.RunPython.noop),
+    ]
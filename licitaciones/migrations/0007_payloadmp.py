@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('licitaciones', '0006_backfill_columnas_licitacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayloadMP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('LIC', 'Licitación'), ('OC', 'Orden de Compra')], max_length=3)),
+                ('codigo_externo', models.CharField(max_length=50)),
+                ('datos', models.BinaryField(help_text='JSON comprimido con zlib')),
+                ('tamano', models.PositiveIntegerField(default=0, help_text='Bytes del JSON sin comprimir')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Payload crudo MP',
+                'verbose_name_plural': 'Payloads crudos MP',
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'codigo_externo'), name='payloadmp_tipo_codigo_unico')],
+            },
+        ),
+    ]
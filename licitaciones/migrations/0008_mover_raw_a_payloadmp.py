@@ -0,0 +1,46 @@
+import hashlib
+import json
+import zlib
+
+from django.db import migrations
+
+
+def _hash(json_data):
+    crudo = json.dumps(json_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(crudo.encode('utf-8')).hexdigest()
+
+
+def _mover(Modelo, PayloadMP, tipo):
+    pks = list(Modelo.objects.filter(json_data__has_key='_raw').values_list('pk', flat=True))
+    for i in range(0, len(pks), 200):
+        lote, payloads = [], []
+        for obj in Modelo.objects.filter(pk__in=pks[i:i + 200]).only('pk', 'codigo_externo', 'json_data'):
+            raw = obj.json_data.pop('_raw')
+            obj.json_hash = _hash(obj.json_data)
+            lote.append(obj)
+            if raw is not None:
+                crudo = json.dumps(raw, ensure_ascii=False, default=str).encode('utf-8')
+                payloads.append(PayloadMP(tipo=tipo, codigo_externo=obj.codigo_externo,
+                                          datos=zlib.compress(crudo, 6), tamano=len(crudo)))
+        Modelo.objects.bulk_update(lote, ['json_data', 'json_hash'])
+        PayloadMP.objects.bulk_create(payloads, ignore_conflicts=True)
+
+
+def mover_raw(apps, schema_editor):
+    PayloadMP = apps.get_model('licitaciones', 'PayloadMP')
+    _mover(apps.get_model('licitaciones', 'LicitacionMP'), PayloadMP, 'LIC')
+    _mover(apps.get_model('orden_compra', 'OrdenCompraMP'), PayloadMP, 'OC')
+
+
+class Migration(migrations.Migration):
+    # Tras aplicarla en PostgreSQL, VACUUM FULL licitaciones_licitacionmp y
+    # orden_compra_ordencompramp devuelve al disco el espacio liberado.
+
+    dependencies = [
+        ('licitaciones', '0007_payloadmp'),
+        ('orden_compra', '0004_backfill_columnas_oc'),
+    ]
+
+    operations = [
+        migrations.RunPython(mover_raw, migrations.RunPython.noop),
+    ]
@@ -8,12 +8,17 @@ class LicitacionMP(models.Model):
     
     fecha_creacion = models.DateTimeField(null=True, blank=True, db_index=True)
     fecha_cierre = models.DateTimeField(null=True, blank=True)
+
+    # Columnas extraídas de json_data al guardar (filtros del visor sin leer el JSON)
+    tipo = models.CharField(max_length=50, blank=True, default='', db_index=True)
+    monto_estimado = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True, db_index=True)
     
     # Campo para guardar la estructura normalizada completa (para el visor rápido)
     json_data = models.JSONField(verbose_name="Ficha Normalizada", null=True, blank=True)
     
     # Metadata interna de gestión
     is_enriquecida = models.BooleanField(default=False, help_text="¿Ya se descargó el detalle técnico full?")
+    json_hash = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 de json_data (ver mp_persist.py)")
     last_sync = models.DateTimeField(auto_now=True)
 
     def __str__(self):
@@ -23,3 +28,80 @@ class LicitacionMP(models.Model):
         verbose_name = "Licitación Mercado Público"
         verbose_name_plural = "Licitaciones Mercado Público"
         ordering = ['-fecha_creacion']
+
+
+class RespuestaMPCache(models.Model):
+    """
+    Respuesta cacheada de la API de Mercado Público (ver licitaciones/mp_cache.py).
+    Compartida entre workers/contenedores; se poda por LRU según tamaño.
+    """
+    clave = models.CharField(max_length=64, unique=True)
+    endpoint = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    payload = models.JSONField(null=True, blank=True)
+    tamano = models.PositiveIntegerField(default=0, help_text="Bytes del payload serializado")
+
+    creado = models.DateTimeField(auto_now_add=True)
+    fresco_hasta = models.DateTimeField(help_text="Hasta cuándo se sirve sin revalidar")
+    stale_hasta = models.DateTimeField(help_text="Hasta cuándo se puede servir mientras se revalida")
+    ultimo_acceso = models.DateTimeField(db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+    # Lease de single-flight: un solo worker consulta MP por clave a la vez
+    refrescando_hasta = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.endpoint} {self.params}"
+
+    class Meta:
+        verbose_name = "Respuesta MP en caché"
+        verbose_name_plural = "Respuestas MP en caché"
+
+
+class PuntoControlSync(models.Model):
+    """
+    Avance de sync_licitaciones por organismo: hasta qué fecha está todo
+    sincronizado y qué licitaciones quedaron pendientes de enriquecer, para
+    retomar tras una interrupción (--since-last).
+    """
+    clave = models.CharField(max_length=100, unique=True)
+    ultima_fecha_completa = models.DateField(null=True, blank=True)
+    pendientes_enriquecer = models.JSONField(default=list, blank=True)
+    ultimo_resumen = models.JSONField(default=dict, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.clave} hasta {self.ultima_fecha_completa}"
+
+    class Meta:
+        verbose_name = "Punto de control de sincronización"
+        verbose_name_plural = "Puntos de control de sincronización"
+
+
+class PayloadMP(models.Model):
+    """
+    Ítem crudo de la API de MP tal como llegó (antes iba como `_raw` dentro de
+    json_data). Se guarda comprimido con zlib y solo se lee bajo demanda
+    (?include_raw=true en los visores); ver licitaciones/mp_persist.py.
+    """
+    LICITACION = 'LIC'
+    ORDEN_COMPRA = 'OC'
+    TIPO_CHOICES = [
+        (LICITACION, 'Licitación'),
+        (ORDEN_COMPRA, 'Orden de Compra'),
+    ]
+
+    tipo = models.CharField(max_length=3, choices=TIPO_CHOICES)
+    codigo_externo = models.CharField(max_length=50)
+    datos = models.BinaryField(help_text="JSON comprimido con zlib")
+    tamano = models.PositiveIntegerField(default=0, help_text="Bytes del JSON sin comprimir")
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tipo} {self.codigo_externo}"
+
+    class Meta:
+        verbose_name = "Payload crudo MP"
+        verbose_name_plural = "Payloads crudos MP"
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'codigo_externo'], name='payloadmp_tipo_codigo_unico'),
+        ]
@@ -0,0 +1,284 @@
+"""
+Caché de respuestas de Mercado Público compartida entre workers.
+
+Reemplaza los JSON en licitaciones/_mp_cache. Cada entrada guarda su TTL
+explícito:
+
+  - fresco_hasta: se sirve directo (30 min para el día de hoy, 24 h para
+    días pasados y códigos, igual que antes).
+  - stale_hasta: pasado el TTL se sigue sirviendo la copia vieja mientras se
+    revalida en segundo plano (stale-while-revalidate), así el visor no
+    espera a MP si existe una copia.
+
+Las consultas idénticas simultáneas se agrupan (single-flight): dentro del
+proceso los threads esperan al primero y entre workers se usa un lease en
+el backend. Backends:
+
+  - 'db' (por defecto): tabla RespuestaMPCache, poda LRU por tamaño total
+    (MP_CACHE_MAX_BYTES) según ultimo_acceso.
+  - 'django': el cache de Django MP_CACHE_ALIAS (p.ej. Redis); la expulsión
+    queda a cargo del propio backend.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+logger = logging.getLogger('mercado_publico')
+
+Entrada = namedtuple('Entrada', ['payload', 'fresco_hasta', 'stale_hasta'])
+
+LEASE_SEGUNDOS = 30
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def clave_para(endpoint, params):
+    datos = {k: v for k, v in params.items() if k != 'ticket' and v is not None}
+    crudo = json.dumps([endpoint, datos], sort_keys=True, default=str)
+    return hashlib.sha256(crudo.encode('utf-8')).hexdigest()
+
+
+def ttl_por_fecha(params):
+    """30 minutos para consultas del día de hoy, 24 horas para el resto."""
+    if params.get('fecha') == datetime.now().strftime('%d%m%Y'):
+        return 30 * 60
+    return 24 * 60 * 60
+
+
+class DBCacheBackend:
+    TOQUE_MINIMO = 60  # segundos entre actualizaciones de ultimo_acceso
+
+    def __init__(self):
+        self._escrituras = 0
+
+    @property
+    def modelo(self):
+        from .models import RespuestaMPCache
+        return RespuestaMPCache
+
+    def leer(self, clave):
+        fila = self.modelo.objects.filter(clave=clave, payload__isnull=False).values(
+            'pk', 'payload', 'fresco_hasta', 'stale_hasta', 'ultimo_acceso'
+        ).first()
+        if not fila:
+            return None
+        ahora = timezone.now()
+        if (ahora - fila['ultimo_acceso']).total_seconds() > self.TOQUE_MINIMO:
+            self.modelo.objects.filter(pk=fila['pk']).update(ultimo_acceso=ahora, hits=F('hits') + 1)
+        return Entrada(fila['payload'], fila['fresco_hasta'].timestamp(), fila['stale_hasta'].timestamp())
+
+    def guardar(self, clave, endpoint, params, payload, fresco_hasta, stale_hasta):
+        ahora = timezone.now()
+        self.modelo.objects.update_or_create(clave=clave, defaults={
+            'endpoint': endpoint,
+            'params': params,
+            'payload': payload,
+            'tamano': len(json.dumps(payload, ensure_ascii=False, default=str)),
+            'fresco_hasta': datetime.fromtimestamp(fresco_hasta, tz=dt_timezone.utc),
+            'stale_hasta': datetime.fromtimestamp(stale_hasta, tz=dt_timezone.utc),
+            'ultimo_acceso': ahora,
+        })
+        self._escrituras += 1
+        if self._escrituras % settings.MP_CACHE_PRUNE_EVERY == 0:
+            self.podar()
+
+    def tomar_lease(self, clave, endpoint, params, segundos=LEASE_SEGUNDOS):
+        ahora = timezone.now()
+        self.modelo.objects.get_or_create(clave=clave, defaults={
+            'endpoint': endpoint, 'params': params,
+            'fresco_hasta': _EPOCH, 'stale_hasta': _EPOCH, 'ultimo_acceso': ahora,
+        })
+        return self.modelo.objects.filter(clave=clave).filter(
+            Q(refrescando_hasta__isnull=True) | Q(refrescando_hasta__lt=ahora)
+        ).update(refrescando_hasta=ahora + timedelta(seconds=segundos)) == 1
+
+    def soltar_lease(self, clave):
+        self.modelo.objects.filter(clave=clave).update(refrescando_hasta=None)
+
+    def podar(self):
+        """Elimina lo vencido y, si se supera MP_CACHE_MAX_BYTES, lo menos usado (LRU)."""
+        ahora = timezone.now()
+        qs = self.modelo.objects.exclude(refrescando_hasta__gt=ahora)
+        qs.filter(stale_hasta__lt=ahora).delete()
+
+        maximo = settings.MP_CACHE_MAX_BYTES
+        total = self.modelo.objects.aggregate(total=Sum('tamano'))['total'] or 0
+        if total <= maximo:
+            return
+        exceso = total - int(maximo * 0.9)
+        ids, liberado = [], 0
+        for pk, tamano in qs.order_by('ultimo_acceso').values_list('pk', 'tamano').iterator():
+            ids.append(pk)
+            liberado += tamano
+            if liberado >= exceso:
+                break
+        for i in range(0, len(ids), 500):
+            self.modelo.objects.filter(pk__in=ids[i:i + 500]).delete()
+
+    def limpiar(self):
+        self.modelo.objects.all().delete()
+
+
+class DjangoCacheBackend:
+    PREFIJO = 'mpc'
+
+    @property
+    def cache(self):
+        return caches[settings.MP_CACHE_ALIAS]
+
+    def leer(self, clave):
+        valor = self.cache.get(f'{self.PREFIJO}:{clave}')
+        return Entrada(*valor) if valor else None
+
+    def guardar(self, clave, endpoint, params, payload, fresco_hasta, stale_hasta):
+        timeout = max(1, int(stale_hasta - time.time()))
+        self.cache.set(f'{self.PREFIJO}:{clave}', (payload, fresco_hasta, stale_hasta), timeout)
+
+    def tomar_lease(self, clave, endpoint, params, segundos=LEASE_SEGUNDOS):
+        return self.cache.add(f'{self.PREFIJO}-lease:{clave}', 1, segundos)
+
+    def soltar_lease(self, clave):
+        self.cache.delete(f'{self.PREFIJO}-lease:{clave}')
+
+    def podar(self):
+        pass
+
+    def limpiar(self):
+        self.cache.clear()
+
+
+BACKENDS = {
+    'db': DBCacheBackend,
+    'django': DjangoCacheBackend,
+}
+
+
+class MPCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self._vuelos = {}
+        self._lock = threading.Lock()
+        # hit / stale / miss / coalesced: para reportar llamadas a MP ahorradas
+        self.stats = Counter()
+
+    def obtener(self, endpoint, params, fetch, ttl=None, guardar_si=bool):
+        """
+        Devuelve la respuesta cacheada de (endpoint, params) o la obtiene con
+        `fetch()`. Solo se guardan las respuestas para las que `guardar_si`
+        es verdadero (por defecto, las no vacías).
+        """
+        clave = clave_para(endpoint, params)
+        entrada = self.backend.leer(clave)
+        ahora = time.time()
+        if entrada and ahora < entrada.fresco_hasta:
+            self.stats['hit'] += 1
+            return entrada.payload
+        if entrada and ahora < entrada.stale_hasta:
+            self.stats['stale'] += 1
+            self._revalidar(clave, endpoint, params, fetch, ttl, guardar_si)
+            return entrada.payload
+        return self._cargar(clave, endpoint, params, fetch, ttl, guardar_si)
+
+    def _guardar(self, clave, endpoint, params, payload, ttl, guardar_si):
+        if not guardar_si(payload):
+            return
+        ttl = ttl if ttl is not None else ttl_por_fecha(params)
+        ahora = time.time()
+        try:
+            self.backend.guardar(clave, endpoint, params, payload, ahora + ttl, ahora + ttl + settings.MP_CACHE_STALE_SECONDS)
+        except Exception:
+            logger.exception("No se pudo guardar la respuesta de MP en caché")
+
+    def _cargar(self, clave, endpoint, params, fetch, ttl, guardar_si):
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = Future()
+        if not lider:
+            self.stats['coalesced'] += 1
+            return vuelo.result(timeout=settings.MP_CACHE_WAIT_SECONDS + settings.MP_TIMEOUT * settings.MP_MAX_RETRIES)
+
+        try:
+            payload = self._cargar_entre_workers(clave, endpoint, params, fetch, ttl, guardar_si)
+        except BaseException as e:
+            vuelo.set_exception(e)
+            raise
+        else:
+            vuelo.set_result(payload)
+            return payload
+        finally:
+            with self._lock:
+                self._vuelos.pop(clave, None)
+
+    def _cargar_entre_workers(self, clave, endpoint, params, fetch, ttl, guardar_si):
+        tiene_lease = self.backend.tomar_lease(clave, endpoint, params)
+        if not tiene_lease:
+            # Otro worker está consultando lo mismo: esperar su resultado
+            limite = time.time() + settings.MP_CACHE_WAIT_SECONDS
+            while time.time() < limite:
+                time.sleep(0.25)
+                entrada = self.backend.leer(clave)
+                if entrada and time.time() < entrada.fresco_hasta:
+                    self.stats['coalesced'] += 1
+                    return entrada.payload
+        self.stats['miss'] += 1
+        try:
+            payload = fetch()
+            self._guardar(clave, endpoint, params, payload, ttl, guardar_si)
+            return payload
+        finally:
+            if tiene_lease:
+                self.backend.soltar_lease(clave)
+
+    def _revalidar(self, clave, endpoint, params, fetch, ttl, guardar_si):
+        with self._lock:
+            if clave in self._vuelos:
+                return
+        if not self.backend.tomar_lease(clave, endpoint, params):
+            return  # otro worker ya está revalidando
+        with self._lock:
+            if clave in self._vuelos:
+                self.backend.soltar_lease(clave)
+                return
+            vuelo = self._vuelos[clave] = Future()
+
+        def tarea():
+            try:
+                payload = fetch()
+                self._guardar(clave, endpoint, params, payload, ttl, guardar_si)
+                vuelo.set_result(payload)
+            except Exception as e:
+                logger.warning("Revalidación de caché MP fallida (%s): %s", endpoint, e)
+                vuelo.set_exception(e)
+            finally:
+                with self._lock:
+                    self._vuelos.pop(clave, None)
+                self.backend.soltar_lease(clave)
+                close_old_connections()
+
+        threading.Thread(target=tarea, daemon=True, name='mp-cache-revalidar').start()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """MPCache del proceso con el backend configurado en MP_CACHE_BACKEND."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MPCache(BACKENDS[settings.MP_CACHE_BACKEND]())
+    return _cache
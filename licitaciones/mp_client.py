@@ -0,0 +1,301 @@
+"""
+Cliente compartido para la API de Mercado Público.
+
+Todas las consultas a MP (visores de licitaciones y OCs, sync_licitaciones,
+sync_oc_providers) pasan por un único MPClient por proceso:
+
+  - requests.Session con pool keep-alive (se reutilizan TCP/TLS).
+  - Token bucket compartido entre threads (MP_RATE_PER_SECOND / MP_RATE_BURST).
+  - Rotación de tickets con puntaje de salud: los tickets que devuelven
+    saturación bajan de puntaje y los inválidos (Codigo 203) se suspenden.
+    El ticket que trae el usuario (?ticket=) solo se usa en su propia
+    consulta: se intenta primero y no entra al pool.
+  - Reintentos con backoff exponencial + jitter ante 429, 500 y Codigo 10500.
+    Los demás 4xx se devuelven al llamador sin reintentar.
+  - Circuit breaker: tras MP_BREAKER_THRESHOLD saturaciones seguidas se
+    falla de inmediato (MPSaturadoError) durante MP_BREAKER_RESET segundos.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+import urllib3
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+urllib3.disable_warnings()
+logger = logging.getLogger('mercado_publico')
+
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+]
+
+CODIGO_TICKET_INVALIDO = 203
+CODIGO_SATURACION = 10500
+
+
+class MPError(Exception):
+    """La API de Mercado Público no entregó una respuesta válida."""
+
+
+class MPSaturadoError(MPError):
+    """Circuit breaker abierto: MP está saturado y no se intenta la consulta."""
+
+
+class TokenBucket:
+    """Limitador de tasa compartido entre threads."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (ahora - self._updated) * self.rate)
+                self._updated = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.rate
+            time.sleep(espera)
+
+
+def ticket_valido(ticket):
+    return bool(ticket) and len(ticket) > 10
+
+
+class TicketPool:
+    """
+    Tickets de MP configurados, con puntaje de salud en [0, 1]. Se elige
+    el de mejor puntaje. Los tickets ajenos al pool se ignoran.
+    """
+    SUSPENSION_INVALIDO = 600
+
+    def __init__(self, tickets):
+        self._lock = threading.Lock()
+        self._salud = {}
+        self._suspendido_hasta = {}
+        for t in tickets:
+            self.agregar(t)
+
+    def agregar(self, ticket):
+        if ticket_valido(ticket):
+            with self._lock:
+                self._salud.setdefault(ticket, 1.0)
+
+    def __len__(self):
+        return len(self._salud)
+
+    def elegir(self, excluir=()):
+        ahora = time.monotonic()
+        with self._lock:
+            candidatos = [
+                t for t in self._salud
+                if self._suspendido_hasta.get(t, 0) <= ahora and t not in excluir
+            ] or [t for t in self._salud if t not in excluir] or list(self._salud)
+            if not candidatos:
+                raise MPError('No hay tickets de Mercado Público configurados.')
+            mejor = max(self._salud[t] for t in candidatos)
+            return random.choice([t for t in candidatos if self._salud[t] == mejor])
+
+    def exito(self, ticket):
+        with self._lock:
+            if ticket in self._salud:
+                self._salud[ticket] = min(1.0, self._salud[ticket] + 0.2)
+
+    def saturado(self, ticket):
+        with self._lock:
+            if ticket in self._salud:
+                self._salud[ticket] *= 0.7
+
+    def invalido(self, ticket):
+        with self._lock:
+            if ticket in self._salud:
+                self._salud[ticket] = 0.0
+                self._suspendido_hasta[ticket] = time.monotonic() + self.SUSPENSION_INVALIDO
+
+    def estado(self):
+        with self._lock:
+            return {t[:8]: round(s, 2) for t, s in self._salud.items()}
+
+
+class CircuitBreaker:
+    def __init__(self, umbral, reset_segundos):
+        self.umbral = umbral
+        self.reset_segundos = reset_segundos
+        self._fallos = 0
+        self._abierto_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def verificar(self):
+        with self._lock:
+            if self._fallos >= self.umbral and time.monotonic() < self._abierto_hasta:
+                raise MPSaturadoError('Mercado Público está saturado; se reintentará más tarde.')
+            # Pasado el reset queda semiabierto: se permite un intento de prueba
+
+    def exito(self):
+        with self._lock:
+            self._fallos = 0
+
+    def fallo(self):
+        with self._lock:
+            self._fallos += 1
+            if self._fallos >= self.umbral:
+                self._abierto_hasta = time.monotonic() + self.reset_segundos
+
+    @property
+    def abierto(self):
+        return self._fallos >= self.umbral and time.monotonic() < self._abierto_hasta
+
+
+class _Reintentar(Exception):
+    def __init__(self, motivo, saturacion=True, espera=None):
+        super().__init__(motivo)
+        self.saturacion = saturacion
+        self.espera = espera
+
+
+class MPClient:
+    def __init__(self, base_url=None, tickets=None, rate=None, burst=None, max_retries=None,
+                 timeout=None, breaker_umbral=None, breaker_reset=None, verify=None):
+        self.base_url = (base_url or settings.MP_API_BASE_URL).rstrip('/')
+        self.tickets = TicketPool(tickets if tickets is not None else settings.MP_TICKETS)
+        self.bucket = TokenBucket(rate or settings.MP_RATE_PER_SECOND, burst or settings.MP_RATE_BURST)
+        self.max_retries = max_retries or settings.MP_MAX_RETRIES
+        self.timeout = timeout or settings.MP_TIMEOUT
+        self.breaker = CircuitBreaker(breaker_umbral or settings.MP_BREAKER_THRESHOLD,
+                                      breaker_reset or settings.MP_BREAKER_RESET)
+        self.verify = settings.MP_VERIFY_SSL if verify is None else verify
+        self.backoff_base = 0.5
+        self.backoff_max = 8.0
+        self.llamadas = 0
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.MP_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': random.choice(USER_AGENTS),
+            'Accept': 'application/json',
+        })
+
+    def _backoff(self, intento):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** intento)))
+
+    def _clasificar(self, res, ticket):
+        """Devuelve el JSON si la respuesta es válida o lanza _Reintentar."""
+        if res.status_code == 429:
+            espera = res.headers.get('Retry-After')
+            raise _Reintentar('HTTP 429', espera=float(espera) if espera and espera.isdigit() else None)
+        if res.status_code == 500:
+            self.tickets.saturado(ticket)
+            raise _Reintentar('HTTP 500')
+        if res.status_code == 203:
+            self.tickets.invalido(ticket)
+            raise _Reintentar('Ticket inválido', saturacion=False, espera=0)
+        if 400 <= res.status_code < 500:
+            # Error de la consulta (código inexistente, parámetros): reintentar no sirve
+            raise MPError(f'HTTP {res.status_code}')
+        if res.status_code not in (200, 201):
+            raise _Reintentar(f'HTTP {res.status_code}')
+
+        try:
+            js = res.json()
+        except ValueError:
+            raise _Reintentar('Respuesta no es JSON')
+
+        if isinstance(js, str) and 'Ticket' in js:
+            self.tickets.invalido(ticket)
+            raise _Reintentar('Ticket inválido', saturacion=False, espera=0)
+        codigo = js.get('Codigo') if isinstance(js, dict) else None
+        if isinstance(codigo, int) and codigo not in (200, 201):
+            if codigo == CODIGO_TICKET_INVALIDO:
+                self.tickets.invalido(ticket)
+                raise _Reintentar('Ticket inválido', saturacion=False, espera=0)
+            self.tickets.saturado(ticket)
+            raise _Reintentar(f"Codigo {codigo}: {js.get('Mensaje', '')}")
+        return js
+
+    def _elegir_ticket(self, user_ticket, usados):
+        """El ticket del usuario en el primer intento; luego los del pool."""
+        if user_ticket and (user_ticket not in usados or not self.tickets):
+            return user_ticket
+        return self.tickets.elegir(excluir=usados)
+
+    def get(self, endpoint, params, user_ticket=None):
+        """
+        GET /{endpoint}.json con los parámetros dados. Retorna el JSON ya
+        validado; lanza MPSaturadoError si el breaker está abierto o MPError
+        si MP rechaza la consulta (4xx) o se agotan los reintentos.
+        """
+        user_ticket = user_ticket if ticket_valido(user_ticket) else None
+        url = f"{self.base_url}/{endpoint}.json"
+        usados = set()
+        ultimo_error = None
+
+        for intento in range(self.max_retries):
+            self.breaker.verificar()
+            ticket = self._elegir_ticket(user_ticket, usados)
+            self.bucket.acquire()
+            self.llamadas += 1
+            try:
+                res = self.session.get(url, params={**params, 'ticket': ticket}, timeout=self.timeout, verify=self.verify)
+                js = self._clasificar(res, ticket)
+            except _Reintentar as e:
+                ultimo_error = str(e)
+                usados.add(ticket)
+                if e.saturacion:
+                    self.breaker.fallo()
+                espera = self._backoff(intento) if e.espera is None else e.espera
+            except requests.RequestException as e:
+                ultimo_error = str(e)
+                self.breaker.fallo()
+                espera = self._backoff(intento)
+            else:
+                self.tickets.exito(ticket)
+                self.breaker.exito()
+                return js
+
+            logger.debug("MP %s | ticket %s | intento %s: %s", endpoint, ticket[:8], intento + 1, ultimo_error)
+            if intento + 1 < self.max_retries and espera:
+                time.sleep(espera)
+
+        raise MPError(f"La API de Mercado Público no respondió tras {self.max_retries} intentos. ({ultimo_error})")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """MPClient compartido por todo el proceso."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MPClient()
+    return _client
+
+
+def extraer_listado(js):
+    """Lista de items de una respuesta de MP (Listado, detalle suelto o vacío)."""
+    if isinstance(js, list):
+        return js
+    if not isinstance(js, dict):
+        return []
+    if 'Listado' in js:
+        return js['Listado'] or []
+    if 'CodigoExterno' in js or 'Codigo' in js:
+        return [js]
+    if 'LicitacionDetalle' in js:
+        return [js['LicitacionDetalle']]
+    return []
@@ -0,0 +1,113 @@
+"""
+Servidor falso de Mercado Público para pruebas locales del cliente.
+
+Levanta un HTTP server en un thread que responde /{endpoint}.json imitando a
+MP: si se supera `max_rps` peticiones por segundo responde Codigo 10500 (o
+HTTP 429 con `modo_limite='429'`, con Retry-After si se da `retry_after`),
+responde así también a las primeras `saturar_primeras` peticiones, rechaza
+los tickets de `tickets_invalidos` con Codigo 203 y registra cada petición
+recibida.
+
+    with FakeMPServer(max_rps=5) as fake:
+        client = MPClient(base_url=fake.base_url, tickets=['T' * 36], rate=4, burst=1)
+        client.get('licitaciones', {'fecha': '01012026'})
+        assert fake.saturadas == 0
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SATURACION = {"Codigo": 10500, "Mensaje": "Lo sentimos. Hemos detectado que existen peticiones simultáneas."}
+TICKET_INVALIDO = {"Codigo": 203, "Mensaje": "Ticket no válido."}
+
+
+def respuesta_por_defecto(endpoint, params):
+    codigo = params.get('codigo') or f"FAKE-{params.get('fecha', '00000000')}"
+    return {'Cantidad': 1, 'FechaCreacion': '2026-01-01T00:00:00', 'Listado': [
+        {'CodigoExterno': codigo, 'Codigo': codigo, 'Nombre': f'{endpoint} {codigo}', 'CodigoEstado': 5},
+    ]}
+
+
+class FakeMPServer:
+    def __init__(self, max_rps=None, modo_limite='10500', tickets_invalidos=(), responder=None, siempre_saturado=False,
+                 saturar_primeras=0, retry_after=None):
+        self.max_rps = max_rps
+        self.modo_limite = modo_limite
+        self.retry_after = retry_after
+        self.saturar_primeras = saturar_primeras
+        self.tickets_invalidos = set(tickets_invalidos)
+        self.responder = responder or respuesta_por_defecto
+        self.siempre_saturado = siempre_saturado
+        self.peticiones = []
+        self.saturadas = 0
+        self._ventana = deque()
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def _limitada(self):
+        ahora = time.monotonic()
+        with self._lock:
+            while self._ventana and ahora - self._ventana[0] > 1:
+                self._ventana.popleft()
+            self._ventana.append(ahora)
+            excedida = (
+                self.siempre_saturado
+                or len(self.peticiones) <= self.saturar_primeras
+                or (self.max_rps is not None and len(self._ventana) > self.max_rps)
+            )
+            if excedida:
+                self.saturadas += 1
+            return excedida
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                endpoint = url.path.rsplit('/', 1)[-1].removesuffix('.json')
+                with fake._lock:
+                    fake.peticiones.append((time.monotonic(), endpoint, params))
+
+                if params.get('ticket') in fake.tickets_invalidos:
+                    return self._json(200, TICKET_INVALIDO)
+                if fake._limitada():
+                    if fake.modo_limite == '429':
+                        cabeceras = {'Retry-After': str(fake.retry_after)} if fake.retry_after is not None else {}
+                        return self._json(429, {'error': 'Too Many Requests'}, cabeceras)
+                    return self._json(200, SATURACION)
+                return self._json(200, fake.responder(endpoint, params))
+
+            def _json(self, status, cuerpo, cabeceras=None):
+                data = json.dumps(cuerpo).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for nombre, valor in (cabeceras or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+        return False
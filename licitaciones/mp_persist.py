@@ -0,0 +1,294 @@
+"""
+Persistencia masiva de documentos de Mercado Público (LicitacionMP y
+OrdenCompraMP).
+
+En vez de un update_or_create por documento (SELECT + UPDATE/INSERT), las
+filas se escriben por lotes con bulk_create(update_conflicts=True) sobre
+codigo_externo:
+
+  - las fechas se normalizan una sola vez al armar la fila (parse_fecha_mp),
+  - las filas cuyo JSON normalizado no cambió (json_hash) no se reescriben,
+  - un documento ya enriquecido no se pisa con la versión básica de un
+    listado: solo se actualizan las columnas que trae el listado (nombre,
+    código de estado, cierre),
+  - si un lote falla se reintenta fila a fila para aislar las que fallan,
+    que se reportan en ResultadoUpsert.fallidos,
+  - el ítem crudo de la API (`_raw`) no va en json_data sino comprimido en
+    PayloadMP, que solo se lee con ?include_raw=true.
+"""
+import hashlib
+import json
+import logging
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import List, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import is_naive, make_aware
+
+logger = logging.getLogger('mercado_publico')
+
+COLUMNAS_LICITACION = ['nombre', 'estado_nombre', 'codigo_estado', 'fecha_creacion', 'fecha_cierre',
+                       'tipo', 'monto_estimado']
+COLUMNAS_OC = ['nombre', 'estado_nombre', 'codigo_estado', 'fecha_creacion', 'monto_total',
+               'proveedor_rut', 'proveedor_nombre', 'tiene_proveedor', 'tipo_compra', 'codigo_licitacion']
+# Lo que traen de forma confiable los listados por fecha (el resto viene del detalle)
+LISTADO_LICITACION = ['nombre', 'codigo_estado', 'fecha_cierre']
+LISTADO_OC = ['nombre', 'codigo_estado']
+
+
+@dataclass
+class ResultadoUpsert:
+    total: int = 0
+    creados: int = 0
+    actualizados: int = 0
+    sin_cambios: int = 0
+    fallidos: List[Tuple[str, str]] = field(default_factory=list)
+    # Códigos creados o modificados en esta escritura
+    cambiados: List[str] = field(default_factory=list)
+
+    def __str__(self):
+        return (f"{self.total} documentos: {self.creados} nuevos, {self.actualizados} actualizados, "
+                f"{self.sin_cambios} sin cambios, {len(self.fallidos)} con error")
+
+    def sumar(self, otro):
+        self.total += otro.total
+        self.creados += otro.creados
+        self.actualizados += otro.actualizados
+        self.sin_cambios += otro.sin_cambios
+        self.fallidos.extend(otro.fallidos)
+        self.cambiados.extend(otro.cambiados)
+        return self
+
+
+@lru_cache(maxsize=4096)
+def _parse_fecha(texto):
+    limpio = texto.split('.')[0].replace('Z', '').replace(' ', 'T')
+    if 'T' not in limpio:
+        limpio += 'T00:00:00'
+    try:
+        dt = datetime.fromisoformat(limpio)
+    except ValueError:
+        return None
+    return make_aware(dt) if is_naive(dt) else dt
+
+
+def parse_fecha_mp(valor):
+    """Fecha de MP ('2026-01-05T10:00:00', '2026-01-05 10:00:00.123Z', '2026-01-05') a datetime aware."""
+    if not valor or not isinstance(valor, str):
+        return None
+    return _parse_fecha(valor.strip())
+
+
+def hash_contenido(json_data):
+    crudo = json.dumps(json_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(crudo.encode('utf-8')).hexdigest()
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_monto_mp(valor):
+    """Monto de MP (número o texto) a Decimal con 2 decimales, o None."""
+    if valor in (None, ''):
+        return None
+    try:
+        return Decimal(str(valor)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def sin_raw(doc):
+    """Documento normalizado sin el ítem crudo `_raw` (proyección para listas)."""
+    if isinstance(doc, dict) and '_raw' in doc:
+        return {k: v for k, v in doc.items() if k != '_raw'}
+    return doc
+
+
+def guardar_payloads(tipo, payloads):
+    """Guarda comprimidos los ítems crudos {codigo: raw} en PayloadMP."""
+    from .models import PayloadMP
+    objetos = []
+    for codigo, raw in payloads.items():
+        if raw is None:
+            continue
+        crudo = json.dumps(raw, ensure_ascii=False, default=str).encode('utf-8')
+        objetos.append(PayloadMP(tipo=tipo, codigo_externo=codigo, datos=zlib.compress(crudo, 6), tamano=len(crudo)))
+    PayloadMP.objects.bulk_create(
+        objetos, batch_size=settings.MP_UPSERT_BATCH_SIZE, update_conflicts=True,
+        unique_fields=['tipo', 'codigo_externo'], update_fields=['datos', 'tamano', 'actualizado'],
+    )
+
+
+def cargar_payload(tipo, codigo):
+    from .models import PayloadMP
+    datos = PayloadMP.objects.filter(tipo=tipo, codigo_externo=codigo).values_list('datos', flat=True).first()
+    return json.loads(zlib.decompress(bytes(datos))) if datos is not None else None
+
+
+def con_raw(doc, tipo, codigo):
+    """Documento con su `_raw` cargado desde PayloadMP (detalle con ?include_raw=true)."""
+    raw = cargar_payload(tipo, codigo)
+    return {**doc, '_raw': raw} if raw is not None and isinstance(doc, dict) else doc
+
+
+def columnas_proveedor(proveedor):
+    """Columnas indexadas de OrdenCompraMP a partir del Proveedor normalizado."""
+    proveedor = proveedor or {}
+    nombre = proveedor.get('Nombre') or proveedor.get('RazonSocial') or ''
+    rut = proveedor.get('Rut') or ''
+    return {
+        'proveedor_rut': rut[:20],
+        'proveedor_nombre': nombre[:300],
+        'tiene_proveedor': bool(nombre or rut),
+    }
+
+
+def fila_licitacion(norm):
+    """Fila de LicitacionMP a partir de normalize_mp_document()."""
+    fechas = norm.get('Fechas') or {}
+    return {
+        'codigo_externo': norm.get('CodigoExterno'),
+        'nombre': (norm.get('Nombre') or '')[:500],
+        'estado_nombre': (norm.get('Estado') or '')[:100],
+        'codigo_estado': _entero(norm.get('CodigoEstado')),
+        'fecha_creacion': parse_fecha_mp(fechas.get('FechaCreacion')),
+        'fecha_cierre': parse_fecha_mp(fechas.get('FechaCierre')),
+        'tipo': (norm.get('Tipo') or '')[:50],
+        'monto_estimado': parse_monto_mp(norm.get('MontoEstimado')),
+        'is_enriquecida': norm.get('_source') == 'MP_FULL',
+        'json_data': sin_raw(norm),
+        '_raw': norm.get('_raw'),
+    }
+
+
+def fila_oc(norm):
+    """Fila de OrdenCompraMP a partir de normalize_mp_oc()."""
+    codigo = norm.get('CodigoExterno') or ''
+    fecha = parse_fecha_mp((norm.get('Fechas') or {}).get('FechaCreacion'))
+    if not fecha and '-' in codigo:
+        # Sin fecha: el sufijo del código trae el año (p.ej. 1820906-12-SE26)
+        anio = ''.join(filter(str.isdigit, codigo.split('-')[-1]))
+        if len(anio) == 2:
+            fecha = make_aware(datetime(2000 + int(anio), 1, 1))
+    return {
+        'codigo_externo': codigo,
+        'nombre': (norm.get('Nombre') or '')[:500],
+        'estado_nombre': (norm.get('Estado') or '')[:100],
+        'codigo_estado': _entero(norm.get('CodigoEstado')),
+        'fecha_creacion': fecha,
+        'monto_total': parse_monto_mp(norm.get('MontoTotal')),
+        **columnas_proveedor(norm.get('Proveedor')),
+        'tipo_compra': (norm.get('TipoCompraRepresentativo') or '')[:60],
+        'codigo_licitacion': (norm.get('CodigoLicitacion') or '')[:50],
+        'is_enriquecida': norm.get('_source') == 'MP_FULL',
+        'json_data': sin_raw(norm),
+        '_raw': norm.get('_raw'),
+    }
+
+
+def _escribir(modelo, objetos, campos, resultado):
+    """bulk_create con upsert; si el lote falla, fila a fila para aislar errores."""
+    if not objetos:
+        return 0
+    try:
+        with transaction.atomic():
+            modelo.objects.bulk_create(
+                objetos, update_conflicts=True, unique_fields=['codigo_externo'], update_fields=campos,
+            )
+        resultado.cambiados.extend(obj.codigo_externo for obj in objetos)
+        return len(objetos)
+    except Exception as e:
+        if len(objetos) == 1:
+            resultado.fallidos.append((objetos[0].codigo_externo, str(e)))
+            return 0
+    escritos = 0
+    for obj in objetos:
+        escritos += _escribir(modelo, [obj], campos, resultado)
+    return escritos
+
+
+def upsert_documentos(modelo, filas, columnas, columnas_listado, tipo_payload, batch_size=None):
+    """
+    Inserta o actualiza `filas` (dicts de fila_licitacion / fila_oc) en
+    `modelo` por lotes de MP_UPSERT_BATCH_SIZE. De los documentos ya
+    enriquecidos que llegan en versión básica solo se actualizan
+    `columnas_listado`. Los `_raw` de las filas escritas completas se guardan
+    en PayloadMP con `tipo_payload`. Retorna un ResultadoUpsert.
+    """
+    batch_size = batch_size or settings.MP_UPSERT_BATCH_SIZE
+    resultado = ResultadoUpsert()
+
+    # Deduplicar por código (gana la última versión)
+    por_codigo, raws = {}, {}
+    for fila in filas:
+        if fila.get('codigo_externo'):
+            fila = dict(fila)
+            raws[fila['codigo_externo']] = fila.pop('_raw', None)
+            por_codigo[fila['codigo_externo']] = fila
+    resultado.total = len(por_codigo)
+    codigos = list(por_codigo)
+
+    completos = columnas + ['json_data', 'json_hash', 'is_enriquecida', 'last_sync']
+    solo_columnas = columnas_listado + ['last_sync']
+
+    for i in range(0, len(codigos), batch_size):
+        lote = codigos[i:i + batch_size]
+        existentes = {
+            e['codigo_externo']: e
+            for e in modelo.objects.filter(codigo_externo__in=lote).values(
+                'codigo_externo', 'json_hash', 'is_enriquecida', *columnas
+            )
+        }
+        nuevos, cambiados, degradados = [], [], []
+        for codigo in lote:
+            fila = dict(por_codigo[codigo], json_hash=hash_contenido(por_codigo[codigo]['json_data']))
+            actual = existentes.get(codigo)
+            if actual is None:
+                nuevos.append(modelo(**fila))
+            elif actual['json_hash'] == fila['json_hash']:
+                resultado.sin_cambios += 1
+            elif actual['is_enriquecida'] and not fila['is_enriquecida']:
+                # No reemplazar el detalle completo por la ficha básica del listado
+                valores = {c: actual[c] if fila[c] in (None, '') else fila[c] for c in columnas_listado}
+                if all(actual[c] == valores[c] for c in columnas_listado):
+                    resultado.sin_cambios += 1
+                else:
+                    degradados.append(modelo(codigo_externo=codigo, **valores))
+            else:
+                cambiados.append(modelo(**fila))
+
+        desde = len(resultado.cambiados)
+        resultado.creados += _escribir(modelo, nuevos, completos, resultado)
+        resultado.actualizados += _escribir(modelo, cambiados, completos, resultado)
+        try:
+            guardar_payloads(tipo_payload, {c: raws[c] for c in resultado.cambiados[desde:]})
+        except Exception:
+            logger.exception("No se pudieron guardar los payloads crudos de %s", modelo.__name__)
+        resultado.actualizados += _escribir(modelo, degradados, solo_columnas, resultado)
+
+    if resultado.fallidos:
+        logger.warning("Upsert %s: %s. Primer error: %s %s", modelo.__name__, resultado, *resultado.fallidos[0])
+    return resultado
+
+
+def upsert_licitaciones(normalizados, batch_size=None):
+    from .models import LicitacionMP, PayloadMP
+    filas = [fila_licitacion(n) for n in normalizados if n]
+    return upsert_documentos(LicitacionMP, filas, COLUMNAS_LICITACION, LISTADO_LICITACION,
+                             PayloadMP.LICITACION, batch_size)
+
+
+def upsert_ordenes_compra(normalizados, batch_size=None):
+    from orden_compra.models import OrdenCompraMP
+    from .models import PayloadMP
+    filas = [fila_oc(n) for n in normalizados if n]
+    return upsert_documentos(OrdenCompraMP, filas, COLUMNAS_OC, LISTADO_OC, PayloadMP.ORDEN_COMPRA, batch_size)
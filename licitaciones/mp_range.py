@@ -0,0 +1,144 @@
+"""
+Consulta de rangos de días en Mercado Público con asyncio.
+
+MP solo permite consultar licitaciones/OCs día por día, así que un rango de
+un mes son ~30 llamadas. RangeFetcher las reparte entre `concurrencia`
+tareas asyncio (cada llamada corre en un thread sobre el MPClient compartido,
+que ya aplica rate limit, tickets y circuit breaker):
+
+  - deduplica por código a medida que llegan los días,
+  - entrega resultados parciales día a día (`iterar` / `iterar_sync`),
+  - reprograma al final de la cola los días fallidos con una espera que
+    crece con los fallos consecutivos,
+  - respeta un presupuesto de tiempo total: al vencer, los días sin
+    respuesta quedan en `pendientes` y se devuelve lo obtenido.
+"""
+import asyncio
+import random
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .mp_client import MPSaturadoError
+
+
+class RangeFetcher:
+    def __init__(self, fetch_dia, concurrencia=None, max_intentos=3, presupuesto=None,
+                 clave=lambda item: item.get('CodigoExterno')):
+        """
+        fetch_dia(fecha_ddmmyyyy) -> lista de items crudos; debe lanzar una
+        excepción si el día no se pudo consultar.
+        """
+        self.fetch_dia = fetch_dia
+        self.concurrencia = concurrencia or settings.MP_RANGE_CONCURRENCY
+        self.max_intentos = max_intentos
+        self.presupuesto = presupuesto if presupuesto is not None else settings.MP_RANGE_BUDGET_SECONDS
+        self.clave = clave
+
+        self.vistos = set()
+        self.dias_ok = []
+        self.fallidas = []
+        self.pendientes = []
+        self.items_recibidos = 0
+        self._fallos_seguidos = 0
+
+    @property
+    def parcial(self):
+        return bool(self.fallidas or self.pendientes)
+
+    def _espera_reintento(self, intento, error):
+        if isinstance(error, MPSaturadoError):
+            return settings.MP_BREAKER_RESET
+        base = 0.5 * (2 ** intento) * (1 + self._fallos_seguidos / self.concurrencia)
+        return random.uniform(base / 2, base)
+
+    def _fetch(self, fecha):
+        # Corre en un thread del executor: cerrar su conexión a la BD (caché MP)
+        # igual que al final de una request
+        try:
+            return self.fetch_dia(fecha)
+        finally:
+            close_old_connections()
+
+    def _nuevos(self, items):
+        nuevos = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            self.items_recibidos += 1
+            cid = self.clave(item)
+            if cid and cid not in self.vistos:
+                self.vistos.add(cid)
+                nuevos.append(item)
+        return nuevos
+
+    async def iterar(self, fechas):
+        """Async generator de (fecha, items_nuevos) en orden de llegada."""
+        limite = time.monotonic() + self.presupuesto
+        cola = asyncio.Queue()
+        salida = asyncio.Queue()
+        for fecha in fechas:
+            cola.put_nowait((fecha, 0))
+
+        async def worker():
+            while True:
+                fecha, intento = await cola.get()
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self.pendientes.append(fecha)
+                    await salida.put(None)
+                    continue
+                try:
+                    items = await asyncio.wait_for(asyncio.to_thread(self._fetch, fecha), timeout=restante)
+                except Exception as e:
+                    self._fallos_seguidos += 1
+                    if intento + 1 >= self.max_intentos or isinstance(e, asyncio.TimeoutError):
+                        (self.pendientes if isinstance(e, asyncio.TimeoutError) else self.fallidas).append(fecha)
+                        await salida.put(None)
+                        continue
+                    espera = min(self._espera_reintento(intento, e), max(0, limite - time.monotonic()))
+                    await asyncio.sleep(espera)
+                    cola.put_nowait((fecha, intento + 1))
+                    continue
+                self._fallos_seguidos = 0
+                self.dias_ok.append(fecha)
+                await salida.put((fecha, self._nuevos(items or [])))
+
+        tareas = [asyncio.create_task(worker()) for _ in range(max(1, min(self.concurrencia, len(fechas))))]
+        try:
+            restantes = len(fechas)
+            while restantes:
+                evento = await salida.get()
+                restantes -= 1
+                if evento is not None:
+                    yield evento
+        finally:
+            for t in tareas:
+                t.cancel()
+            await asyncio.gather(*tareas, return_exceptions=True)
+
+    def iterar_sync(self, fechas):
+        """Versión síncrona de `iterar` para las vistas Django (WSGI)."""
+        loop = asyncio.new_event_loop()
+        agen = self.iterar(fechas)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(agen.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(agen.aclose())
+            loop.close()
+
+    def meta(self, fechas):
+        return {
+            'dias_ok': len(self.dias_ok),
+            'dias_fallidos': len(self.fallidas) + len(self.pendientes),
+            'dias_pendientes': len(self.pendientes),
+            'items_recibidos': self.items_recibidos,
+            'rango': f"{fechas[0]} - {fechas[-1]}" if fechas else '',
+            'api_saturada': len(self.fallidas) + len(self.pendientes) > (len(fechas) / 2),
+            'parcial': self.parcial,
+        }
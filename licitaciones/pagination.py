@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+class VisorPagination(CursorPagination):
+    """
+    Paginación por cursor opcional de los visores MP: solo pagina si se envía
+    ?page_size= (luego se sigue con el enlace 'siguiente', ?cursor=...). No
+    cuenta filas; el total del rango está en visor/meta/.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-fecha_creacion'
+
+    def meta(self):
+        """Datos de paginación para el bloque 'meta' de la respuesta del visor."""
+        return {
+            'page_size': self.page_size,
+            'siguiente': self.get_next_link(),
+            'anterior': self.get_previous_link(),
+        }
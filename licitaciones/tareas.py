@@ -0,0 +1,15 @@
+import logging
+
+from core.cola import tarea
+from licitaciones.mp_persist import upsert_licitaciones
+
+logger = logging.getLogger('mercado_publico')
+
+
+@tarea('licitaciones.persistir')
+def persistir_licitaciones(normalizados, origen=''):
+    """Guarda en LicitacionMP las licitaciones consultadas por el visor."""
+    resultado = upsert_licitaciones(normalizados)
+    logger.info("Persistencia licitaciones %s: %s", origen, resultado)
+    if resultado.fallidos and len(resultado.fallidos) == resultado.total:
+        raise RuntimeError(f"No se pudo guardar ninguna licitación: {resultado.fallidos[0][1]}")
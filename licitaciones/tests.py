@@ -1,3 +1,71 @@
-from django.test import TestCase
+import time
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from .mp_client import MPClient, MPError, MPSaturadoError
+from .mp_fake import FakeMPServer
+
+TICKET = 'T' * 36
+PARAMS = {'fecha': '01012026'}
+
+
+class MPClientThrottlingTests(TestCase):
+    """Cliente compartido de MP contra el servidor falso (licitaciones.mp_fake)."""
+
+    def cliente(self, fake, **kwargs):
+        with override_settings(MP_API_BASE_URL=fake.base_url):
+            client = MPClient(tickets=[TICKET], **kwargs)
+        client.backoff_base = 0  # sin esperas aleatorias: solo cuentan las del rate limit y Retry-After
+        return client
+
+    def test_rate_limit_espacia_las_peticiones(self):
+        with FakeMPServer(max_rps=5) as fake:
+            client = self.cliente(fake, rate=4, burst=1)
+            for _ in range(6):
+                client.get('licitaciones', PARAMS)
+
+        instantes = [t for t, _, _ in fake.peticiones]
+        separaciones = [b - a for a, b in zip(instantes, instantes[1:])]
+        self.assertEqual(fake.saturadas, 0)
+        self.assertEqual(len(fake.peticiones), 6)
+        self.assertGreaterEqual(min(separaciones), 0.2)
+
+    def test_respeta_retry_after_en_429(self):
+        with FakeMPServer(modo_limite='429', saturar_primeras=1, retry_after=1) as fake:
+            client = self.cliente(fake, rate=50, burst=5)
+            js = client.get('licitaciones', PARAMS)
+
+        self.assertEqual(js['Cantidad'], 1)
+        self.assertEqual(len(fake.peticiones), 2)
+        self.assertGreaterEqual(fake.peticiones[1][0] - fake.peticiones[0][0], 1.0)
+
+    @override_settings(MP_BREAKER_THRESHOLD=3, MP_BREAKER_RESET=1, MP_MAX_RETRIES=3)
+    def test_breaker_se_abre_tras_saturaciones_y_se_recupera(self):
+        with FakeMPServer(siempre_saturado=True) as fake:
+            client = self.cliente(fake, rate=50, burst=5)
+            with self.assertRaises(MPError):
+                client.get('licitaciones', PARAMS)
+            self.assertEqual(fake.saturadas, 3)
+            self.assertTrue(client.breaker.abierto)
+
+            # Abierto: falla sin consultar a MP
+            with self.assertRaises(MPSaturadoError):
+                client.get('licitaciones', PARAMS)
+            self.assertEqual(len(fake.peticiones), 3)
+
+            # Pasado el reset se permite un intento de prueba que cierra el breaker
+            fake.siempre_saturado = False
+            time.sleep(1.1)
+            js = client.get('licitaciones', PARAMS)
+
+        self.assertEqual(js['Cantidad'], 1)
+        self.assertFalse(client.breaker.abierto)
+
+    def test_ticket_del_usuario_no_entra_al_pool(self):
+        ticket_usuario = 'U' * 36
+        with FakeMPServer(tickets_invalidos={ticket_usuario}) as fake:
+            client = self.cliente(fake, rate=50, burst=5)
+            client.get('licitaciones', PARAMS, user_ticket=ticket_usuario)
+
+        self.assertEqual([p['ticket'] for _, _, p in fake.peticiones], [ticket_usuario, TICKET])
+        self.assertEqual(len(client.tickets), 1)
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import ListarDocumentosMPView, VisorLicitacionesView
+from .views import ListarDocumentosMPView, VisorLicitacionesMetaView, VisorLicitacionesView
 
 urlpatterns = [
     path('buscar/', ListarDocumentosMPView.as_view(), name='buscar-documento'),
     path('visor/', VisorLicitacionesView.as_view(), name='visor-licitaciones'),
+    path('visor/meta/', VisorLicitacionesMetaView.as_view(), name='visor-licitaciones-meta'),
 ]
@@ -1,20 +1,20 @@
-import os
-import hashlib
-import requests
-import json
-import time
-import threading
-import calendar
 import traceback
 from datetime import datetime, timedelta
-from django.utils.timezone import make_aware
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from rest_framework.views import APIView
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
-from .models import LicitacionMP
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from django.db.models import Count, Q, Sum
+from core.cola import encolar
+from .models import LicitacionMP, PayloadMP
+from .mp_cache import get_cache
+from .mp_client import get_client, extraer_listado
+from .mp_persist import con_raw, sin_raw
+from .mp_range import RangeFetcher
+from .pagination import VisorPagination
+from .visor import NDJSONRenderer, RangoLocalMixin, fechas_rango, guardar_meta, leer_meta, pide_ndjson, respuesta_ndjson
 
 # --- HELPERS DE APOYO ---
 
@@ -124,132 +124,34 @@ def normalize_mp_document(item, has_full_detail=False):
 
 def mercado_publico_request(endpoint, params, user_ticket=None):
     """
-    Helper universal para consultas a MP con rotación de tickets y reintentos.
+    Helper universal para consultas a MP (cliente compartido: pool de conexiones,
+    rate limit, rotación de tickets y reintentos en licitaciones.mp_client).
+    Las consultas de licitaciones por fecha o código pasan por la caché
+    compartida (licitaciones.mp_cache).
     """
-    raw_pool = [user_ticket, "F23CBE04-6C9D-40C4-985C-7F5FCD6070B6", "F8537A18-6766-4DEF-9E59-426B4FEE2844"]
-    # Limpiar y mantener orden (prioridad)
-    tickets_pool = []
-    for t in raw_pool:
-        if t and len(t) > 10 and t not in tickets_pool:
-            tickets_pool.append(t)
-    
-    user_agents = [
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-    ]
-    
-    session = requests.Session()
-    
-    import random
-    current_ticket_idx = random.randint(0, len(tickets_pool) - 1)
-    max_retries = 3 
-    
-    # --- LOGICA DE CACHE PERSISTENTE ---
-    cache_key = None
-    cache_dir = os.path.join(os.path.dirname(__file__), '_mp_cache')
-    if not os.path.exists(cache_dir): os.makedirs(cache_dir)
-
     fecha_query = params.get('fecha')
-    codigo_query = params.get('codigo')
-    org_query = params.get('CodigoOrganismo')
-    
-    if endpoint == 'licitaciones' and (fecha_query or codigo_query):
-        key_raw = f"{endpoint}_{fecha_query}_{codigo_query}_{org_query}"
-        cache_key = hashlib.md5(key_raw.encode()).hexdigest()
-        cache_path = os.path.join(cache_dir, f"{cache_key}.json")
-        
-        if os.path.exists(cache_path):
-            try:
-                mtime = os.path.getmtime(cache_path)
-                last_mod = datetime.fromtimestamp(mtime)
-                is_today = fecha_query == datetime.now().strftime('%d%m%Y')
-                expiry = timedelta(minutes=30) if is_today else timedelta(hours=24)
-                
-                if datetime.now() - last_mod < expiry:
-                    with open(cache_path, 'r', encoding='utf-8') as f:
-                        return json.load(f)
-            except: pass
-
-    for attempt in range(max_retries):
-        try:
-            session.headers.update({
-                'User-Agent': user_agents[attempt % len(user_agents)],
-                'Accept': 'application/json'
-            })
-            active_ticket = tickets_pool[current_ticket_idx % len(tickets_pool)]
-            
-            request_params = dict(params)
-            request_params['ticket'] = active_ticket
-            
-            url = f"https://api.mercadopublico.cl/servicios/v1/publico/{endpoint}.json"
-            print(f"DEBUG API: {endpoint} | Ticket {active_ticket[:8]} | Attempt {attempt+1}")
-            
-            res = session.get(url, params=request_params, timeout=10, verify=False)
-            
-            if res.status_code == 500 or (res.status_code == 200 and '"Codigo":10500' in res.text):
-                current_ticket_idx += 1
-                time.sleep(1.5 * (attempt + 1))
-                continue
-
-            if res.status_code == 203 or (res.status_code == 200 and '"Codigo":203' in res.text):
-                current_ticket_idx += 1
-                continue
-
-            if res.status_code in [200, 201]:
-                try:
-                    js = res.json()
-                    res_final = []
-                    
-                    if isinstance(js, list):
-                        res_final = js
-                    elif isinstance(js, dict):
-                        codigo_err = js.get('Codigo')
-                        if codigo_err and codigo_err not in [200, 201]:
-                            current_ticket_idx += 1
-                            continue
 
-                        if 'Listado' in js:
-                            listado = js['Listado']
-                            if listado is None: res_final = []
-                            else:
-                                root_creation = js.get('FechaCreacion')
-                                query_date = params.get('fecha')
-                                for item in listado:
-                                    if not isinstance(item, dict): continue
-                                    if 'FechaCreacion' not in item:
-                                        if query_date:
-                                            try:
-                                                d, m, y = query_date[:2], query_date[2:4], query_date[4:]
-                                                item['_QueryDate'] = f"{y}-{m}-{d}T00:00:00"
-                                            except: pass
-                                        if root_creation:
-                                            item['_RootFechaCreacion'] = root_creation
-                                res_final = listado
-                        elif 'CodigoExterno' in js or 'Codigo' in js: res_final = [js]
-                        elif 'LicitacionDetalle' in js: res_final = [js['LicitacionDetalle']]
-                        elif js.get('Cantidad') == 0: res_final = []
-                        else:
-                            res_final = []
+    def consultar():
+        js = get_client().get(endpoint, params, user_ticket=user_ticket)
+        res_final = extraer_listado(js)
 
-                    if cache_key and res_final:
+        if isinstance(js, dict) and 'Listado' in js:
+            root_creation = js.get('FechaCreacion')
+            res_final = [item for item in res_final if isinstance(item, dict)]
+            for item in res_final:
+                if 'FechaCreacion' not in item:
+                    if fecha_query:
                         try:
-                            with open(cache_path, 'w', encoding='utf-8') as f:
-                                json.dump(res_final, f, ensure_ascii=False)
+                            d, m, y = fecha_query[:2], fecha_query[2:4], fecha_query[4:]
+                            item['_QueryDate'] = f"{y}-{m}-{d}T00:00:00"
                         except: pass
-                    
-                    return res_final
+                    if root_creation:
+                        item['_RootFechaCreacion'] = root_creation
+        return res_final
 
-                except Exception as parse_err:
-                    pass
-            
-            current_ticket_idx += 1
-            time.sleep(1)
-        except Exception as e:
-            current_ticket_idx += 1
-            time.sleep(1)
-    
-    raise Exception(f"La API de Mercado Público no respondió tras {max_retries} intentos.")
+    if endpoint == 'licitaciones' and (fecha_query or params.get('codigo')):
+        return get_cache().obtener(endpoint, params, consultar)
+    return consultar()
 
 class ListarDocumentosMPView(GenericAPIView):
     """
@@ -281,7 +183,6 @@ class ListarDocumentosMPView(GenericAPIView):
         found_ep = None
         
         for ep in target_endpoints:
-            time.sleep(0.2)
             res_list = mercado_publico_request(ep, {'codigo': codigo}, user_ticket=ticket)
             if res_list:
                 all_items_raw = res_list
@@ -294,13 +195,27 @@ class ListarDocumentosMPView(GenericAPIView):
         item = all_items_raw[0]
         is_lic = found_ep in ['licitaciones', 'conveniosmarco', 'plancompra'] or 'CodigoExterno' in item
         
-        # Normalización básica
+        # Normalización básica (el ítem crudo solo con ?include_raw=true)
         final = normalize_mp_document(item, has_full_detail=True)
+        if request.query_params.get('include_raw', 'false').lower() != 'true':
+            final = sin_raw(final)
         return Response([final])
 
-class VisorLicitacionesView(GenericAPIView):
+class VisorLicitacionesView(RangoLocalMixin, GenericAPIView):
     permission_classes = [AllowAny]
+    # Accept: application/x-ndjson equivale a ?formato=ndjson
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer, NDJSONRenderer]
     authentication_classes = []
+    # Filtros/paginación de la consulta local sobre columnas indexadas
+    queryset = LicitacionMP.objects.all()
+    pagination_class = VisorPagination
+    filterset_fields = {
+        'tipo': ['exact'],
+        'codigo_estado': ['exact'],
+        'monto_estimado': ['gte', 'lte'],
+    }
+    search_fields = ['codigo_externo', 'nombre']
+    ordering_fields = ['fecha_creacion', 'fecha_cierre', 'monto_estimado']
     
     def get(self, request, *args, **kwargs):
         try:
@@ -314,12 +229,15 @@ class VisorLicitacionesView(GenericAPIView):
             force = request.query_params.get('force', 'false').lower() == 'true'
             fecha_inicio = request.query_params.get('fecha_inicio')
             fecha_fin = request.query_params.get('fecha_fin')
+            include_raw = request.query_params.get('include_raw', 'false').lower() == 'true'
 
             # --- CONSULTA LOCAL ---
             if not force and codigo_organismo == "1820906":
                 if codigo:
                     local = LicitacionMP.objects.filter(codigo_externo=codigo).first()
                     if local and local.is_enriquecida:
+                        if include_raw:
+                            return Response([con_raw(local.json_data, PayloadMP.LICITACION, codigo)])
                         return Response([local.json_data])
                 
                 elif (fecha_inicio and fecha_fin) or (mes and anio):
@@ -332,14 +250,9 @@ class VisorLicitacionesView(GenericAPIView):
                         query = query.filter(fecha_creacion__year=anio, fecha_creacion__month=mes)
                     
                     if query.exists():
-                        results = [l.json_data for l in query]
-                        return Response({
-                            'resultados': results,
-                            'meta': {
-                                'source': 'DATABASE',
-                                'total_final': len(results),
-                                'msg': 'Resultados recuperados de la base de datos local.'
-                            }
+                        return self.respuesta_local(request, query, {
+                            'source': 'DATABASE',
+                            'msg': 'Resultados recuperados de la base de datos local.',
                         })
                 
                 elif fecha:
@@ -349,112 +262,46 @@ class VisorLicitacionesView(GenericAPIView):
                         dt_end = dt_start + timedelta(days=1)
                         query = LicitacionMP.objects.filter(fecha_creacion__range=(dt_start, dt_end))
                         if query.exists():
-                            return Response([l.json_data for l in query])
+                            return Response(list(self.filter_queryset(query).values_list('json_data', flat=True)))
                     except: pass
 
             # --- LOGICA API ---
             if (fecha_inicio and fecha_fin) or (mes and anio):
-                target_dates = []
-                if fecha_inicio and fecha_fin:
-                    start_dt = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-                    end_dt = datetime.strptime(fecha_fin, '%Y-%m-%d')
-                    delta = end_dt - start_dt
-                    for i in range(delta.days + 1):
-                        target_dates.append((start_dt + timedelta(days=i)).strftime('%d%m%Y'))
-                else:
-                    days_in_month = calendar.monthrange(int(anio), int(mes))[1]
-                    limit_day = days_in_month
-                    if int(anio) == datetime.now().year and int(mes) == datetime.now().month:
-                        limit_day = datetime.now().day
-                    for d in range(1, limit_day + 1):
-                        target_dates.append(f"{str(d).zfill(2)}{str(mes).zfill(2)}{anio}")
+                target_dates = fechas_rango(fecha_inicio, fecha_fin, mes, anio)
 
-                all_basic_results = []
-                seen_ids = set()
-                failed_dates = []
-                lock = threading.Lock()
-                
                 def fetch_by_date(date_str):
-                    try:
-                        res = mercado_publico_request('licitaciones', {
-                            'fecha': date_str,
-                            'CodigoOrganismo': codigo_organismo
-                        }, user_ticket=ticket)
-                        return (date_str, res, None)
-                    except Exception as e:
-                        return (date_str, [], str(e))
-                
-                with ThreadPoolExecutor(max_workers=3) as executor:
-                    futures_map = {executor.submit(fetch_by_date, d): d for d in target_dates}
-                    for f in as_completed(futures_map):
-                        d_str, day_results, err = f.result()
-                        if err: failed_dates.append(d_str)
-                        else:
-                            with lock:
-                                for r in day_results:
-                                    rid = r.get('CodigoExterno')
-                                    if rid and rid not in seen_ids:
-                                        all_basic_results.append(r)
-                                        seen_ids.add(rid)
-                        time.sleep(0.3)
+                    return mercado_publico_request('licitaciones', {
+                        'fecha': date_str,
+                        'CodigoOrganismo': codigo_organismo
+                    }, user_ticket=ticket)
+
+                # Días en paralelo (asyncio) con presupuesto de latencia; los
+                # días que no alcanzan a responder quedan como fallidos/pendientes
+                fetcher = RangeFetcher(fetch_by_date)
+                if pide_ndjson(request):
+                    return respuesta_ndjson(self._stream_rango(fetcher, target_dates, codigo_organismo))
 
-                if failed_dates:
-                    retry_failed = sorted(failed_dates)
-                    failed_dates = [] 
-                    for d_str in retry_failed:
-                        time.sleep(2)
-                        _, day_results, err = fetch_by_date(d_str)
-                        if err: failed_dates.append(d_str)
-                        else:
-                            with lock:
-                                for r in day_results:
-                                    rid = r.get('CodigoExterno')
-                                    if rid and rid not in seen_ids:
-                                        all_basic_results.append(r)
-                                        seen_ids.add(rid)
+                all_basic_results = []
+                for _, nuevos in fetcher.iterar_sync(target_dates):
+                    all_basic_results.extend(nuevos)
                 
                 final = [normalize_mp_document(item, False) for item in all_basic_results]
                 
-                # PERSISTENCIA EN SEGUNDO PLANO
-                def persist_results(results_raw):
-                    for item in results_raw:
-                        try:
-                            codigo = item.get('CodigoExterno')
-                            if not codigo: continue
-                            norm = normalize_mp_document(item, False)
-                            f_creacion_str = norm['Fechas']['FechaCreacion']
-                            f_creacion = None
-                            if f_creacion_str:
-                                try:
-                                    clean_iso = f_creacion_str.replace('Z', '').replace(' ', 'T')
-                                    if 'T' not in clean_iso: clean_iso += 'T00:00:00'
-                                    f_creacion = datetime.fromisoformat(clean_iso)
-                                    if f_creacion.tzinfo is None: f_creacion = make_aware(f_creacion)
-                                except: pass
-
-                            LicitacionMP.objects.update_or_create(
-                                codigo_externo=codigo,
-                                defaults={
-                                    'nombre': item.get('Nombre', '')[:500],
-                                    'estado_nombre': item.get('EstadoNombre', '') or item.get('Estado', '')[:100],
-                                    'codigo_estado': item.get('CodigoEstado'),
-                                    'fecha_creacion': f_creacion,
-                                    'json_data': norm
-                                }
-                            )
-                        except: pass
-                threading.Thread(target=persist_results, args=(all_basic_results,), daemon=True).start()
+                # PERSISTENCIA EN SEGUNDO PLANO (cola de tareas, upsert por lotes)
+                if final:
+                    rango = f"{target_dates[0]}-{target_dates[-1]}"
+                    encolar('licitaciones.persistir', clave=f"lic:{codigo_organismo}:{rango}",
+                            normalizados=final, origen=rango)
 
+                meta = {
+                    **fetcher.meta(target_dates),
+                    'total_bruto': len(all_basic_results),
+                    'total_final': len(final),
+                }
+                guardar_meta('lic', codigo_organismo, target_dates, meta)
                 return Response({
-                    'resultados': final,
-                    'meta': {
-                        'dias_ok': len(target_dates) - len(failed_dates),
-                        'dias_fallidos': len(failed_dates),
-                        'total_bruto': len(all_basic_results),
-                        'total_final': len(final),
-                        'rango': f"{target_dates[0]} - {target_dates[-1]}",
-                        'api_saturada': len(failed_dates) > (len(target_dates) / 2)
-                    }
+                    'resultados': [sin_raw(doc) for doc in final],
+                    'meta': meta,
                 })
 
             params = {}
@@ -466,8 +313,65 @@ class VisorLicitacionesView(GenericAPIView):
             basic = mercado_publico_request('licitaciones', params, user_ticket=ticket)
             is_full = True if codigo else False
             final = [normalize_mp_document(item, is_full) for item in basic]
-            return Response(final)
+            return Response(final if include_raw else [sin_raw(doc) for doc in final])
             
         except Exception as e:
             print(traceback.format_exc())
             return Response({"error": str(e)}, status=503)
+
+    @staticmethod
+    def _stream_rango(fetcher, fechas, codigo_organismo):
+        """Documentos del rango a medida que llega cada día; cada día se encola para persistir."""
+        total = 0
+        for date_str, nuevos in fetcher.iterar_sync(fechas):
+            final = [normalize_mp_document(item, False) for item in nuevos]
+            if final:
+                encolar('licitaciones.persistir', clave=f"lic:{codigo_organismo}:{date_str}",
+                        normalizados=final, origen=date_str)
+            total += len(final)
+            for doc in final:
+                yield sin_raw(doc)
+        guardar_meta('lic', codigo_organismo, fechas, {
+            **fetcher.meta(fechas), 'total_bruto': total, 'total_final': total,
+        })
+
+
+class VisorLicitacionesMetaView(APIView):
+    """
+    Estadísticas de un rango del visor (fecha_inicio/fecha_fin o mes/anio)
+    sin los documentos: conteos de la BD local y la meta de la última
+    consulta a la API para ese rango.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request, *args, **kwargs):
+        fecha_inicio = request.query_params.get('fecha_inicio')
+        fecha_fin = request.query_params.get('fecha_fin')
+        mes = request.query_params.get('mes')
+        anio = request.query_params.get('anio')
+        codigo_organismo = request.query_params.get('CodigoOrganismo', '1820906')
+        try:
+            fechas = fechas_rango(fecha_inicio, fecha_fin, mes, anio)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not fechas:
+            return Response({"error": "Indique fecha_inicio y fecha_fin, o mes y anio."}, status=status.HTTP_400_BAD_REQUEST)
+
+        inicio = datetime.strptime(fechas[0], '%d%m%Y')
+        fin = datetime.strptime(fechas[-1], '%d%m%Y') + timedelta(days=1)
+        query = LicitacionMP.objects.filter(fecha_creacion__range=(inicio, fin))
+        local = query.aggregate(
+            total=Count('pk'),
+            enriquecidas=Count('pk', filter=Q(is_enriquecida=True)),
+            monto_estimado=Sum('monto_estimado'),
+        )
+        local['por_estado'] = dict(
+            query.values_list('estado_nombre').annotate(n=Count('pk')).order_by('estado_nombre')
+        )
+        return Response({
+            'rango': f"{fechas[0]} - {fechas[-1]}",
+            'dias': len(fechas),
+            'local': local,
+            'api': leer_meta('lic', codigo_organismo, fechas),
+        })
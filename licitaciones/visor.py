@@ -0,0 +1,124 @@
+"""
+Apoyo común de los visores MP (licitaciones y OCs).
+
+  - Rangos de fechas en el formato ddmmyyyy que pide la API.
+  - Modo NDJSON (?formato=ndjson o Accept: application/x-ndjson): un
+    documento por línea enviado a medida que llegan los días, para que el
+    frontend pinte progresivamente y el servidor no arme la respuesta
+    completa en memoria.
+  - Meta de la última consulta a la API por rango (dias_ok, api_saturada,
+    total_final, ...), guardada en el backend de la caché MP compartida
+    (MP_CACHE_BACKEND) y servida aparte por visor/meta/, así la lee
+    cualquier worker o contenedor.
+"""
+import calendar
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.response import Response
+
+from .mp_cache import clave_para, get_cache
+
+logger = logging.getLogger('mercado_publico')
+
+META_TTL = 24 * 3600
+
+
+def fechas_rango(fecha_inicio=None, fecha_fin=None, mes=None, anio=None):
+    """Días ddmmyyyy de [fecha_inicio, fecha_fin] (YYYY-MM-DD) o del mes (hasta hoy si es el mes en curso)."""
+    if fecha_inicio and fecha_fin:
+        inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d')
+        fin = datetime.strptime(fecha_fin, '%Y-%m-%d')
+        return [(inicio + timedelta(days=i)).strftime('%d%m%Y') for i in range((fin - inicio).days + 1)]
+    if mes and anio:
+        ultimo = calendar.monthrange(int(anio), int(mes))[1]
+        hoy = datetime.now()
+        if int(anio) == hoy.year and int(mes) == hoy.month:
+            ultimo = hoy.day
+        return [f"{str(d).zfill(2)}{str(mes).zfill(2)}{anio}" for d in range(1, ultimo + 1)]
+    return []
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Permite negociar Accept: application/x-ndjson; los errores salen como una línea JSON."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+
+
+def pide_ndjson(request):
+    return (request.query_params.get('formato', '').lower() == 'ndjson'
+            or getattr(request, 'accepted_media_type', None) == NDJSONRenderer.media_type)
+
+
+def respuesta_ndjson(documentos):
+    """StreamingHttpResponse con un documento JSON por línea."""
+    def lineas():
+        try:
+            for doc in documentos:
+                yield json.dumps(doc, ensure_ascii=False, default=str) + '\n'
+        except Exception:
+            # Los headers ya salieron: registrar y cortar el stream
+            logger.exception("Error generando respuesta NDJSON del visor")
+
+    respuesta = StreamingHttpResponse(lineas(), content_type='application/x-ndjson')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'  # nginx: enviar cada línea sin acumular
+    return respuesta
+
+
+def _params_meta(tipo, organismo, fechas):
+    return {'tipo': tipo, 'organismo': organismo, 'desde': fechas[0], 'hasta': fechas[-1]}
+
+
+def guardar_meta(tipo, organismo, fechas, meta):
+    if not fechas:
+        return
+    params = _params_meta(tipo, organismo, fechas)
+    vence = time.time() + META_TTL
+    try:
+        get_cache().backend.guardar(clave_para('visor-meta', params), 'visor-meta', params, meta, vence, vence)
+    except Exception:
+        logger.exception("No se pudo guardar la meta del visor")
+
+
+def leer_meta(tipo, organismo, fechas):
+    if not fechas:
+        return None
+    entrada = get_cache().backend.leer(clave_para('visor-meta', _params_meta(tipo, organismo, fechas)))
+    if entrada is None or time.time() >= entrada.stale_hasta:
+        return None
+    return entrada.payload
+
+
+class RangoLocalMixin:
+    """Respuesta de los visores para un rango servido desde la BD local."""
+
+    def respuesta_local(self, request, query, meta, clave_total='total_final'):
+        query = self.filter_queryset(query)
+        if pide_ndjson(request):
+            return respuesta_ndjson(query.values_list('json_data', flat=True).iterator(chunk_size=500))
+
+        # El cursor necesita las columnas de orden además del documento
+        pagina = self.paginate_queryset(query.values('json_data', *self.ordering_fields))
+        if pagina is None:
+            results = list(query.values_list('json_data', flat=True))
+        else:
+            results = [fila['json_data'] for fila in pagina]
+        return Response({
+            'resultados': results,
+            'meta': {
+                **meta,
+                clave_total: len(results),
+                **(self.paginator.meta() if pagina is not None else {}),
+            }
+        })
@@ -3,51 +3,72 @@ Management command: sync_oc_providers
 Reintenta obtener el proveedor de las OCs que quedaron sin esa información
 (generalmente por Error 500 temporal en la API de Mercado Público).
 
-Uso manual:
+Cada ejecución toma un lote acotado (MP_OC_PROVEEDOR_LOTE) de OCs sin
+proveedor cuyo backoff ya venció, las menos reintentadas y más recientes
+primero (índice parcial oc_sin_proveedor_idx), las consulta en paralelo
+sobre el cliente MP compartido y guarda todo con bulk_update. Cada fallo
+duplica la espera de esa OC (proveedor_reintentar_desde).
+
+Se ejecuta cada hora como la tarea periódica 'orden_compra.sync_proveedores'
+(orden_compra/tareas.py) en run_worker. Uso manual (una pasada):
     python manage.py sync_oc_providers
-
-Se lanza automáticamente desde apps.py al iniciar el servidor.
 """
-import time
-import requests
-import urllib3
 import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from licitaciones.mp_client import get_client, MPError
+from licitaciones.models import PayloadMP
+from licitaciones.mp_persist import columnas_proveedor, guardar_payloads, hash_contenido, parse_monto_mp
 from orden_compra.models import OrdenCompraMP
 
-urllib3.disable_warnings()
 logger = logging.getLogger('oc_sync')
 
-TICKET = "F23CBE04-6C9D-40C4-985C-7F5FCD6070B6"
-TICKET_BACKUP = "F8537A18-6766-4DEF-9E59-426B4FEE2844"
-BASE_URL = "https://api.mercadopublico.cl/servicios/v1/publico/ordenesdecompra.json"
+CAMPOS_REPARACION = [
+    'json_data', 'json_hash', 'proveedor_rut', 'proveedor_nombre', 'tiene_proveedor', 'monto_total',
+    'proveedor_intentos', 'proveedor_reintentar_desde',
+]
 
 
 def fetch_oc_detail(codigo: str) -> dict | None:
     """Obtiene el detalle de una OC por su código. Devuelve el dict o None."""
-    for ticket in [TICKET, TICKET_BACKUP]:
-        try:
-            res = requests.get(
-                BASE_URL,
-                params={'codigo': codigo, 'ticket': ticket},
-                timeout=15,
-                verify=False
-            )
-            if res.status_code == 200:
-                js = res.json()
-                listado = js.get('Listado', [])
-                if listado:
-                    return listado[0]
-            elif res.status_code == 429:
-                time.sleep(5)
-        except Exception:
-            pass
-    return None
+    try:
+        js = get_client().get('ordenesdecompra', {'codigo': codigo})
+    except MPError:
+        return None
+    finally:
+        # Corre en un thread del pool: la caché MP usa su propia conexión a la BD
+        close_old_connections()
+    listado = js.get('Listado', []) if isinstance(js, dict) else []
+    return listado[0] if listado else None
+
+
+def backoff_proveedor(intentos: int) -> float:
+    """Segundos hasta el próximo intento de una OC tras `intentos` fallos."""
+    base = settings.MP_OC_PROVEEDOR_BACKOFF_BASE * (2 ** max(0, intentos - 1))
+    return min(settings.MP_OC_PROVEEDOR_BACKOFF_MAX, base) * random.uniform(0.9, 1.1)
+
+
+def candidatas(limite: int | None = None) -> list[OrdenCompraMP]:
+    """OCs sin proveedor con el backoff vencido: menos reintentos y más recientes primero."""
+    return list(
+        OrdenCompraMP.objects.filter(tiene_proveedor=False)
+        .filter(Q(proveedor_reintentar_desde__isnull=True) | Q(proveedor_reintentar_desde__lte=timezone.now()))
+        .order_by('proveedor_intentos', '-fecha_creacion')[:limite or settings.MP_OC_PROVEEDOR_LOTE]
+    )
 
 
 def patch_oc_provider(oc: OrdenCompraMP, raw: dict) -> bool:
-    """Actualiza el proveedor de una OC con los datos frescos de la API."""
+    """
+    Aplica en memoria el proveedor de una OC con los datos frescos de la API
+    (no guarda: run_sync escribe el lote con bulk_update).
+    """
     prov_raw = raw.get('Proveedor', {}) or {}
     nombre = prov_raw.get('Nombre') or prov_raw.get('NombreProveedor') or ''
     rut = prov_raw.get('RutSucursal') or prov_raw.get('Rut') or ''
@@ -74,59 +95,66 @@ def patch_oc_provider(oc: OrdenCompraMP, raw: dict) -> bool:
         json_data['MontoTotal'] = raw.get('TotalNeto') or raw.get('Total') or 0
 
     oc.json_data = json_data
-    oc.save(update_fields=['json_data'])
+    for campo, valor in columnas_proveedor(json_data['Proveedor']).items():
+        setattr(oc, campo, valor)
+    if oc.monto_total is None:
+        oc.monto_total = parse_monto_mp(json_data['MontoTotal'])
+    oc.json_hash = hash_contenido(json_data)
+    oc.proveedor_intentos = 0
+    oc.proveedor_reintentar_desde = None
     return True
 
 
-def run_sync(verbose: bool = True) -> dict:
+def run_sync(verbose: bool = True, limite: int | None = None, workers: int | None = None) -> dict:
     """
     Función principal de sincronización.
-    Busca OCs sin proveedor y reintenta obtenerlos de la API.
+    Reintenta el proveedor de un lote de OCs candidatas y guarda el resultado
+    (o el próximo reintento de cada OC) con bulk_update.
     Devuelve un resumen de resultados.
     """
-    # Buscar OCs con proveedor vacío en la DB
-    sin_proveedor = []
-    for oc in OrdenCompraMP.objects.all():
-        prov = oc.json_data.get('Proveedor', {})
-        nombre = prov.get('Nombre', '') or prov.get('RazonSocial', '') or prov.get('Rut', '')
-        if not nombre:
-            sin_proveedor.append(oc)
+    sin_proveedor = candidatas(limite)
 
     if not sin_proveedor:
         if verbose:
-            logger.info("sync_oc_providers: Todas las OCs tienen proveedor ✓")
-        return {'total': 0, 'updated': 0, 'failed': 0}
+            logger.info("sync_oc_providers: No hay OCs sin proveedor por reintentar ✓")
+        return {'total': 0, 'updated': 0, 'failed': 0, 'remaining': 0}
 
+    workers = workers or settings.MP_OC_PROVEEDOR_WORKERS
     if verbose:
-        logger.info(f"sync_oc_providers: Encontradas {len(sin_proveedor)} OCs sin proveedor. Iniciando re-sincronización...")
+        logger.info(f"sync_oc_providers: {len(sin_proveedor)} OCs sin proveedor ({workers} en paralelo). Iniciando re-sincronización...")
 
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        detalles = list(executor.map(fetch_oc_detail, [oc.codigo_externo for oc in sin_proveedor]))
+
+    ahora = timezone.now()
     updated = 0
     failed = 0
+    payloads = {}
 
-    for oc in sin_proveedor:
-        raw = fetch_oc_detail(oc.codigo_externo)
-        if raw:
-            ok = patch_oc_provider(oc, raw)
-            if ok:
-                updated += 1
-                if verbose:
-                    prov_nombre = oc.json_data.get('Proveedor', {}).get('Nombre', '?')
-                    logger.info(f"  ✓ {oc.codigo_externo} -> {prov_nombre}")
-            else:
-                failed += 1
-                if verbose:
-                    logger.info(f"  ⏳ {oc.codigo_externo} -> API no tiene el dato aún")
-        else:
-            failed += 1
+    for oc, raw in zip(sin_proveedor, detalles):
+        if raw and patch_oc_provider(oc, raw):
+            updated += 1
+            payloads[oc.codigo_externo] = raw
             if verbose:
-                logger.info(f"  ✗ {oc.codigo_externo} -> API no disponible (Error 500 / timeout)")
-        
-        # Pausa entre peticiones para no saturar Mercado Público
-        time.sleep(1)
+                logger.info(f"  ✓ {oc.codigo_externo} -> {oc.proveedor_nombre or '?'}")
+            continue
+
+        failed += 1
+        oc.proveedor_intentos += 1
+        oc.proveedor_reintentar_desde = ahora + timedelta(seconds=backoff_proveedor(oc.proveedor_intentos))
+        if verbose:
+            motivo = "API no tiene el dato aún" if raw else "API no disponible (Error 500 / timeout)"
+            logger.info(f"  {'⏳' if raw else '✗'} {oc.codigo_externo} -> {motivo}; "
+                        f"reintento {oc.proveedor_reintentar_desde:%d-%m %H:%M}")
 
-    summary = {'total': len(sin_proveedor), 'updated': updated, 'failed': failed}
+    OrdenCompraMP.objects.bulk_update(sin_proveedor, CAMPOS_REPARACION, batch_size=settings.MP_UPSERT_BATCH_SIZE)
+    guardar_payloads(PayloadMP.ORDEN_COMPRA, payloads)
+
+    summary = {'total': len(sin_proveedor), 'updated': updated, 'failed': failed,
+               'remaining': OrdenCompraMP.objects.filter(tiene_proveedor=False).count()}
     if verbose:
-        logger.info(f"sync_oc_providers: Fin → {updated} actualizados, {failed} pendientes.")
+        logger.info(f"sync_oc_providers: Fin → {updated} actualizados, {failed} con reintento programado, "
+                    f"{summary['remaining']} OCs aún sin proveedor.")
     return summary
 
 
@@ -134,40 +162,15 @@ class Command(BaseCommand):
     help = 'Reintenta obtener el proveedor de las OCs que quedaron sin información.'
 
     def add_arguments(self, parser):
-        parser.add_argument(
-            '--loop',
-            action='store_true',
-            help='Ejecutar en bucle infinito, reintentando cada hora.',
-        )
-        parser.add_argument(
-            '--interval',
-            type=int,
-            default=3600,
-            help='Intervalo en segundos entre cada intento (default: 3600 = 1 hora).',
-        )
+        parser.add_argument('--limite', type=int, default=None,
+                            help='OCs a procesar en esta pasada (default: MP_OC_PROVEEDOR_LOTE)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Consultas en paralelo (default: MP_OC_PROVEEDOR_WORKERS)')
 
     def handle(self, *args, **options):
-        loop = options.get('loop', False)
-        interval = options.get('interval', 3600)
-
         self.stdout.write(self.style.SUCCESS('🔄 Iniciando sync_oc_providers...'))
-
-        if loop:
-            self.stdout.write(f'Modo bucle activo. Intervalo: {interval}s ({interval // 60} min)')
-            while True:
-                summary = run_sync(verbose=True)
-                if summary['failed'] == 0:
-                    self.stdout.write(self.style.SUCCESS(
-                        f"✅ Todas las OCs actualizadas. Próxima verificación en {interval // 60} min."
-                    ))
-                else:
-                    self.stdout.write(self.style.WARNING(
-                        f"⏳ {summary['updated']} actualizados, {summary['failed']} aún pendientes. "
-                        f"Reintento en {interval // 60} min."
-                    ))
-                time.sleep(interval)
-        else:
-            summary = run_sync(verbose=True)
-            self.stdout.write(self.style.SUCCESS(
-                f"Fin: {summary['updated']} actualizados, {summary['failed']} aún pendientes."
-            ))
+        summary = run_sync(verbose=True, limite=options['limite'], workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Fin: {summary['updated']} actualizados, {summary['failed']} con reintento programado, "
+            f"{summary['remaining']} aún sin proveedor."
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orden_compra', '0002_ordencompramp_json_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordencompramp',
+            name='codigo_licitacion',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='ordencompramp',
+            name='proveedor_nombre',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='ordencompramp',
+            name='proveedor_rut',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='ordencompramp',
+            name='tiene_proveedor',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.AddField(
+            model_name='ordencompramp',
+            name='tipo_compra',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=60),
+        ),
+        migrations.AlterField(
+            model_name='ordencompramp',
+            name='monto_total',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=15, null=True),
+        ),
+    ]
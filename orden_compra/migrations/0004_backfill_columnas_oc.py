@@ -0,0 +1,48 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+
+def _monto(valor):
+    if valor in (None, ''):
+        return None
+    try:
+        return Decimal(str(valor)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def backfill_columnas(apps, schema_editor):
+    OrdenCompraMP = apps.get_model('orden_compra', 'OrdenCompraMP')
+    campos = ['proveedor_rut', 'proveedor_nombre', 'tiene_proveedor', 'tipo_compra', 'codigo_licitacion', 'monto_total']
+    lote = []
+    for oc in OrdenCompraMP.objects.only('pk', 'json_data', 'monto_total').iterator(chunk_size=500):
+        data = oc.json_data or {}
+        prov = data.get('Proveedor') or {}
+        raw = data.get('_raw') or {}
+        nombre = prov.get('Nombre') or prov.get('RazonSocial') or ''
+        rut = prov.get('Rut') or ''
+        oc.proveedor_rut = rut[:20]
+        oc.proveedor_nombre = nombre[:300]
+        oc.tiene_proveedor = bool(nombre or rut)
+        oc.tipo_compra = (data.get('TipoCompraRepresentativo') or '')[:60]
+        oc.codigo_licitacion = (data.get('CodigoLicitacion') or '')[:50]
+        if oc.monto_total is None:
+            oc.monto_total = _monto(data.get('MontoTotal') or raw.get('TotalNeto') or raw.get('Total'))
+        lote.append(oc)
+        if len(lote) >= 500:
+            OrdenCompraMP.objects.bulk_update(lote, campos)
+            lote = []
+    if lote:
+        OrdenCompraMP.objects.bulk_update(lote, campos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orden_compra', '0003_ordencompramp_codigo_licitacion_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_columnas, migrations.RunPython.noop),
+    ]
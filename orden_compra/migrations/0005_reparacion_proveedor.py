@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orden_compra', '0004_backfill_columnas_oc'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ordencompramp',
+            name='proveedor_intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='ordencompramp',
+            name='proveedor_reintentar_desde',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ordencompramp',
+            index=models.Index(condition=models.Q(('tiene_proveedor', False)), fields=['proveedor_intentos', '-fecha_creacion'], name='oc_sin_proveedor_idx'),
+        ),
+    ]
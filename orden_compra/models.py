@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 
 class OrdenCompraMP(models.Model):
     codigo_externo = models.CharField(max_length=50, unique=True, db_index=True)
@@ -7,13 +8,25 @@ class OrdenCompraMP(models.Model):
     codigo_estado = models.IntegerField(blank=True, null=True, db_index=True)
     
     fecha_creacion = models.DateTimeField(null=True, blank=True, db_index=True)
-    monto_total = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    monto_total = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True, db_index=True)
+
+    # Columnas extraídas de json_data al guardar (filtros del visor sin leer el JSON)
+    proveedor_rut = models.CharField(max_length=20, blank=True, default='', db_index=True)
+    proveedor_nombre = models.CharField(max_length=300, blank=True, default='', db_index=True)
+    tiene_proveedor = models.BooleanField(default=False, db_index=True)
+    tipo_compra = models.CharField(max_length=60, blank=True, default='', db_index=True)
+    codigo_licitacion = models.CharField(max_length=50, blank=True, default='', db_index=True)
+
+    # Reparación de proveedor faltante (sync_oc_providers): reintentos con backoff por OC
+    proveedor_intentos = models.PositiveSmallIntegerField(default=0)
+    proveedor_reintentar_desde = models.DateTimeField(null=True, blank=True)
     
     # Campo para guardar la estructura normalizada completa
     json_data = models.JSONField(verbose_name="Ficha Normalizada", null=True, blank=True)
     
     # Metadata interna de gestión
     is_enriquecida = models.BooleanField(default=False)
+    json_hash = models.CharField(max_length=64, blank=True, default='', help_text="SHA-256 de json_data (ver licitaciones/mp_persist.py)")
     last_sync = models.DateTimeField(auto_now=True)
 
     def __str__(self):
@@ -23,3 +36,11 @@ class OrdenCompraMP(models.Model):
         verbose_name = "Orden de Compra Mercado Público"
         verbose_name_plural = "Órdenes de Compra Mercado Público"
         ordering = ['-fecha_creacion']
+        indexes = [
+            # Candidatas a reparar: solo las OCs sin proveedor, en el orden en que se procesan
+            models.Index(
+                fields=['proveedor_intentos', '-fecha_creacion'],
+                condition=Q(tiene_proveedor=False),
+                name='oc_sin_proveedor_idx',
+            ),
+        ]
@@ -0,0 +1,38 @@
+import logging
+import time
+
+from core.cola import tarea
+from licitaciones.mp_persist import upsert_ordenes_compra
+
+logger = logging.getLogger('oc_sync')
+
+
+@tarea('orden_compra.persistir')
+def persistir_ordenes_compra(normalizados, origen=''):
+    """Guarda en OrdenCompraMP las OCs consultadas por el visor."""
+    resultado = upsert_ordenes_compra(normalizados)
+    logger.info("Persistencia OCs %s: %s", origen, resultado)
+    if resultado.fallidos and len(resultado.fallidos) == resultado.total:
+        raise RuntimeError(f"No se pudo guardar ninguna OC: {resultado.fallidos[0][1]}")
+
+
+@tarea('orden_compra.sync_proveedores', cada=3600)
+def sync_proveedores():
+    """
+    Único punto de ejecución de la reparación de proveedores: cada hora
+    procesa lotes mientras vengan llenos, sin pasar de la mitad de
+    TAREAS_TIMEOUT (lo que quede sigue en la próxima hora).
+    """
+    from django.conf import settings
+    from orden_compra.management.commands.sync_oc_providers import run_sync
+
+    limite = time.monotonic() + settings.TAREAS_TIMEOUT / 2
+    while True:
+        summary = run_sync(verbose=True)
+        if summary['total'] > 0:
+            logger.info(
+                f"[AUTO-SYNC OC] {summary['updated']} proveedores actualizados, "
+                f"{summary['failed']} con reintento programado, {summary['remaining']} aún sin proveedor."
+            )
+        if summary['total'] < settings.MP_OC_PROVEEDOR_LOTE or time.monotonic() > limite:
+            break
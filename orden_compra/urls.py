@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import VisorOCView
+from .views import VisorOCMetaView, VisorOCView
 
 urlpatterns = [
     path('visor/', VisorOCView.as_view(), name='visor-oc'),
+    path('visor/meta/', VisorOCMetaView.as_view(), name='visor-oc-meta'),
 ]
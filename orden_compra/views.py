@@ -1,20 +1,26 @@
 import os
 import hashlib
-import requests
 import json
-import time
-import threading
 import calendar
 import traceback
 from datetime import datetime, timedelta
-from django.utils.timezone import make_aware
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from rest_framework.views import APIView
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from django.db.models import Count, Q, Sum
 from .models import OrdenCompraMP
+from core.cola import encolar
+from licitaciones.mp_cache import get_cache
+from licitaciones.models import PayloadMP
+from licitaciones.mp_client import get_client, extraer_listado, MPError
+from licitaciones.mp_persist import con_raw, sin_raw
+from licitaciones.mp_range import RangeFetcher
+from licitaciones.pagination import VisorPagination
+from licitaciones.visor import NDJSONRenderer, RangoLocalMixin, fechas_rango, guardar_meta, leer_meta, pide_ndjson, respuesta_ndjson
 
 # --- HELPERS REUTILIZADOS DE LICITACIONES (BASE COMÚN) ---
 
@@ -95,6 +101,7 @@ def normalize_mp_oc(item, has_full_detail=False, fallback_date=None):
         'TipoCompraRepresentativo': tipo_compra,
         'CodigoLicitacion': lic_code,
         'Moneda': item.get('Moneda', 'CLP'),
+        'MontoTotal': item.get('MontoTotal') or item.get('TotalNeto') or item.get('Total') or 0,
         
         'Proveedor': {
             'Nombre': prov_raw.get('Nombre') or prov_raw.get('NombreProveedor') or item.get('NombreProveedor', ''),
@@ -135,54 +142,103 @@ def normalize_mp_oc(item, has_full_detail=False, fallback_date=None):
         '_raw': item
     }
 
+def consultar_oc(params, user_ticket=None):
+    """
+    Consulta de OCs sobre el cliente compartido de MP, con caché compartida
+    para las consultas por fecha o código. Lanza MPError si MP no responde.
+    """
+    def consultar():
+        js = get_client().get('ordenesdecompra', params, user_ticket=user_ticket)
+        return extraer_listado(js)
+
+    if params.get('fecha') or params.get('codigo'):
+        return get_cache().obtener('ordenesdecompra', params, consultar)
+    return consultar()
+
+
 def mp_oc_request(params, user_ticket=None):
     """
-    Helper específico para OC con rotación de tickets y manejo de Error 429.
+    Helper específico para OC. Si MP no responde (o el circuit breaker está
+    abierto) retorna una lista vacía.
     """
-    tickets_pool = [user_ticket, "F23CBE04-6C9D-40C4-985C-7F5FCD6070B6", "F8537A18-6766-4DEF-9E59-426B4FEE2844"]
-    tickets_pool = [t for t in tickets_pool if t and len(t) > 10]
-    
-    session = requests.Session()
-    max_retries = 3 
-    
-    url = "https://api.mercadopublico.cl/servicios/v1/publico/ordenesdecompra.json"
-    
-    for attempt in range(max_retries):
+    try:
+        return consultar_oc(params, user_ticket=user_ticket)
+    except MPError:
+        return []
+
+# Detalles de OCs que una consulta por rango descarga de la API (el resto queda básico)
+DETALLES_POR_RANGO = 40
+
+
+def marcar_fecha_escaneo(results, day_str):
+    """Adjunta a cada ítem del listado la fecha consultada como fallback de FechaCreacion."""
+    scan_date = datetime.strptime(day_str, '%d%m%Y').strftime('%Y-%m-%d')
+    for r in results:
+        r['_scan_date'] = scan_date
+    return results
+
+
+def resolver_ocs(all_raw, ticket, cupo=DETALLES_POR_RANGO):
+    """
+    Documentos normalizados para los ítems de listado `all_raw`: los que ya
+    están en la BD se toman de ahí; del resto se descarga el detalle de hasta
+    `cupo` (10 en paralelo) y los demás quedan básicos. Devuelve
+    (documentos, nuevas), con nuevas = lo que no venía de la BD.
+    """
+    all_codes = [r.get('Codigo') or r.get('CodigoExterno') for r in all_raw if (r.get('Codigo') or r.get('CodigoExterno'))]
+    existing_ocs = dict(OrdenCompraMP.objects.filter(codigo_externo__in=all_codes).values_list('codigo_externo', 'json_data'))
+
+    final_results = []
+    codes_to_fetch = []
+    for raw in all_raw:
+        code = raw.get('Codigo') or raw.get('CodigoExterno')
+        if code in existing_ocs:
+            final_results.append(existing_ocs[code])
+        else:
+            codes_to_fetch.append(raw)
+
+    def fetch_detail_sync(raw_item):
+        cid = raw_item.get('Codigo') or raw_item.get('CodigoExterno')
+        sdate = raw_item.get('_scan_date')
         try:
-            active_ticket = tickets_pool[attempt % len(tickets_pool)]
-            request_params = dict(params)
-            request_params['ticket'] = active_ticket
-            
-            # Pequeño delay aleatorio para no saturar
-            if attempt > 0:
-                time.sleep(attempt * 2) 
+            res = mp_oc_request({'codigo': cid}, user_ticket=ticket)
+            if res:
+                return normalize_mp_oc(res[0], True, fallback_date=sdate)
+        except: pass
+        return normalize_mp_oc(raw_item, False, fallback_date=sdate)
 
-            res = session.get(url, params=request_params, timeout=10, verify=False)
-            
-            if res.status_code == 200:
-                js = res.json()
-                # Si el JSON dice que el ticket no sirve, seguimos al siguiente
-                if isinstance(js, str) and "Ticket" in js:
-                    continue
-                if 'Listado' in js: return js['Listado']
-                if 'Codigo' in js: return [js]
-                return []
-
-            if res.status_code == 429:
-                # Mercado Público nos está bloqueando por exceso de peticiones
-                time.sleep(3 + attempt * 3) # Esperamos progresivamente
-                continue
-                
-        except Exception:
-            time.sleep(2)
-            continue
-            
-    return []
+    nuevas = []
+    to_fetch_now = codes_to_fetch[:max(0, cupo)]
+    if to_fetch_now:
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            sync_futures = [executor.submit(fetch_detail_sync, it) for it in to_fetch_now]
+            for f in as_completed(sync_futures):
+                normed = f.result()
+                if normed: nuevas.append(normed)
+    # El resto como básico (se completa después)
+    for it in codes_to_fetch[len(to_fetch_now):]:
+        nuevas.append(normalize_mp_oc(it, False, fallback_date=it.get('_scan_date')))
+    return final_results + nuevas, nuevas
 
 # --- VISTAS ---
 
-class VisorOCView(GenericAPIView):
+class VisorOCView(RangoLocalMixin, GenericAPIView):
     permission_classes = [AllowAny]
+    # Accept: application/x-ndjson equivale a ?formato=ndjson
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer, NDJSONRenderer]
+    # Filtros/paginación de la consulta local sobre columnas indexadas
+    queryset = OrdenCompraMP.objects.all()
+    pagination_class = VisorPagination
+    filterset_fields = {
+        'proveedor_rut': ['exact'],
+        'tiene_proveedor': ['exact'],
+        'tipo_compra': ['exact'],
+        'codigo_licitacion': ['exact'],
+        'codigo_estado': ['exact'],
+        'monto_total': ['gte', 'lte'],
+    }
+    search_fields = ['codigo_externo', 'nombre', 'proveedor_nombre', 'proveedor_rut']
+    ordering_fields = ['fecha_creacion', 'monto_total', 'proveedor_nombre']
     
     def get(self, request, *args, **kwargs):
         try:
@@ -193,11 +249,14 @@ class VisorOCView(GenericAPIView):
             fecha_inicio = request.query_params.get('fecha_inicio')
             fecha_fin = request.query_params.get('fecha_fin')
             force = request.query_params.get('force', 'false').lower() == 'true'
+            include_raw = request.query_params.get('include_raw', 'false').lower() == 'true'
             
             # --- CONSULTA LOCAL ---
             if not force and codigo_organismo == "1820906":
                 if codigo:
                     local = OrdenCompraMP.objects.filter(codigo_externo=codigo).first()
+                    if local and include_raw:
+                        return Response([con_raw(local.json_data, PayloadMP.ORDEN_COMPRA, codigo)])
                     if local: return Response([local.json_data])
                 
                 elif fecha_inicio and fecha_fin:
@@ -208,138 +267,50 @@ class VisorOCView(GenericAPIView):
                     # (si hay solo 1 o 2, probablemente la sincronizacion fue incompleta)
                     query = OrdenCompraMP.objects.filter(fecha_creacion__range=(start_dt, end_dt + timedelta(days=1)))
                     if query.count() > 10: 
-                        return Response({
-                            'resultados': [o.json_data for o in query],
-                            'meta': {
-                                'source': 'DATABASE', 
-                                'total': query.count(),
-                                'note': 'Datos locales. Use "Refrescar" para sincronización total.'
-                            }
-                        })
+                        return self.respuesta_local(request, query, {
+                            'source': 'DATABASE', 
+                            'note': 'Datos locales. Use "Refrescar" para sincronización total.',
+                        }, clave_total='total')
 
             # --- LÓGICA DE RANGO PARALELO ---
             if fecha_inicio and fecha_fin:
-                start_dt = datetime.strptime(fecha_inicio, '%Y-%m-%d')
-                end_dt = datetime.strptime(fecha_fin, '%Y-%m-%d')
-                delta = end_dt - start_dt
-                target_dates = []
-                for i in range(delta.days + 1):
-                    target_dates.append((start_dt + timedelta(days=i)).strftime('%d%m%Y'))
+                target_dates = fechas_rango(fecha_inicio, fecha_fin)
+
+                def fetch_day(d_str):
+                    return consultar_oc({'fecha': d_str, 'CodigoOrganismo': codigo_organismo}, user_ticket=ticket)
+
+                fetcher = RangeFetcher(fetch_day, clave=lambda r: r.get('Codigo') or r.get('CodigoExterno'))
+                if pide_ndjson(request):
+                    return respuesta_ndjson(self._stream_rango(fetcher, target_dates, codigo_organismo, ticket))
 
                 all_raw = []
-                seen_ids = set()
-                lock = threading.Lock()
+                for day_str, results in fetcher.iterar_sync(target_dates):
+                    all_raw.extend(marcar_fecha_escaneo(results, day_str))
 
-                def fetch_day(d_str):
-                    try:
-                        return d_str, mp_oc_request({'fecha': d_str, 'CodigoOrganismo': codigo_organismo}, user_ticket=ticket)
-                    except:
-                        return d_str, []
-
-                with ThreadPoolExecutor(max_workers=4) as executor:
-                    futures = [executor.submit(fetch_day, d) for d in target_dates]
-                    for f in as_completed(futures):
-                        day_str, results = f.result()
-                        with lock:
-                            for r in results:
-                                rid = r.get('Codigo') or r.get('CodigoExterno')
-                                if rid and rid not in seen_ids:
-                                    # Adjuntamos la fecha del escaneo como fallback
-                                    r['_scan_date'] = datetime.strptime(day_str, '%d%m%Y').strftime('%Y-%m-%d')
-                                    all_raw.append(r)
-                                    seen_ids.add(rid)
-
-                # PHASE 2: SMART DELTA FETCH
-                # 1. Identify what we ALREADY have in DB
-                all_codes = [r.get('Codigo') or r.get('CodigoExterno') for r in all_raw if (r.get('Codigo') or r.get('CodigoExterno'))]
-                existing_ocs = {obj.codigo_externo: obj.json_data for obj in OrdenCompraMP.objects.filter(codigo_externo__in=all_codes)}
-                
-                final_results = []
-                codes_to_fetch = []
-                
-                for raw in all_raw:
-                    code = raw.get('Codigo') or raw.get('CodigoExterno')
-                    if code in existing_ocs:
-                        # Already have full detail in DB
-                        final_results.append(existing_ocs[code])
-                    else:
-                        codes_to_fetch.append(raw)
-
-                # 2. Fetch ONLY missing details from API (to avoid 429 and slowness)
-                if codes_to_fetch:
-                    # Limit to 40 to avoid hanging if range is too giant
-                    to_fetch_now = codes_to_fetch[:40]
-                    
-                    def fetch_detail_sync(raw_item):
-                        cid = raw_item.get('Codigo') or raw_item.get('CodigoExterno')
-                        sdate = raw_item.get('_scan_date')
-                        try:
-                            # Detailed API Call
-                            res = mp_oc_request({'codigo': cid}, user_ticket=ticket)
-                            if res:
-                                return normalize_mp_oc(res[0], True, fallback_date=sdate)
-                        except: pass
-                        return normalize_mp_oc(raw_item, False, fallback_date=sdate)
-
-                    # Use 10 workers for high speed
-                    with ThreadPoolExecutor(max_workers=10) as executor:
-                        sync_futures = [executor.submit(fetch_detail_sync, it) for it in to_fetch_now]
-                        for f in as_completed(sync_futures):
-                            normed = f.result()
-                            if normed: final_results.append(normed)
-                    
-                    # Add any overflow as basic (will be filled later)
-                    if len(codes_to_fetch) > 40:
-                        for it in codes_to_fetch[40:]:
-                            final_results.append(normalize_mp_oc(it, False, fallback_date=it.get('_scan_date')))
-
-                # 3. Background Persistence
-                def persist_final_results_bg(data_list):
-                    for norm in data_list:
-                        try:
-                            c = norm['CodigoExterno']
-                            f_str = norm.get('Fechas', {}).get('FechaCreacion')
-                            f_dt = None
-                            if f_str:
-                                try:
-                                    clean = f_str.split('.')[0].replace('Z', '').replace(' ', 'T')
-                                    f_dt = datetime.fromisoformat(clean) if 'T' in clean else None
-                                except: pass
-                            
-                            if not f_dt and '-' in c:
-                                try:
-                                    yr = "".join(filter(str.isdigit, c.split('-')[-1]))
-                                    if len(yr) == 2: f_dt = datetime(2000 + int(yr), 1, 1)
-                                except: pass
-                            
-                            if f_dt and f_dt.tzinfo is None: f_dt = make_aware(f_dt)
-
-                            OrdenCompraMP.objects.update_or_create(
-                                codigo_externo=c,
-                                defaults={
-                                    'nombre': norm.get('Nombre', '')[:500],
-                                    'monto_total': norm.get('MontoTotal'),
-                                    'estado_nombre': norm.get('Estado', '')[:100],
-                                    'fecha_creacion': f_dt,
-                                    'json_data': norm
-                                }
-                            )
-                        except: pass
-
-                threading.Thread(target=persist_final_results_bg, args=(final_results,), daemon=True).start()
+                # PHASE 2: SMART DELTA FETCH (solo el detalle de lo que no está en la BD)
+                final_results, nuevas = resolver_ocs(all_raw, ticket)
+
+                # 3. Persistencia en segundo plano (cola de tareas), solo lo que no venía de la BD
+                if nuevas:
+                    rango = f"{fecha_inicio}/{fecha_fin}"
+                    encolar('orden_compra.persistir', clave=f"oc:{codigo_organismo}:{rango}",
+                            normalizados=nuevas, origen=rango)
 
                 # Sort results by date descending if possible
                 try:
                     final_results.sort(key=lambda x: x.get('Fechas', {}).get('FechaCreacion', ''), reverse=True)
                 except: pass
 
+                meta = {
+                    **fetcher.meta(target_dates),
+                    'source': 'API_ENRICHED',
+                    'total': len(final_results),
+                    'rango': f"{fecha_inicio} al {fecha_fin}"
+                }
+                guardar_meta('oc', codigo_organismo, target_dates, meta)
                 return Response({
-                    'resultados': final_results,
-                    'meta': {
-                        'source': 'API_ENRICHED',
-                        'total': len(final_results),
-                        'rango': f"{fecha_inicio} al {fecha_fin}"
-                    }
+                    'resultados': [sin_raw(doc) for doc in final_results],
+                    'meta': meta,
                 })
 
             # --- CONSULTA API SIMPLE (UN SOLO DÍA O CÓDIGO) ---
@@ -353,8 +324,58 @@ class VisorOCView(GenericAPIView):
             # Si buscamos por código, forzamos has_full_detail=True para que rellene todos los campos del modal
             final = [normalize_mp_oc(item, True if codigo else False) for item in raw_results]
             
-            return Response(final)
+            return Response(final if include_raw else [sin_raw(doc) for doc in final])
             
         except Exception as e:
             print(traceback.format_exc())
             return Response({"error": str(e)}, status=503)
+
+    @staticmethod
+    def _stream_rango(fetcher, fechas, codigo_organismo, ticket):
+        """OCs del rango a medida que llega cada día; el detalle se reparte el mismo cupo que en JSON."""
+        total, cupo = 0, DETALLES_POR_RANGO
+        for day_str, results in fetcher.iterar_sync(fechas):
+            docs, nuevas = resolver_ocs(marcar_fecha_escaneo(results, day_str), ticket, cupo=cupo)
+            cupo -= min(cupo, len(nuevas))  # detalles intentados en este día
+            if nuevas:
+                encolar('orden_compra.persistir', clave=f"oc:{codigo_organismo}:{day_str}",
+                        normalizados=nuevas, origen=day_str)
+            total += len(docs)
+            for doc in docs:
+                yield sin_raw(doc)
+        guardar_meta('oc', codigo_organismo, fechas, {
+            **fetcher.meta(fechas), 'source': 'API_ENRICHED', 'total': total,
+        })
+
+
+class VisorOCMetaView(APIView):
+    """
+    Estadísticas de un rango del visor de OCs (fecha_inicio/fecha_fin) sin
+    los documentos: conteos de la BD local y la meta de la última consulta a
+    la API para ese rango.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        codigo_organismo = request.query_params.get('CodigoOrganismo', '1820906')
+        try:
+            fechas = fechas_rango(request.query_params.get('fecha_inicio'), request.query_params.get('fecha_fin'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not fechas:
+            return Response({"error": "Indique fecha_inicio y fecha_fin."}, status=status.HTTP_400_BAD_REQUEST)
+
+        inicio = datetime.strptime(fechas[0], '%d%m%Y')
+        fin = datetime.strptime(fechas[-1], '%d%m%Y') + timedelta(days=1)
+        local = OrdenCompraMP.objects.filter(fecha_creacion__range=(inicio, fin)).aggregate(
+            total=Count('pk'),
+            sin_proveedor=Count('pk', filter=Q(tiene_proveedor=False)),
+            enriquecidas=Count('pk', filter=Q(is_enriquecida=True)),
+            monto_total=Sum('monto_total'),
+        )
+        return Response({
+            'rango': f"{fechas[0]} - {fechas[-1]}",
+            'dias': len(fechas),
+            'local': local,
+            'api': leer_meta('oc', codigo_organismo, fechas),
+        })
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Concat
 from django.contrib.auth.models import User
 
 from establecimientos.models import Establecimiento
@@ -33,12 +35,31 @@ class TipoActivo(models.Model):
     def __str__(self):
         return self.nombre
 
+class ActivoQuerySet(models.QuerySet):
+    def con_estado_prestamo(self):
+        """
+        Anota `disponible` (sin préstamo abierto) y `solicitante_actual`
+        ("Nombre Apellido" del préstamo abierto más reciente) en la misma query.
+        """
+        abiertos = Prestamo.objects.filter(activo=OuterRef('pk'), fecha_devolucion__isnull=True)
+        return self.annotate(
+            disponible=~Exists(abiertos),
+            solicitante_actual=Subquery(
+                abiertos.order_by('-fecha_prestamo').annotate(
+                    nombre_completo=Concat('solicitante__nombre', Value(' '), 'solicitante__apellido',
+                                           output_field=models.CharField())
+                ).values('nombre_completo')[:1]
+            ),
+        )
+
 class Activo(models.Model):
     tipo = models.ForeignKey(TipoActivo, on_delete=models.PROTECT, related_name="activos", verbose_name="Tipo de Activo")
     nombre = models.CharField("Nombre", max_length=100)
     codigo_inventario = models.CharField("Código de Inventario", max_length=50, blank=True, help_text="Opcional. Ej: Placa de inventario o S/N")
     establecimiento = models.ForeignKey(Establecimiento, on_delete=models.CASCADE, related_name="activos")
     ubicacion = models.CharField("Ubicación Física", max_length=100, blank=True, help_text="Donde se guarda físicamente")
+
+    objects = ActivoQuerySet.as_manager()
     
     def __str__(self):
         return f"[{self.get_tipo_display()}] {self.nombre} - {self.establecimiento.nombre}"
@@ -37,11 +37,15 @@ class ActivoSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_disponible(self, obj):
-        # Check if there are any active loans (no return date)
+        # Annotated by Activo.objects.con_estado_prestamo(); fallback for plain instances
+        if hasattr(obj, 'disponible'):
+            return obj.disponible
         return not obj.prestamos.filter(fecha_devolucion__isnull=True).exists()
 
     def get_solicitante_actual(self, obj):
-        prestamo = obj.prestamos.filter(fecha_devolucion__isnull=True).first()
+        if hasattr(obj, 'solicitante_actual'):
+            return obj.solicitante_actual
+        prestamo = obj.prestamos.filter(fecha_devolucion__isnull=True).select_related('solicitante').first()
         if prestamo:
             return f"{prestamo.solicitante.nombre} {prestamo.solicitante.apellido}"
         return None
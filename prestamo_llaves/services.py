@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import F, Prefetch, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from .models import Activo, Prestamo, Solicitante
+
+
+class PrestamoError(Exception):
+    """Raised when a bulk loan/transfer cannot be applied; nothing is committed."""
+
+
+def _normalizar_ids(activos_ids):
+    ids = []
+    vistos = set()
+    for valor in activos_ids:
+        try:
+            aid = int(valor)
+        except (TypeError, ValueError):
+            raise PrestamoError(f'ID de activo inválido: {valor}')
+        if aid not in vistos:
+            vistos.add(aid)
+            ids.append(aid)
+    return ids
+
+
+def _bloquear_activos(ids):
+    """Locks the target assets (SELECT ... FOR UPDATE) and checks they all exist."""
+    encontrados = set(Activo.objects.select_for_update().filter(pk__in=ids).values_list('pk', flat=True))
+    faltantes = [aid for aid in ids if aid not in encontrados]
+    if faltantes:
+        raise PrestamoError(f"Activos no encontrados: {', '.join(map(str, faltantes))}")
+
+
+def prestar_activos(activos_ids, solicitante_id, observacion=''):
+    """
+    Creates one open loan per asset in a single transaction. If any asset is
+    already on loan nothing is created.
+    """
+    ids = _normalizar_ids(activos_ids)
+    if not Solicitante.objects.filter(pk=solicitante_id).exists():
+        raise PrestamoError('Solicitante no encontrado')
+
+    with transaction.atomic():
+        _bloquear_activos(ids)
+        ocupados = sorted(set(
+            Prestamo.objects.filter(activo_id__in=ids, fecha_devolucion__isnull=True).values_list('activo_id', flat=True)
+        ))
+        if len(ocupados) == 1:
+            raise PrestamoError(f'El activo (ID {ocupados[0]}) ya se encuentra en préstamo activo.')
+        if ocupados:
+            raise PrestamoError(f"Los activos (IDs {', '.join(map(str, ocupados))}) ya se encuentran en préstamo activo.")
+
+        prestamos = Prestamo.objects.bulk_create([
+            Prestamo(activo_id=aid, solicitante_id=solicitante_id, observacion=observacion)
+            for aid in ids
+        ])
+    return [p.pk for p in prestamos]
+
+
+def traspasar_activos(activos_ids, solicitante, observacion):
+    """
+    Closes the open loans of the assets (one UPDATE) and hands them to
+    `solicitante` with new loans (one INSERT), atomically.
+    """
+    ids = _normalizar_ids(activos_ids)
+    with transaction.atomic():
+        _bloquear_activos(ids)
+        Prestamo.objects.filter(activo_id__in=ids, fecha_devolucion__isnull=True).update(
+            fecha_devolucion=timezone.now(),
+            observacion=Concat(F('observacion'), Value(f" | Traspasado a {solicitante.nombre} {solicitante.apellido}")),
+        )
+        prestamos = Prestamo.objects.bulk_create([
+            Prestamo(activo_id=aid, solicitante=solicitante, observacion=f"Recibida por traspaso. {observacion}")
+            for aid in ids
+        ])
+    return [p.pk for p in prestamos]
+
+
+def prestamos_para_respuesta(prestamo_ids):
+    """Loans with every relation PrestamoSerializer renders, in the given order."""
+    qs = Prestamo.objects.filter(pk__in=prestamo_ids).select_related(
+        'solicitante__funcionario__subdireccion', 'solicitante__funcionario__departamento',
+    ).prefetch_related(
+        Prefetch('activo', queryset=Activo.objects.select_related('establecimiento', 'tipo').con_estado_prestamo()),
+    )
+    por_id = {p.pk: p for p in qs}
+    return [por_id[pk] for pk in prestamo_ids if pk in por_id]
@@ -1,3 +1,47 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from core.query_budget import QueryBudgetExceeded, assert_query_budget
+from establecimientos.models import Establecimiento, TipoEstablecimiento
+
+from .models import Activo, Prestamo, Solicitante, TipoActivo
+
+
+class ActivoQueryBudgetTests(TestCase):
+    """El listado y el detalle de activos no deben superar el query_budget de ActivoViewSet."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tipo_est = TipoEstablecimiento.objects.create(nombre='Escuela')
+        tipo = TipoActivo.objects.create(nombre='Llave')
+        solicitante = Solicitante.objects.create(rut='11111111-1', nombre='Ana', apellido='Pérez')
+        for i in range(3):
+            est = Establecimiento.objects.create(rbd=1000 + i, nombre=f'Escuela {i}', tipo=tipo_est)
+            for j in range(4):
+                activo = Activo.objects.create(tipo=tipo, nombre=f'Llave {i}-{j}', establecimiento=est)
+                if j % 2 == 0:
+                    Prestamo.objects.create(activo=activo, solicitante=solicitante)
+        cls.activo = Activo.objects.first()
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_listado_dentro_del_presupuesto(self):
+        response = assert_query_budget(self.client, 'get', '/api/activos/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 12)
+
+    def test_listado_filtrado_dentro_del_presupuesto(self):
+        response = assert_query_budget(self.client, 'get', '/api/activos/?disponible=false&ordering=solicitante_actual')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 6)
+        self.assertTrue(all(a['solicitante_actual'] == 'Ana Pérez' for a in response.data['results']))
+
+    def test_detalle_dentro_del_presupuesto(self):
+        response = assert_query_budget(self.client, 'get', f'/api/activos/{self.activo.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], self.activo.pk)
+
+    def test_presupuesto_excedido_falla(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            assert_query_budget(self.client, 'get', '/api/activos/', presupuesto=1)
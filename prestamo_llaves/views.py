@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Establecimiento, Solicitante, Activo, Prestamo, TipoActivo
+from .services import PrestamoError, prestar_activos, traspasar_activos, prestamos_para_respuesta
 from .serializers import (
     EstablecimientoSerializer, 
     SolicitanteSerializer, 
@@ -32,26 +33,29 @@ class SolicitanteViewSet(viewsets.ModelViewSet):
     search_fields = ['rut', 'nombre', 'apellido']
 
 class ActivoViewSet(viewsets.ModelViewSet):
-    queryset = Activo.objects.all()
+    queryset = Activo.objects.select_related('establecimiento', 'tipo').con_estado_prestamo()
     serializer_class = ActivoSerializer
     pagination_class = LargeResultsSetPagination
     filterset_fields = {
         'establecimiento': ['exact', 'in'],
         'tipo': ['exact', 'in'],
     }
-    ordering_fields = ['nombre', 'establecimiento__nombre']
+    ordering_fields = ['nombre', 'establecimiento__nombre', 'disponible', 'solicitante_actual']
     search_fields = ['nombre', 'establecimiento__nombre', 'codigo_inventario']
+    query_budget = {'list': 2, 'retrieve': 1}
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        # disponible / solicitante_actual come from the con_estado_prestamo() annotations
         disponible = self.request.query_params.get('disponible')
         if disponible is not None:
-            # Assets with no active loans (return date is null) are considered available
-            active_loans = Prestamo.objects.filter(fecha_devolucion__isnull=True).values_list('activo_id', flat=True)
             if disponible.lower() == 'true':
-                queryset = queryset.exclude(id__in=active_loans)
+                queryset = queryset.filter(disponible=True)
             elif disponible.lower() == 'false':
-                queryset = queryset.filter(id__in=active_loans)
+                queryset = queryset.filter(disponible=False)
+        solicitante_actual = self.request.query_params.get('solicitante_actual')
+        if solicitante_actual:
+            queryset = queryset.filter(solicitante_actual__icontains=solicitante_actual)
         return queryset
 
 class PrestamoViewSet(viewsets.ModelViewSet):
@@ -112,34 +116,14 @@ class PrestamoViewSet(viewsets.ModelViewSet):
             except Funcionario.DoesNotExist:
                 return Response({'error': 'Funcionario no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
-        created_prestamos = []
-        
-        # Validate all keys are available first (Optional, but good practice)
-        # For this MVP, we will try to create them and fail if one is already borrowed? 
-        # Or better: Create loop.
-        
         try:
-            for activo_id in activos_ids:
-                # Validate availability to prevent overlapping active loans
-                if Prestamo.objects.filter(activo_id=activo_id, fecha_devolucion__isnull=True).exists():
-                    return Response({'error': f'El activo (ID {activo_id}) ya se encuentra en préstamo activo.'}, status=status.HTTP_400_BAD_REQUEST)
-
-                data = {
-                    'activo': activo_id,
-                    'solicitante': solicitante_id,
-                    'observacion': observacion,
-                    # 'usuario_entrega': request.user.id # Uncomment if auth is active
-                }
-                serializer = self.get_serializer(data=data)
-                serializer.is_valid(raise_exception=True)
-                self.perform_create(serializer)
-                created_prestamos.append(serializer.data)
-                
-            return Response(created_prestamos, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
+            prestamo_ids = prestar_activos(activos_ids, solicitante_id, observacion)
+        except PrestamoError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        serializer = self.get_serializer(prestamos_para_respuesta(prestamo_ids), many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     def _get_or_create_director_solicitante(self, establecimiento_id):
         from establecimientos.models import Establecimiento
         try:
@@ -195,32 +179,19 @@ class PrestamoViewSet(viewsets.ModelViewSet):
         if not dest_solicitante_id:
             return Response({'error': 'Debe seleccionar un destino para el traspaso'}, status=status.HTTP_400_BAD_REQUEST)
 
-        dest_solicitante = Solicitante.objects.get(id=dest_solicitante_id)
-        now = timezone.now()
-        results = []
-
         try:
-            for aid in activos_ids:
-                # 1. Close current active loan
-                active_loan = Prestamo.objects.filter(activo_id=aid, fecha_devolucion__isnull=True).first()
-                if active_loan:
-                    active_loan.fecha_devolucion = now
-                    active_loan.observacion += f" | Traspasado a {dest_solicitante.nombre} {dest_solicitante.apellido}"
-                    active_loan.save()
-
-                # 2. Create new loan
-                new_loan = Prestamo.objects.create(
-                    activo_id=aid,
-                    solicitante_id=dest_solicitante_id,
-                    observacion=f"Recibida por traspaso. {observacion}",
-                    # usuario_entrega=request.user # Uncomment if auth
-                )
-                results.append(self.get_serializer(new_loan).data)
+            dest_solicitante = Solicitante.objects.get(id=dest_solicitante_id)
+        except Solicitante.DoesNotExist:
+            return Response({'error': 'Solicitante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
-            return Response(results, status=status.HTTP_201_CREATED)
-        except Exception as e:
+        try:
+            prestamo_ids = traspasar_activos(activos_ids, dest_solicitante, observacion)
+        except PrestamoError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+        serializer = self.get_serializer(prestamos_para_respuesta(prestamo_ids), many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def devolver(self, request, pk=None):
         prestamo = self.get_object()
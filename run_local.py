@@ -32,6 +32,9 @@ RESERVAS_ADMIN_EMAIL=
 
 # Frontend
 FRONTEND_URL=http://localhost:5173
+
+# Cola de tareas: ejecutar en el acto (sin run_worker)
+TAREAS_EAGER=True
 """
 
 def main():
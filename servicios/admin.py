@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Proveedor, TipoDocumento, Servicio, TipoProveedor, RegistroPago, CDP, TipoEntrega, FacturaAdquisicion, RecepcionConforme
+from .models import Proveedor, TipoDocumento, Servicio, TipoProveedor, RegistroPago, CDP, TipoEntrega, FacturaAdquisicion, RecepcionConforme, SecuenciaFolio
 
 @admin.register(TipoProveedor)
 class TipoProveedorAdmin(admin.ModelAdmin):
@@ -51,3 +51,8 @@ class FacturaAdquisicionAdmin(admin.ModelAdmin):
     list_filter = ('proveedor', 'establecimiento', 'tipo_entrega', 'firmante')
     search_fields = ('descripcion', 'proveedor__nombre', 'firmante__nombre_funcionario')
     autocomplete_fields = ['proveedor', 'establecimiento', 'firmante']
+
+@admin.register(SecuenciaFolio)
+class SecuenciaFolioAdmin(admin.ModelAdmin):
+    list_display = ('prefijo', 'anio', 'ultimo')
+    list_filter = ('prefijo', 'anio')
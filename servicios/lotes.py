@@ -0,0 +1,88 @@
+"""
+Lotes grandes de PDFs de Recepciones Conformes.
+
+generate_pdf_batch crea un LotePDF y encola 'servicios.lote_pdf_rc'
+(servicios/tareas.py); el worker genera el ZIP o PDF unido en
+MEDIA_ROOT/pdf_lotes/<token>.<formato> y va guardando el avance en la fila,
+que es lo que consultan los endpoints de progreso y descarga desde
+cualquier proceso.
+"""
+import os
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from . import pdf
+from .models import LotePDF, RecepcionConforme, RegistroPago
+
+CARPETA = 'pdf_lotes'
+# Segundos mínimos entre escrituras del avance en la BD
+INTERVALO_AVANCE = 1.0
+
+
+def cargar_lote(ids):
+    """[(rc, registros)] de las RCs `ids`, en ese orden y con todo precargado para el render."""
+    rcs = RecepcionConforme.objects.filter(id__in=ids).select_related(
+        'proveedor', 'firmante__departamento', 'firmante__subdireccion'
+    ).prefetch_related(
+        Prefetch('registros', queryset=RegistroPago.objects.select_related('servicio', 'establecimiento'))
+    ).in_bulk()
+    return [(rcs[pk], list(rcs[pk].registros.all())) for pk in ids if pk in rcs]
+
+
+def escribir_zip(destino, lote, progreso=None):
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for folio, contenido in pdf.render_lote_recepciones(lote, workers=settings.PDF_BATCH_WORKERS, progreso=progreso):
+            zf.writestr(f'{folio}.pdf', contenido)
+
+
+def generar(lote_pdf):
+    """Genera el archivo del lote, registrando el avance; deja el lote en OK o FALLIDO."""
+    LotePDF.objects.filter(pk=lote_pdf.pk).update(estado=LotePDF.EJECUTANDO, hechos=0, error='')
+    ultimo = [0.0]
+
+    def progreso(hechos, total):
+        ahora = time.monotonic()
+        if hechos == total or ahora - ultimo[0] >= INTERVALO_AVANCE:
+            ultimo[0] = ahora
+            LotePDF.objects.filter(pk=lote_pdf.pk).update(hechos=hechos)
+
+    carpeta = os.path.join(settings.MEDIA_ROOT, CARPETA)
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = f'{CARPETA}/{lote_pdf.token}.{lote_pdf.formato}'
+    fd, tmp_path = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    try:
+        lote = cargar_lote(lote_pdf.ids)
+        with os.fdopen(fd, 'wb') as destino:
+            if lote_pdf.formato == 'pdf':
+                destino.write(pdf.render_recepciones_unidas(lote, progreso=progreso))
+            else:
+                escribir_zip(destino, lote, progreso=progreso)
+        os.replace(tmp_path, os.path.join(settings.MEDIA_ROOT, ruta))
+    except Exception as exc:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        LotePDF.objects.filter(pk=lote_pdf.pk).update(
+            estado=LotePDF.FALLIDO, error=str(exc)[:1000], terminado=timezone.now(),
+        )
+        raise
+    LotePDF.objects.filter(pk=lote_pdf.pk).update(
+        estado=LotePDF.OK, archivo=ruta, hechos=len(lote), total=len(lote), terminado=timezone.now(),
+    )
+
+
+def limpiar(horas=None):
+    """Elimina los lotes (y sus archivos) de más de `horas` (PDF_BATCH_TTL_HORAS)."""
+    limite = timezone.now() - timedelta(hours=horas or settings.PDF_BATCH_TTL_HORAS)
+    vencidos = LotePDF.objects.filter(creado__lt=limite)
+    for archivo in vencidos.exclude(archivo='').values_list('archivo', flat=True):
+        try:
+            os.remove(os.path.join(settings.MEDIA_ROOT, archivo))
+        except OSError:
+            pass
+    return vencidos.delete()[0]
@@ -0,0 +1,60 @@
+"""
+Management command: benchmark_pdf
+Mide el tiempo de render por documento de los PDFs de servicios, comparando
+el render en frío (estilos y logos reconstruidos en cada documento, como en
+cada request antes del caché) contra el render con los recursos compartidos.
+
+Uso:
+    python manage.py benchmark_pdf --iteraciones 50
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from servicios import pdf
+from servicios.models import RegistroPago, RecepcionConforme, FacturaAdquisicion
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark del render de PDFs de servicios (frío vs. recursos en caché).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteraciones', type=int, default=20, help='Renders por documento y modo.')
+
+    def handle(self, *args, **options):
+        n = max(1, options['iteraciones'])
+
+        rc = RecepcionConforme.objects.select_related('proveedor', 'firmante').order_by('-id').first()
+        casos = [
+            ('Registro de Pago', RegistroPago.objects.select_related(
+                'establecimiento', 'servicio__proveedor').order_by('-id').first(), pdf.render_registro_pago),
+            ('Recepción Conforme', rc, lambda obj: pdf.render_recepcion_conforme(obj, registros=registros_rc)),
+            ('Factura Adquisición', FacturaAdquisicion.objects.select_related(
+                'proveedor', 'tipo_entrega', 'contrato', 'firmante').order_by('-id').first(), pdf.render_factura_adquisicion),
+        ]
+        # Los registros se cargan una vez para medir solo el render
+        registros_rc = list(rc.registros.select_related('servicio', 'establecimiento')) if rc else []
+
+        for nombre, obj, render in casos:
+            if obj is None:
+                self.stdout.write(self.style.WARNING(f'[benchmark_pdf] {nombre}: sin datos, se omite.'))
+                continue
+
+            render(obj)  # calentamiento (imports, fuentes)
+
+            inicio = time.perf_counter()
+            for _ in range(n):
+                pdf.limpiar_cache()
+                render(obj)
+            frio = (time.perf_counter() - inicio) / n * 1000
+
+            render(obj)
+            inicio = time.perf_counter()
+            for _ in range(n):
+                render(obj)
+            cache = (time.perf_counter() - inicio) / n * 1000
+
+            self.stdout.write(
+                f'[benchmark_pdf] {nombre}: frío {frio:.1f} ms/doc, '
+                f'con caché {cache:.1f} ms/doc ({frio / cache:.1f}x)'
+            )
@@ -0,0 +1,58 @@
+"""
+Management command: seed_folio_sequences
+Inicializa (o corrige) la tabla SecuenciaFolio a partir de los folios ya
+emitidos en Recepciones Conformes y Facturas de Adquisición, dejando cada
+contador en el mayor correlativo existente para su prefijo y año.
+
+Es idempotente: nunca retrocede un contador.
+
+Uso:
+    python manage.py seed_folio_sequences
+    python manage.py seed_folio_sequences --dry-run
+"""
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from servicios.models import RecepcionConforme, FacturaAdquisicion, SecuenciaFolio
+
+FOLIO_RE = re.compile(r'^(?P<prefijo>[A-Z]+)-(?P<anio>\d{4})-(?P<seq>\d+)$')
+
+
+class Command(BaseCommand):
+    help = 'Carga las secuencias de folios desde los folios existentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo muestra los valores calculados.')
+
+    def handle(self, *args, **options):
+        maximos = {}
+        ignorados = 0
+        for modelo in (RecepcionConforme, FacturaAdquisicion):
+            folios = modelo.objects.exclude(folio__isnull=True).exclude(folio='').values_list('folio', flat=True)
+            for folio in folios.iterator():
+                match = FOLIO_RE.match(folio)
+                if not match:
+                    ignorados += 1
+                    continue
+                clave = (match['prefijo'], int(match['anio']))
+                maximos[clave] = max(maximos.get(clave, 0), int(match['seq']))
+
+        if ignorados:
+            self.stdout.write(self.style.WARNING(f'[seed_folio_sequences] {ignorados} folios con formato no reconocido.'))
+
+        for (prefijo, anio), maximo in sorted(maximos.items()):
+            if options['dry_run']:
+                self.stdout.write(f'{prefijo}-{anio}: {maximo}')
+                continue
+            with transaction.atomic():
+                secuencia, _ = SecuenciaFolio.objects.select_for_update().get_or_create(
+                    prefijo=prefijo, anio=anio, defaults={'ultimo': maximo}
+                )
+                if secuencia.ultimo < maximo:
+                    secuencia.ultimo = maximo
+                    secuencia.save(update_fields=['ultimo'])
+            self.stdout.write(f'{prefijo}-{anio}: {secuencia.ultimo}')
+
+        self.stdout.write(self.style.SUCCESS(f'[seed_folio_sequences] {len(maximos)} secuencias procesadas.'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servicios', '0024_registropago_es_historico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaFolio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefijo', models.CharField(max_length=20)),
+                ('anio', models.PositiveIntegerField()),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Folio',
+                'verbose_name_plural': 'Secuencias de Folios',
+                'constraints': [models.UniqueConstraint(fields=('prefijo', 'anio'), name='unique_secuencia_folio')],
+            },
+        ),
+    ]
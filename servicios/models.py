@@ -1,7 +1,65 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 import datetime
+import uuid
 from establecimientos.models import Establecimiento
 
+
+class SecuenciaFolio(models.Model):
+    """
+    Último correlativo emitido por prefijo y año (RLB-2026, RCF-2026, ...).
+    Reemplaza el cálculo "último folio + 1" por un contador que se incrementa
+    con bloqueo de fila, evitando folios duplicados entre guardados concurrentes.
+    """
+    prefijo = models.CharField(max_length=20)
+    anio = models.PositiveIntegerField()
+    ultimo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Secuencia de Folio"
+        verbose_name_plural = "Secuencias de Folios"
+        constraints = [
+            models.UniqueConstraint(fields=['prefijo', 'anio'], name='unique_secuencia_folio'),
+        ]
+
+    def __str__(self):
+        return f"{self.prefijo}-{self.anio}: {self.ultimo}"
+
+    @staticmethod
+    def maximo_existente(prefijo, anio):
+        """Mayor correlativo ya emitido para el prefijo/año según los folios guardados."""
+        base = f"{prefijo}-{anio}-"
+        maximo = 0
+        for modelo in (RecepcionConforme, FacturaAdquisicion):
+            for folio in modelo.objects.filter(folio__startswith=base).values_list('folio', flat=True):
+                try:
+                    maximo = max(maximo, int(folio.rsplit('-', 1)[-1]))
+                except (ValueError, IndexError):
+                    continue
+        return maximo
+
+    @classmethod
+    def reservar(cls, prefijo, anio=None, cantidad=1):
+        """
+        Reserva `cantidad` folios consecutivos y los retorna ya formateados.
+        La primera vez que se usa un prefijo/año el contador se inicializa desde
+        los folios existentes.
+        """
+        anio = anio or datetime.date.today().year
+        with transaction.atomic():
+            secuencia = cls.objects.select_for_update().filter(prefijo=prefijo, anio=anio).first()
+            if secuencia is None:
+                secuencia, _ = cls.objects.get_or_create(
+                    prefijo=prefijo, anio=anio,
+                    defaults={'ultimo': cls.maximo_existente(prefijo, anio)}
+                )
+                secuencia = cls.objects.select_for_update().get(pk=secuencia.pk)
+            inicio = secuencia.ultimo + 1
+            secuencia.ultimo += cantidad
+            secuencia.save(update_fields=['ultimo'])
+        return [f"{prefijo}-{anio}-{seq:04d}" for seq in range(inicio, inicio + cantidad)]
+
+
 class TipoProveedor(models.Model):
     nombre = models.CharField(max_length=100)
     acronimo_nemotecnico = models.CharField(max_length=50)
@@ -63,6 +121,7 @@ class RecepcionConforme(models.Model):
         ('EMITIDA', 'Emitida'),
         ('ANULADA', 'Anulada'),
     ]
+    PREFIJO_FOLIO = 'RLB'
     proveedor = models.ForeignKey(Proveedor, on_delete=models.PROTECT, related_name='recepciones')
     folio = models.CharField(max_length=50, unique=True, blank=True)
     fecha_emision = models.DateField(auto_now_add=True)
@@ -93,21 +152,7 @@ class RecepcionConforme(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.folio:
-            year = datetime.date.today().year
-            prefix = f"RLB-{year}"
-            last_rc = RecepcionConforme.objects.filter(folio__startswith=prefix).order_by('folio').last()
-            
-            if last_rc:
-                try:
-                    last_seq_str = last_rc.folio.rsplit('-', 1)[-1]
-                    last_seq = int(last_seq_str)
-                    new_seq = last_seq + 1
-                except (ValueError, IndexError):
-                    new_seq = 1
-            else:
-                new_seq = 1
-            
-            self.folio = f"{prefix}-{new_seq:04d}"
+            self.folio = SecuenciaFolio.reservar(self.PREFIJO_FOLIO)[0]
         
         super().save(*args, **kwargs)
 
@@ -245,28 +290,14 @@ class FacturaAdquisicion(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.folio:
-            year = datetime.date.today().year
-            # Prefix: ROC for contracts, RCF for direct acquisitions
-            prefix_base = "ROC" if self.contrato else "RCF"
-            prefix = f"{prefix_base}-{year}"
-            
-            # Filter specifically by the derived prefix to maintain independent sequences
-            last_factura = FacturaAdquisicion.objects.filter(folio__startswith=prefix).order_by('folio').last()
-            
-            if last_factura:
-                try:
-                    last_seq_str = last_factura.folio.rsplit('-', 1)[-1]
-                    last_seq = int(last_seq_str)
-                    new_seq = last_seq + 1
-                except (ValueError, IndexError, AttributeError):
-                    new_seq = 1
-            else:
-                new_seq = 1
-            
-            self.folio = f"{prefix}-{new_seq:04d}"
+            self.folio = SecuenciaFolio.reservar(self.prefijo_folio())[0]
         
         super().save(*args, **kwargs)
 
+    def prefijo_folio(self):
+        # ROC for contracts, RCF for direct acquisitions (independent sequences)
+        return "ROC" if self.contrato_id else "RCF"
+
     def __str__(self):
         return f"RC {self.folio} - {self.proveedor.nombre}"
 
@@ -275,3 +306,49 @@ class FacturaAdquisicion(models.Model):
         verbose_name_plural = "Facturas de Adquisición"
         ordering = ['-fecha_recepcion']
 
+
+
+class LotePDF(models.Model):
+    """
+    Lote de PDFs de Recepciones Conformes generado en segundo plano (tarea
+    'servicios.lote_pdf_rc'). Avance y archivo quedan en la BD y en
+    MEDIA_ROOT, visibles para cualquier proceso (gunicorn y run_worker).
+    """
+    PENDIENTE = 'PENDIENTE'
+    EJECUTANDO = 'EJECUTANDO'
+    OK = 'OK'
+    FALLIDO = 'FALLIDO'
+    ESTADO_CHOICES = [
+        (PENDIENTE, 'Pendiente'),
+        (EJECUTANDO, 'En ejecución'),
+        (OK, 'Listo para descargar'),
+        (FALLIDO, 'Fallido'),
+    ]
+    FORMATO_CHOICES = [('zip', 'ZIP (un PDF por RC)'), ('pdf', 'PDF unido')]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    solicitado_por = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True,
+                                       on_delete=models.SET_NULL, related_name='lotes_pdf')
+    formato = models.CharField(max_length=4, choices=FORMATO_CHOICES, default='zip')
+    # IDs de las RCs en el orden del listado
+    ids = models.JSONField(default=list)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default=PENDIENTE)
+    hechos = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    # Ruta relativa a MEDIA_ROOT del archivo generado
+    archivo = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Lote de PDFs de RC"
+        verbose_name_plural = "Lotes de PDFs de RC"
+        ordering = ['-creado']
+
+    def __str__(self):
+        return f"Lote {self.token} ({self.hechos}/{self.total} {self.estado})"
+
+    @property
+    def nombre_descarga(self):
+        return f'recepciones_conformes.{self.formato}'
@@ -0,0 +1,672 @@
+"""
+Generación de PDFs de servicios (Recepción Conforme, Registro de Pago y
+Factura de Adquisición).
+
+Todo lo que no depende del documento (hoja de estilos, logos ya leídos y
+escalados, estilos de tabla y franjas de color) se construye una sola vez por
+proceso y se reutiliza entre requests; cada render solo arma las tablas con
+los datos propios del documento.
+"""
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image as PILImage
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.colors import HexColor
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch, mm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak, Flowable
+
+# Incrementar al cambiar el diseño de cualquier documento: invalida los PDFs
+# guardados en caché (ver pdf_cache.py).
+PDF_TEMPLATE_VERSION = 1
+
+# Page Size Folio (216x330mm)
+FOLIO = (216*mm, 330*mm)
+
+# Spanish Month Names
+MESES = {
+    1: "enero", 2: "febrero", 3: "marzo", 4: "abril",
+    5: "mayo", 6: "junio", 7: "julio", 8: "agosto",
+    9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
+}
+
+# --- Corporate Branding for PDFs ---
+COLOR_VERDE = HexColor('#92D050')
+COLOR_AMARILLO = HexColor('#FFD400')
+COLOR_ROSADO = HexColor('#F68A91')
+COLOR_ROJO = HexColor('#E33E41')
+COLOR_CELESTE = HexColor('#48C1EB')
+COLOR_AZUL = HexColor('#3E7AB7')
+STRIP_COLORS = [COLOR_VERDE, COLOR_AMARILLO, COLOR_ROSADO, COLOR_ROJO, COLOR_CELESTE, COLOR_AZUL]
+
+AZUL_OSCURO = HexColor('#1F4970')
+GRIS_CLARO = HexColor('#F5F5F5')
+GRIS_LINEAS = HexColor('#CCCCCC')
+
+LOGO_SLEP = 'Logo SLEP.png'
+LOGO_IQUIQUE = 'Iquique.png'
+LOGO_DEP = 'Logo DEP.png'
+# Resolución a la que se incrustan los logos (calidad de impresión)
+LOGO_DPI = 300
+
+def draw_color_strips(canvas, doc):
+    """
+    Robustly draws corporate color strips at the very top and bottom of the page.
+    Uses canvas._pagesize to ensure anchoring to physical boundaries regardless of doc setting.
+    """
+    canvas.saveState()
+    page_w, page_h = canvas._pagesize
+    h_strip = 12
+    n = len(STRIP_COLORS)
+    w_seg = page_w / n
+
+    for i, color in enumerate(STRIP_COLORS):
+        # Top strip
+        canvas.setFillColor(color)
+        canvas.rect(i * w_seg, page_h - h_strip, w_seg, h_strip, stroke=0, fill=1)
+        # Bottom strip
+        canvas.rect(i * w_seg, 0, w_seg, h_strip, stroke=0, fill=1)
+
+    canvas.restoreState()
+
+
+# --------------------------------------------------------------------------
+# Recursos compartidos (se construyen una vez por proceso)
+# --------------------------------------------------------------------------
+
+@lru_cache(maxsize=None)
+def get_styles():
+    """Hoja de estilos con los estilos propios de los documentos de servicios."""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(
+        name='MainTitle', parent=styles['Heading1'], alignment=TA_CENTER,
+        fontSize=12, spaceAfter=15, spaceBefore=15, fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='SignatureTitle', parent=styles['Heading1'], alignment=TA_CENTER,
+        fontSize=10, spaceAfter=4, spaceBefore=4, fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='NormalText', parent=styles['Normal'], fontSize=9, leading=13,
+        spaceBefore=10, spaceAfter=10, alignment=4  # Justified
+    ))
+    styles.add(ParagraphStyle(
+        name='FolioStyle', parent=styles['Normal'], alignment=2,  # Right
+        fontSize=9, fontName='Helvetica-Bold', spaceAfter=5
+    ))
+    styles.add(ParagraphStyle(
+        name='EstStyle', parent=styles['Normal'], fontSize=8, leading=10, wordWrap='LTR',
+    ))
+    styles.add(ParagraphStyle(
+        name='SigText', parent=styles['Normal'], fontSize=8.5, alignment=TA_CENTER,
+        fontName='Helvetica-Bold', leading=10, spaceBefore=0, spaceAfter=0
+    ))
+    styles.add(ParagraphStyle(
+        name='SigStyle', parent=styles['Normal'], fontSize=9, alignment=TA_CENTER, fontName='Helvetica-Bold'
+    ))
+    # Acta de recepción (Factura de Adquisición)
+    styles.add(ParagraphStyle(
+        name='OCTitle', parent=styles['Heading2'], fontSize=11, textColor=colors.black,
+        alignment=TA_CENTER, spaceAfter=8, fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='OCSection', parent=styles['Normal'], fontSize=9, textColor=colors.black,
+        alignment=TA_LEFT, spaceBefore=6, spaceAfter=4, fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='OCLabel', parent=styles['Normal'], fontSize=8, textColor=colors.black,
+        alignment=TA_LEFT, leading=10,
+    ))
+    styles.add(ParagraphStyle(
+        name='OCValue', parent=styles['Normal'], fontSize=8, textColor=colors.black,
+        alignment=TA_LEFT, leading=10,
+    ))
+    return styles
+
+
+@lru_cache(maxsize=None)
+def _leer_logo(nombre):
+    """Lee un logo de frontend/public; None si no existe."""
+    path = os.path.join(settings.BASE_DIR, 'frontend', 'public', nombre)
+    if not os.path.exists(path):
+        return None
+    return path, ImageReader(path)
+
+
+@lru_cache(maxsize=None)
+def _logo_escalado(nombre, max_w, max_h):
+    """
+    Logo decodificado y reducido a LOGO_DPI para su tamaño final, junto con el
+    tamaño de dibujo (escala proporcional dentro de max_w x max_h).
+    """
+    path, reader = _leer_logo(nombre)
+    iw, ih = reader.getSize()
+    aspect = ih / float(iw)
+    w = max_w
+    h = w * aspect
+    if h > max_h:
+        h = max_h
+        w = h / aspect
+
+    # Los PNG originales son mucho más grandes que lo que se imprime; reducirlos
+    # evita comprimir megapíxeles en cada documento.
+    px_w = int(round(w / 72.0 * LOGO_DPI))
+    px_h = int(round(h / 72.0 * LOGO_DPI))
+    if px_w < iw:
+        reader = ImageReader(reader._image.resize((px_w, px_h), PILImage.LANCZOS))
+    reader.getRGBData()  # fuerza la decodificación una sola vez
+    return path, reader, w, h
+
+
+def logo(nombre, max_w, max_h):
+    """Flowable del logo ya decodificado y escalado, o '' si el archivo no existe."""
+    if _leer_logo(nombre) is None:
+        return ""
+    path, reader, w, h = _logo_escalado(nombre, max_w, max_h)
+    img = Image(path, width=w, height=h)
+    img._img = reader  # evita que reportlab vuelva a leer el archivo
+    return img
+
+
+def limpiar_cache():
+    """Descarta los recursos precalculados (usado por el benchmark)."""
+    get_styles.cache_clear()
+    _leer_logo.cache_clear()
+    _logo_escalado.cache_clear()
+
+
+HEADER_STYLE_RC = TableStyle([
+    ('ALIGN', (0,0), (0,0), 'LEFT'),
+    ('ALIGN', (2,0), (2,0), 'RIGHT'),
+    ('ALIGN', (1,0), (1,0), 'CENTER'),
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+    ('TOPPADDING', (0,0), (-1,-1), 0),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+])
+
+HEADER_STYLE_ACTA = TableStyle([
+    ('ALIGN', (0,0), (0,0), 'LEFT'),
+    ('ALIGN', (2,0), (2,0), 'RIGHT'),
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+])
+
+BODY_STYLE_PAGO = TableStyle([
+    ('ALIGN', (0,0), (-1,0), 'CENTER'), ('ALIGN', (0,1), (2,1), 'LEFT'), ('ALIGN', (3,1), (-1,-1), 'RIGHT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'), ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'), ('FONTSIZE', (0,0), (-1,-1), 9),
+    ('BACKGROUND', (0,0), (-1,0), AZUL_OSCURO), ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+    ('BACKGROUND', (0,1), (-1,-1), GRIS_CLARO), ('GRID', (0,0), (-1,-1), 0.5, GRIS_LINEAS),
+    ('BOX', (0,0), (-1,-1), 1, AZUL_OSCURO), ('TOPPADDING', (0,0), (-1,0), 6), ('BOTTOMPADDING', (0,0), (-1,0), 6),
+    ('TOPPADDING', (0,1), (-1,-1), 3), ('BOTTOMPADDING', (0,1), (-1,-1), 3),  # Compact
+    ('LEFTPADDING', (0,0), (-1,-1), 3), ('RIGHTPADDING', (0,0), (-1,-1), 3),
+])
+
+BODY_STYLE_RC = TableStyle([
+    ('ALIGN', (0,0), (-1,0), 'CENTER'),
+    ('ALIGN', (0,1), (1,-1), 'CENTER'),
+    ('ALIGN', (2,1), (2,-1), 'LEFT'),
+    ('ALIGN', (3,1), (4,-1), 'CENTER'),
+    ('ALIGN', (5,1), (-1,-1), 'RIGHT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTNAME', (0,1), (-1,-1), 'Helvetica'),
+    ('FONTSIZE', (0,0), (-1,-1), 8),
+    ('BACKGROUND', (0,0), (-1,0), AZUL_OSCURO),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+    ('BACKGROUND', (0,1), (-1,-1), GRIS_CLARO),
+    ('GRID', (0,0), (-1,-1), 0.5, GRIS_LINEAS),
+    ('BOX', (0,0), (-1,-1), 0.8, AZUL_OSCURO),
+    ('TOPPADDING', (0,0), (-1,0), 6),
+    ('BOTTOMPADDING', (0,0), (-1,0), 6),
+    ('TOPPADDING', (0,1), (-1,-1), 2.5),
+    ('BOTTOMPADDING', (0,1), (-1,-1), 2.5),
+    ('LEFTPADDING', (0,0), (-1,-1), 3),
+    ('RIGHTPADDING', (0,0), (-1,-1), 3),
+])
+
+SIG_LINE_STYLE = TableStyle([
+    ('LINEABOVE', (0,0), (-1,-1), 0.8, colors.black),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('TOPPADDING', (0,0), (-1,-1), 0),
+    ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+])
+
+ACTA_DATA_STYLE = TableStyle([
+    ("GRID", (0, 0), (-1, -1), 0.6, colors.black),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("LEFTPADDING", (0, 0), (-1, -1), 4),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+    ("TOPPADDING", (0, 0), (-1, -1), 4),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+])
+
+
+def format_clp(valor):
+    return f"$ {valor:,}".replace(",", ".")
+
+
+def _nuevo_doc(buffer, top=40, bottom=40):
+    # Custom margins
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=FOLIO,
+        rightMargin=50,
+        leftMargin=50,
+        topMargin=top,
+        bottomMargin=bottom
+    )
+
+
+def _encabezado_rc():
+    styles = get_styles()
+    header_table = Table([[
+        logo(LOGO_IQUIQUE, 1.6*inch, 0.9*inch),
+        Paragraph("", styles['Normal']),  # Spacer
+        logo(LOGO_SLEP, 1.8*inch, 1.5*inch),
+    ]], colWidths=[2*inch, 3*inch, 2*inch])
+    header_table.setStyle(HEADER_STYLE_RC)
+    return header_table
+
+
+def _firma_generica(width, thickness, top_padding):
+    """Línea de firma sin datos del firmante."""
+    styles = get_styles()
+    commands = [
+        ('LINEABOVE', (0,0), (-1,-1), thickness, colors.black),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ]
+    if top_padding is not None:
+        commands.append(('TOPPADDING', (0,0), (-1,-1), top_padding))
+    signature_line = Table([['']], colWidths=[width])
+    signature_line.setStyle(TableStyle(commands))
+    return [
+        signature_line,
+        Spacer(1, 5),
+        Paragraph("RECIBE CONFORME", styles['SigStyle']),
+    ]
+
+
+def _firma_funcionario(firmante):
+    """Línea de firma con nombre, cargo y unidad del funcionario."""
+    styles = get_styles()
+    sig_line = Table([[""]], colWidths=[2.5*inch])
+    sig_line.setStyle(SIG_LINE_STYLE)
+    elements = [sig_line]
+
+    # 1. Name
+    elements.append(Paragraph(firmante.nombre_funcionario.upper(), styles['SigText']))
+    # 2. Cargo + Dept/Subdiv
+    cargo_line = firmante.cargo.upper() if firmante.cargo else ""
+    if firmante.departamento:
+        d_name = firmante.departamento.nombre.upper()
+        org_unit = f"DEPARTAMENTO {d_name}" if "DEPARTAMENTO" not in d_name else d_name
+    elif firmante.subdireccion:
+        s_name = firmante.subdireccion.nombre.upper()
+        org_unit = s_name if "SUBDIRECCIÓN" in s_name else f"SUBDIRECCIÓN {s_name}"
+    else:
+        org_unit = "DIRECCIÓN"
+
+    if cargo_line and org_unit:
+        elements.append(Paragraph(f"{cargo_line} DE {org_unit}", styles['SigText']))
+    elif cargo_line or org_unit:
+        elements.append(Paragraph(cargo_line or org_unit, styles['SigText']))
+    return elements
+
+
+# --------------------------------------------------------------------------
+# Documentos
+# --------------------------------------------------------------------------
+
+def render_registro_pago(pago):
+    """Recepción conforme individual de un RegistroPago. Retorna los bytes del PDF."""
+    styles = get_styles()
+    buffer = io.BytesIO()
+    doc = _nuevo_doc(buffer)
+
+    elements = [_encabezado_rc(), Spacer(1, 40), Paragraph("RECEPCIÓN CONFORME", styles['MainTitle'])]
+
+    fecha = pago.fecha_pago
+    intro_text = (
+        f"En Iquique, a {fecha.day} de {MESES.get(fecha.month)} de {fecha.year} "
+        f"en el establecimiento {pago.establecimiento.nombre}, se procede a dar recepción conforme a la boleta "
+        f"N° {pago.nro_documento} de {pago.servicio.proveedor.nombre}."
+    )
+    elements.append(Paragraph(intro_text, styles['NormalText']))
+    elements.append(Spacer(1, 10))
+
+    headers = ['N° Cliente', 'Establecimiento', 'Factura', 'Monto JUNJI', 'Monto Final']
+    monto_junji = pago.monto_total - pago.monto_interes
+    data_body = [headers, [
+        pago.servicio.numero_cliente,
+        Paragraph(pago.establecimiento.nombre, styles['Normal']),
+        pago.nro_documento,
+        f"${monto_junji:,}".replace(",", "."),
+        f"${pago.monto_total:,}".replace(",", ".")
+    ]]
+
+    available_width = FOLIO[0] - 100
+    # Compact widths for individual RC
+    col_widths = [
+        available_width * 0.18,  # N° Cliente (wider for ~15 digits)
+        available_width * 0.44,  # Establecimiento
+        available_width * 0.14,  # Factura
+        available_width * 0.12,  # Monto JUNJI
+        available_width * 0.12   # Monto Final
+    ]
+    t_body = Table(data_body, colWidths=col_widths)
+    t_body.setStyle(BODY_STYLE_PAGO)
+    elements.append(t_body)
+    elements.append(Spacer(1, 150))
+
+    # Generic signature section (No signer details)
+    elements.extend(_firma_generica(200, 0.8, 5))
+
+    doc.build(elements)  # Color strips removed
+    return buffer.getvalue()
+
+
+def _elementos_recepcion_conforme(rc, registros):
+    styles = get_styles()
+    elements = [_encabezado_rc(), Spacer(1, 40), Paragraph("RECEPCIÓN CONFORME", styles['MainTitle'])]
+
+    # Intro Paragraph
+    first_pago = registros[0] if registros else None
+    est_name = first_pago.establecimiento.nombre if first_pago else "Establecimiento no definido"
+    prov_name = rc.proveedor.nombre
+    fecha = rc.fecha_emision
+    intro_text = (
+        f"En Iquique, a {fecha.day} de {MESES.get(fecha.month)} de {fecha.year} "
+        f"en el establecimiento {est_name}, se procede a dar recepción conforme a las boletas "
+        f"de {prov_name}, se adjunta listado."
+    )
+    elements.append(Paragraph(intro_text, styles['NormalText']))
+
+    # Folio Right Aligned above table
+    elements.append(Paragraph(f"FOLIO: {rc.folio}", styles['FolioStyle']))
+    elements.append(Spacer(1, 5))
+
+    # Detail Table
+    headers = ['N° Cliente', 'RBD', 'Establecimiento', 'Factura', 'Fecha Venc.', 'Interés', 'Saldo Final']
+    data_body = [headers]
+    for p in registros:
+        data_body.append([
+            p.servicio.numero_cliente,
+            str(p.establecimiento.rbd),
+            Paragraph(p.establecimiento.nombre, styles['EstStyle']),
+            p.nro_documento,
+            p.fecha_vencimiento.strftime("%d-%m-%Y"),
+            f"${p.monto_interes:,}".replace(",", "."),
+            f"${p.monto_total:,}".replace(",", ".")
+        ])
+
+    available_width = FOLIO[0] - 100
+    # 7 columns: Optimized further for 'Establecimiento'
+    col_widths = [
+        available_width * 0.15,  # N° Cliente (wider for ~15 digits)
+        available_width * 0.06,  # RBD
+        available_width * 0.37,  # Establecimiento
+        available_width * 0.12,  # Factura
+        available_width * 0.12,  # Fecha Venc.
+        available_width * 0.09,  # Interés
+        available_width * 0.09   # Saldo Final
+    ]
+    t_body = Table(data_body, colWidths=col_widths)
+    t_body.setStyle(BODY_STYLE_RC)
+    elements.append(t_body)
+    elements.append(Spacer(1, 40))
+
+    # Signature
+    if rc.firmante:
+        elements.extend(_firma_funcionario(rc.firmante))
+    else:
+        elements.extend(_firma_generica(200, 1, 5))
+    return elements
+
+
+def render_recepcion_conforme(rc, registros=None):
+    """
+    Recepción Conforme con el detalle de sus pagos. Retorna los bytes del PDF.
+
+    `registros` permite entregar los pagos ya cargados (con servicio y
+    establecimiento); por defecto se consultan desde la RC.
+    """
+    if registros is None:
+        registros = list(rc.registros.select_related('servicio', 'establecimiento'))
+    buffer = io.BytesIO()
+    doc = _nuevo_doc(buffer)
+    doc.build(_elementos_recepcion_conforme(rc, registros))
+    return buffer.getvalue()
+
+
+class _MarcaAvance(Flowable):
+    """Flowable vacío que avisa cuando el documento llega a dibujarlo."""
+
+    def __init__(self, avisar):
+        super().__init__()
+        self.avisar = avisar
+
+    def wrap(self, *args):
+        return 0, 0
+
+    def draw(self):
+        self.avisar()
+
+
+def render_recepciones_unidas(lote, progreso=None):
+    """
+    Un solo PDF con todas las RCs del lote, cada una desde una página nueva.
+    `lote` es una lista de tuplas (rc, registros).
+
+    `progreso(hechos, total)` se llama a medida que se dibuja cada RC.
+    """
+    buffer = io.BytesIO()
+    doc = _nuevo_doc(buffer)
+    elements = []
+    total = len(lote)
+    for hechos, (rc, registros) in enumerate(lote, start=1):
+        if elements:
+            elements.append(PageBreak())
+        elements.extend(_elementos_recepcion_conforme(rc, registros))
+        if progreso:
+            elements.append(_MarcaAvance(lambda hechos=hechos: progreso(hechos, total)))
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def _render_rc_en_proceso(item):
+    rc, registros = item
+    return rc.folio, render_recepcion_conforme(rc, registros=registros)
+
+
+def render_lote_recepciones(lote, workers=1, progreso=None):
+    """
+    Renderiza cada RC del lote como PDF independiente y entrega (folio, bytes)
+    a medida que terminan. Con workers > 1 se usa un pool de procesos (fork:
+    los hijos heredan Django ya configurado y no consultan la base de datos,
+    porque el lote llega con todo precargado).
+
+    `progreso(hechos, total)` se llama después de cada documento.
+    """
+    total = len(lote)
+    if workers <= 1 or total < 2:
+        resultados = map(_render_rc_en_proceso, lote)
+        pool = None
+    else:
+        _encabezado_rc()  # los hijos heredan estilos y logos ya preparados
+        pool = ProcessPoolExecutor(max_workers=min(workers, total), mp_context=multiprocessing.get_context('fork'))
+        resultados = pool.map(_render_rc_en_proceso, lote)
+    try:
+        for hechos, resultado in enumerate(resultados, start=1):
+            if progreso:
+                progreso(hechos, total)
+            yield resultado
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+
+def render_factura_adquisicion(factura):
+    """Acta de Recepción Conforme de una Factura de Adquisición. Retorna los bytes del PDF."""
+    styles = get_styles()
+    cell_label_style = styles['OCLabel']
+    cell_value_style = styles['OCValue']
+    section_style = styles['OCSection']
+    buffer = io.BytesIO()
+    # Margins increased for color strip
+    doc = _nuevo_doc(buffer, top=60, bottom=60)
+
+    elements = []
+    header_table = Table([[
+        logo(LOGO_DEP, 1.8*inch, 0.9*inch),
+        Paragraph("", styles['Normal']),  # Spacer
+        logo(LOGO_SLEP, 1.8*inch, 1.2*inch),
+    ]], colWidths=[2.5*inch, 2.2*inch, 2.5*inch])
+    header_table.setStyle(HEADER_STYLE_ACTA)
+    elements.append(header_table)
+    elements.append(Spacer(1, 15))
+
+    # Folio Table (Right Aligned)
+    folio_label = Paragraph("<b>Folio</b>", cell_label_style)
+    folio_value = Paragraph(f"<b>{factura.folio}</b>", cell_label_style)
+    folio_table = Table([[folio_label, folio_value]], colWidths=[0.8*inch, 1.4*inch])
+    folio_table.setStyle(TableStyle([
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("GRID", (0, 0), (-1, -1), 0.8, colors.black),
+        ("LEFTPADDING", (0, 0), (-1, -1), 6),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ]))
+    folio_wrapper = Table([["", folio_table]], colWidths=[doc.width - 2.2*inch, 2.2*inch])
+    folio_wrapper.setStyle(TableStyle([
+        ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+    ]))
+    elements.append(folio_wrapper)
+    elements.append(Spacer(1, 10))
+
+    # Title
+    acta_table = Table([[Paragraph("ACTA DE RECEPCIÓN CONFORME", styles['OCTitle'])]], colWidths=[doc.width])
+    acta_table.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.8, colors.black),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 6),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+    ]))
+    elements.append(acta_table)
+    elements.append(Spacer(1, 12))
+
+    # Section: Identificación Producto
+    elements.append(Paragraph("<b>IDENTIFICACIÓN DEL PRODUCTO O SERVICIO ADQUIRIDO</b>", section_style))
+    fecha_recepcion = factura.fecha_recepcion.strftime("%d-%m-%Y")
+
+    establecimientos = list(factura.establecimientos.all())
+    establecimientos_str = ", ".join([e.nombre for e in establecimientos])
+
+    # Format combined description: {descripcion} - {periodo} - {establecimientos}
+    # Avoid duplicating period if it's already in the description text
+    descripcion_final = factura.descripcion or ""
+    period_str = ""
+    if factura.periodo:
+        m_name = MESES.get(factura.periodo.month, "").upper()
+        period_str = f"{m_name} {factura.periodo.year}"
+
+    if period_str and period_str.lower() not in descripcion_final.lower():
+        if descripcion_final:
+            descripcion_final += f" - {period_str}"
+        else:
+            descripcion_final = period_str
+
+    if establecimientos_str and establecimientos_str.lower() not in descripcion_final.lower():
+        # Create a vertical list for establishments
+        est_list = [f"- {e.nombre}" for e in establecimientos]
+        vertical_est_str = "<br/>" + "<br/>".join(est_list)
+
+        if descripcion_final:
+            descripcion_final += vertical_est_str
+        else:
+            descripcion_final = vertical_est_str.replace("<br/>", "", 1)  # remove leading br if empty
+
+    # Get OC from factura or contract
+    nro_oc_final = factura.nro_oc
+    if not nro_oc_final and factura.contrato:
+        nro_oc_final = factura.contrato.nro_oc
+
+    producto_rows = [
+        ["NÚMERO DE ORDEN DE COMPRA", str(nro_oc_final or "-")],
+        ["NÚMERO DE FACTURA", str(factura.nro_factura or "")],
+        ["NÚMERO DE CERTIFICADO DE PRESUPUESTO", factura.cdp],
+        ["DESCRIPCIÓN DE PRODUCTO O SERVICIO ADQUIRIDO", descripcion_final],
+        ["FECHA DE RECEPCIÓN CONFORME", fecha_recepcion],
+        ["ENTREGA PARCIALIZADA O TOTAL DE PRODUCTO Y/O SERVICIO", str(factura.tipo_entrega)],
+    ]
+    producto_table = Table(
+        [[Paragraph(label, cell_label_style), Paragraph(value, cell_value_style)] for label, value in producto_rows],
+        colWidths=[doc.width * 0.45, doc.width * 0.55]
+    )
+    producto_table.setStyle(ACTA_DATA_STYLE)
+    elements.append(producto_table)
+    elements.append(Spacer(1, 12))
+
+    # Section: Identificación Proveedor
+    elements.append(Paragraph("<b>IDENTIFICACIÓN DEL PROVEEDOR</b>", section_style))
+    proveedor_rows = [
+        ["NOMBRE O RAZÓN SOCIAL DEL PROVEEDOR", factura.proveedor.nombre],
+        ["ROL ÚNICO TRIBUTARIO (RUT)", factura.proveedor.rut or "-"],
+    ]
+    proveedor_table = Table(
+        [[Paragraph(label, cell_label_style), Paragraph(value, cell_value_style)] for label, value in proveedor_rows],
+        colWidths=[doc.width * 0.45, doc.width * 0.55]
+    )
+    proveedor_table.setStyle(ACTA_DATA_STYLE)
+    elements.append(proveedor_table)
+    elements.append(Spacer(1, 12))
+
+    # Section: Pago
+    elements.append(Paragraph("<b>PAGO</b>", section_style))
+    pago_rows = [
+        ["TOTAL NETO", format_clp(factura.total_neto)],
+        ["IMPUESTOS", format_clp(factura.iva)],
+        ["TOTAL A PAGAR", format_clp(factura.total_pagar)],
+    ]
+    # Match image width (approx 60% of doc width)
+    pago_table = Table(
+        [[Paragraph(label, cell_label_style), Paragraph(value, cell_value_style)] for label, value in pago_rows],
+        colWidths=[2.2*inch, 1.8*inch]
+    )
+    pago_table.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.8, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 6),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 6),
+        ("TOPPADDING", (0, 0), (-1, -1), 4),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ("ALIGN", (0,0), (-1,-1), "LEFT"),
+    ]))
+    # Wrap in another table to keep it left-aligned but short
+    pago_wrapper = Table([[pago_table]], colWidths=[doc.width])
+    pago_wrapper.setStyle(TableStyle([
+        ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+    ]))
+    elements.append(pago_wrapper)
+    elements.append(Spacer(1, 80))
+
+    # Signature
+    if factura.firmante:
+        elements.extend(_firma_funcionario(factura.firmante))
+    else:
+        elements.extend(_firma_generica(2.5*inch, 1, None))
+
+    doc.build(elements, onFirstPage=draw_color_strips, onLaterPages=draw_color_strips)
+    return buffer.getvalue()
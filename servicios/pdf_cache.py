@@ -0,0 +1,174 @@
+"""
+Caché en disco de los PDFs de servicios.
+
+Cada documento se guarda en MEDIA_ROOT/pdf_cache/<tipo>/<pk>/<huella>.pdf,
+donde la huella es un hash de todos los datos que se imprimen (incluidos los
+registros asociados y el firmante) más la versión de la plantilla. Si algo
+cambia, la huella cambia y el PDF se vuelve a generar; las señales de
+servicios/signals.py además borran la carpeta del documento al editarlo o
+anularlo para no acumular archivos viejos.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+
+from .pdf import PDF_TEMPLATE_VERSION
+
+TIPO_REGISTRO_PAGO = 'registro_pago'
+TIPO_RECEPCION_CONFORME = 'recepcion_conforme'
+TIPO_FACTURA_ADQUISICION = 'factura_adquisicion'
+
+
+def _cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'pdf_cache')
+
+
+def _huella(tipo, datos):
+    contenido = json.dumps(
+        {'tipo': tipo, 'version': PDF_TEMPLATE_VERSION, 'datos': datos},
+        default=str, sort_keys=True,
+    )
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def _datos_firmante(firmante):
+    if not firmante:
+        return None
+    return {
+        'id': firmante.pk,
+        'nombre': firmante.nombre_funcionario,
+        'cargo': firmante.cargo,
+        'departamento': firmante.departamento.nombre if firmante.departamento else None,
+        'subdireccion': firmante.subdireccion.nombre if firmante.subdireccion else None,
+    }
+
+
+def huella_registro_pago(pago):
+    return _huella(TIPO_REGISTRO_PAGO, {
+        'id': pago.pk,
+        'fecha_pago': pago.fecha_pago,
+        'nro_documento': pago.nro_documento,
+        'monto_total': pago.monto_total,
+        'monto_interes': pago.monto_interes,
+        'numero_cliente': pago.servicio.numero_cliente,
+        'proveedor': pago.servicio.proveedor.nombre,
+        'establecimiento': pago.establecimiento.nombre,
+    })
+
+
+def huella_recepcion_conforme(rc, registros):
+    return _huella(TIPO_RECEPCION_CONFORME, {
+        'id': rc.pk,
+        'folio': rc.folio,
+        'estado': rc.estado,
+        'fecha_emision': rc.fecha_emision,
+        'updated_at': rc.updated_at,
+        'proveedor': rc.proveedor.nombre,
+        'firmante': _datos_firmante(rc.firmante),
+        'registros': [
+            [p.pk, p.servicio.numero_cliente, p.establecimiento.rbd, p.establecimiento.nombre,
+             p.nro_documento, p.fecha_vencimiento, p.monto_interes, p.monto_total]
+            for p in registros
+        ],
+    })
+
+
+def huella_factura_adquisicion(factura):
+    return _huella(TIPO_FACTURA_ADQUISICION, {
+        'id': factura.pk,
+        'folio': factura.folio,
+        'updated_at': factura.updated_at,
+        'nro_factura': factura.nro_factura,
+        'nro_oc': factura.nro_oc,
+        'contrato_nro_oc': factura.contrato.nro_oc if factura.contrato else None,
+        'cdp': factura.cdp,
+        'periodo': factura.periodo,
+        'descripcion': factura.descripcion,
+        'fecha_recepcion': factura.fecha_recepcion,
+        'tipo_entrega': str(factura.tipo_entrega),
+        'proveedor': [factura.proveedor.nombre, factura.proveedor.rut],
+        'establecimientos': [e.nombre for e in factura.establecimientos.all()],
+        'total_neto': factura.total_neto,
+        'iva': factura.iva,
+        'total_pagar': factura.total_pagar,
+        'firmante': _datos_firmante(factura.firmante),
+    })
+
+
+def ruta_relativa(tipo, pk, huella):
+    return f'pdf_cache/{tipo}/{pk}/{huella}.pdf'
+
+
+def obtener_o_generar(tipo, pk, huella, render):
+    """
+    Devuelve la ruta absoluta del PDF en caché, generándolo con `render()` si
+    no existe. La escritura es atómica (archivo temporal + rename) y deja en la
+    carpeta solo la versión vigente del documento.
+    """
+    carpeta = os.path.join(_cache_dir(), tipo, str(pk))
+    path = os.path.join(carpeta, f'{huella}.pdf')
+    if os.path.exists(path):
+        return path
+
+    contenido = render()
+    os.makedirs(carpeta, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(contenido)
+    os.replace(tmp_path, path)
+
+    for nombre in os.listdir(carpeta):
+        if nombre != os.path.basename(path) and nombre.endswith('.pdf'):
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except OSError:
+                pass
+    return path
+
+
+def invalidar(tipo, pk):
+    """Elimina todas las versiones en caché de un documento."""
+    shutil.rmtree(os.path.join(_cache_dir(), tipo, str(pk)), ignore_errors=True)
+
+
+def respuesta_media(ruta, filename, content_type='application/pdf'):
+    """
+    Descarga de un archivo bajo MEDIA_ROOT (`ruta` relativa). Con
+    PDF_CACHE_X_ACCEL activo lo entrega nginx (X-Accel-Redirect sobre /media/).
+    """
+    if getattr(settings, 'PDF_CACHE_X_ACCEL', False):
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.MEDIA_URL + ruta)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    return FileResponse(
+        open(os.path.join(settings.MEDIA_ROOT, ruta), 'rb'),
+        as_attachment=True, filename=filename, content_type=content_type,
+    )
+
+
+def respuesta_pdf(request, tipo, pk, huella, render, filename):
+    """
+    Respuesta HTTP para un PDF cacheado, con ETag/If-None-Match.
+
+    Con PDF_CACHE_X_ACCEL activo el archivo lo entrega nginx (X-Accel-Redirect
+    sobre /media/) y Django solo calcula la huella.
+    """
+    etag = f'"{huella}"'
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if etag in [v.strip() for v in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    obtener_o_generar(tipo, pk, huella, render)
+    response = respuesta_media(ruta_relativa(tipo, pk, huella), filename)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,327 @@
+import csv
+import datetime
+import tempfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+from establecimientos.models import Establecimiento
+from .models import Proveedor, TipoDocumento, Servicio, RegistroPago
+
+FORMATOS_FECHA = ('%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d')
+
+COLUMNAS_REPORTE_CONSUMOS = [
+    'Fecha Pago', 'Establecimiento', 'RBD', 'Proveedor', 'Nro Cliente',
+    'Nro Documento', 'Monto Total', 'Monto Interes', 'Tiene RC', 'Folio RC',
+]
+
+
+def _columna_texto(df, col, vacio=''):
+    """Devuelve la columna como texto limpio, usando `vacio` para celdas nulas."""
+    if col not in df.columns:
+        return pd.Series(vacio, index=df.index, dtype=object)
+    serie = df[col]
+    texto = serie.astype(str).str.strip().astype(object)
+    return texto.where(~serie.isna(), vacio)
+
+
+def _to_int(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class CatalogoCargaServicios:
+    """
+    Índices en memoria para resolver una carga masiva de servicios con un
+    número constante de consultas, independiente de la cantidad de filas.
+    """
+
+    def __init__(self, rbds, numeros_cliente):
+        self.establecimientos = {}
+        self.rbd_duplicados = set()
+        for est in Establecimiento.objects.filter(rbd__in=rbds).order_by('id'):
+            if est.rbd in self.establecimientos:
+                self.rbd_duplicados.add(est.rbd)
+            else:
+                self.establecimientos[est.rbd] = est
+
+        # El catálogo de proveedores es pequeño: se carga completo para poder
+        # replicar también la búsqueda por 'contiene' sin ir a la base de datos.
+        self.proveedores = list(Proveedor.objects.order_by('nombre', 'id'))
+        self.proveedor_por_rut = {}
+        self.proveedor_por_nombre = {}
+        for prov in self.proveedores:
+            if prov.rut:
+                self.proveedor_por_rut.setdefault(prov.rut.upper(), prov)
+            self.proveedor_por_nombre.setdefault(prov.nombre.upper(), prov)
+
+        self.tipos_documento = list(TipoDocumento.objects.order_by('nombre', 'id'))
+        self.tipo_documento_por_nombre = {}
+        for tipo in self.tipos_documento:
+            self.tipo_documento_por_nombre.setdefault(tipo.nombre.upper(), tipo)
+
+        self.numeros_existentes = set(
+            Servicio.objects.filter(numero_cliente__in=numeros_cliente)
+            .values_list('numero_cliente', flat=True)
+        )
+
+    def buscar_proveedor(self, clave):
+        """RUT exacto, luego nombre exacto y finalmente nombre que contenga la clave."""
+        clave_upper = clave.upper()
+        prov = self.proveedor_por_rut.get(clave_upper) or self.proveedor_por_nombre.get(clave_upper)
+        if prov:
+            return prov
+        return next((p for p in self.proveedores if clave_upper in p.nombre.upper()), None)
+
+    def buscar_tipo_documento(self, nombre):
+        nombre_upper = nombre.upper()
+        tipo = self.tipo_documento_por_nombre.get(nombre_upper)
+        if tipo:
+            return tipo
+        return next((t for t in self.tipos_documento if nombre_upper in t.nombre.upper()), None)
+
+
+def resolver_carga_servicios(df):
+    """
+    Valida una planilla de carga masiva de servicios.
+
+    Retorna una tupla (servicios_a_crear, errores). Los mensajes por fila son
+    los mismos que entregaba la validación fila a fila; adicionalmente se
+    informan los Nro Cliente repetidos dentro del mismo archivo.
+    """
+    rbd = _columna_texto(df, 'RBD').str.split('.').str[0].str.strip()
+    proveedor = _columna_texto(df, 'Proveedor')
+    nro_cliente = _columna_texto(df, 'Nro Cliente')
+    nro_servicio = _columna_texto(df, 'Nro Servicio', vacio=None)
+    tipo_doc = _columna_texto(df, 'Tipo Documento')
+
+    incompletas = (rbd == '') | (proveedor == '') | (nro_cliente == '')
+    validas = ~incompletas
+
+    # Cada clave distinta se resuelve una sola vez y luego se proyecta a la columna.
+    rbd_int = {v: _to_int(v) for v in rbd[validas].unique()}
+    catalogo = CatalogoCargaServicios(
+        rbds={v for v in rbd_int.values() if v is not None},
+        numeros_cliente=set(nro_cliente[validas]),
+    )
+    establecimientos = rbd.map({v: catalogo.establecimientos.get(i) for v, i in rbd_int.items()})
+    rbd_ambiguo = rbd.map({v: i in catalogo.rbd_duplicados for v, i in rbd_int.items()})
+    proveedores = proveedor.map({c: catalogo.buscar_proveedor(c) for c in proveedor[validas].unique()})
+    tipos = tipo_doc.map({n: catalogo.buscar_tipo_documento(n) for n in tipo_doc[validas].unique()})
+    existentes = nro_cliente.isin(catalogo.numeros_existentes)
+    repetidos = nro_cliente[validas].duplicated(keep='first').reindex(df.index, fill_value=False)
+    primera_fila = dict(zip(nro_cliente[validas].iloc[::-1], nro_cliente[validas].index[::-1]))
+
+    errores = []
+    servicios = []
+    for index in df.index:
+        fila = index + 2
+        if incompletas[index]:
+            errores.append(f"Fila {fila}: RBD, Proveedor y Nro Cliente son obligatorios.")
+            continue
+        if rbd_ambiguo[index]:
+            errores.append(f"Fila {fila}: Existe más de un establecimiento con RBD '{rbd[index]}'.")
+            continue
+        est = establecimientos[index]
+        if est is None:
+            errores.append(f"Fila {fila}: No se encontró establecimiento con RBD '{rbd[index]}'.")
+            continue
+        prov = proveedores[index]
+        if prov is None:
+            errores.append(f"Fila {fila}: No se encontró el proveedor '{proveedor[index]}' (por nombre o RUT).")
+            continue
+        tipo = tipos[index]
+        if tipo is None:
+            errores.append(f"Fila {fila}: No se encontró tipo de documento '{tipo_doc[index]}'.")
+            continue
+        if existentes[index]:
+            errores.append(f"Fila {fila}: El Nro Cliente '{nro_cliente[index]}' ya está registrado en el sistema. Debe ser único y no pertenecer a varios establecimientos.")
+            continue
+        if repetidos[index]:
+            errores.append(f"Fila {fila}: El Nro Cliente '{nro_cliente[index]}' está repetido en el archivo (ver fila {primera_fila[nro_cliente[index]] + 2}).")
+            continue
+
+        servicios.append(Servicio(
+            proveedor=prov,
+            establecimiento=est,
+            numero_cliente=nro_cliente[index],
+            numero_servicio=nro_servicio[index],
+            tipo_documento=tipo,
+        ))
+
+    return servicios, errores
+
+
+def _columna_fecha(serie):
+    """
+    Convierte una columna de fechas de la planilla a `datetime.date`.
+
+    Las celdas que Excel ya entrega como fecha se usan tal cual; el resto se
+    interpreta como texto probando FORMATOS_FECHA en orden, columna completa por
+    formato. Retorna (fechas, invalidas): `fechas` tiene None donde no hubo valor
+    o no se pudo interpretar, e `invalidas` marca solo las celdas con texto no
+    reconocido (las vacías no se marcan).
+    """
+    vacias = serie.isna()
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        fechas = serie.dt.date.astype(object).where(~vacias, None)
+        return fechas, pd.Series(False, index=serie.index)
+
+    es_fecha = serie.map(lambda v: isinstance(v, (datetime.date, datetime.datetime)))
+    texto = serie.astype(str).str.strip()
+    convertidas = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    for fmt in FORMATOS_FECHA:
+        pendientes = convertidas.isna() & ~es_fecha & ~vacias
+        if not pendientes.any():
+            break
+        convertidas[pendientes] = pd.to_datetime(texto[pendientes], format=fmt, errors='coerce')
+
+    fechas = convertidas.dt.date.astype(object).where(convertidas.notna(), None)
+    directas = serie[es_fecha].map(lambda v: v.date() if isinstance(v, datetime.datetime) else v)
+    fechas[es_fecha] = directas
+    invalidas = ~vacias & ~es_fecha & convertidas.isna()
+    return fechas, invalidas
+
+
+def _columna_entera(serie):
+    """
+    Convierte una columna de montos a enteros con la misma regla que `int()`:
+    números se truncan y el texto debe ser un entero literal ('50.000' no lo es).
+    Retorna una Series de objetos con int o None donde el valor no es válido.
+    """
+    es_numero = serie.map(lambda v: pd.api.types.is_number(v) and not isinstance(v, bool))
+    numeros = pd.to_numeric(serie.where(es_numero), errors='coerce')
+    texto = serie.astype(str).str.strip()
+    enteros_texto = pd.to_numeric(texto.where(texto.str.fullmatch(r'[+-]?\d+', na=False)), errors='coerce')
+    valores = numeros.fillna(enteros_texto)
+    valores = valores.where(valores.abs() != float('inf'))
+    return pd.Series(
+        [None if pd.isna(v) else int(v) for v in valores],
+        index=serie.index, dtype=object,
+    )
+
+
+def resolver_carga_pagos(df):
+    """
+    Valida una planilla de carga masiva de registros de pago.
+
+    Todos los Nro Cliente se resuelven en una sola consulta (con establecimiento
+    y proveedor ya cargados) y fechas y montos se convierten por columna.
+    Retorna una tupla (pagos_a_crear, errores) con los errores agrupados por fila.
+    """
+    nro_cliente = df['Nro Cliente'].astype(str).str.strip()
+    nro_documento = df['Nro Documento'].astype(str).str.strip()
+
+    servicios_por_cliente = {}
+    servicios_qs = (
+        Servicio.objects.filter(numero_cliente__in=set(nro_cliente))
+        .select_related('establecimiento', 'proveedor')
+    )
+    for srv in servicios_qs:
+        servicios_por_cliente.setdefault(srv.numero_cliente, []).append(srv)
+
+    columnas_fecha = [
+        ('Fecha Emision (DD/MM/YYYY)', 'Fecha Emision'),
+        ('Fecha Vencimiento (DD/MM/YYYY)', 'Fecha Vencimiento'),
+        ('Fecha Pago (DD/MM/YYYY)', 'Fecha Pago'),
+    ]
+    fechas = {}
+    for col, nombre in columnas_fecha:
+        fechas[nombre] = _columna_fecha(df[col])
+
+    monto_total = _columna_entera(df['Monto Total'])
+    monto_interes = _columna_entera(df['Monto Interes'])
+    interes_vacio = df['Monto Interes'].isna()
+    montos_invalidos = monto_total.isna() | (monto_interes.isna() & ~interes_vacio)
+
+    errores = []
+    pagos = []
+    for index in df.index:
+        fila = index + 2
+        nro_cli = nro_cliente[index]
+        servicios = servicios_por_cliente.get(nro_cli, [])
+        if not servicios:
+            errores.append(f"Fila {fila}: No existe un servicio con el Nro Cliente '{nro_cli}'.")
+            continue
+        if len(servicios) > 1:
+            errores.append(f"Fila {fila}: Se encontró más de un servicio con el Nro Cliente '{nro_cli}'. Use una carga manual para este caso.")
+            continue
+
+        errores_fila = []
+        for col, nombre in columnas_fecha:
+            valores, invalidas = fechas[nombre]
+            if invalidas[index]:
+                texto = str(df.at[index, col]).strip()
+                errores_fila.append(f"Fila {fila}: Formato de fecha '{texto}' inválido en '{nombre}'. Use DD/MM/YYYY o DD-MM-YYYY.")
+            elif valores[index] is None:
+                errores_fila.append(f"Fila {fila}: La '{nombre}' es obligatoria.")
+        if errores_fila:
+            errores.extend(errores_fila)
+            continue
+
+        if montos_invalidos[index]:
+            errores.append(f"Fila {fila}: Los montos deben ser valores numéricos enteros.")
+            continue
+
+        srv = servicios[0]
+        pagos.append(RegistroPago(
+            servicio=srv,
+            establecimiento=srv.establecimiento,
+            fecha_emision=fechas['Fecha Emision'][0][index],
+            fecha_vencimiento=fechas['Fecha Vencimiento'][0][index],
+            fecha_pago=fechas['Fecha Pago'][0][index],
+            nro_documento=nro_documento[index],
+            monto_interes=0 if interes_vacio[index] else monto_interes[index],
+            monto_total=monto_total[index],
+        ))
+
+    return pagos, errores
+
+
+def filas_reporte_consumos(queryset, chunk_size=2000):
+    """
+    Genera las filas del reporte de consumos leyendo el queryset por bloques
+    con `values_list`, sin instanciar modelos ni seguir relaciones por fila.
+    """
+    campos = (
+        'fecha_pago', 'establecimiento__nombre', 'establecimiento__rbd',
+        'servicio__proveedor__nombre', 'servicio__numero_cliente', 'nro_documento',
+        'monto_total', 'monto_interes', 'recepcion_conforme_id', 'recepcion_conforme__folio',
+    )
+    for row in queryset.values_list(*campos).iterator(chunk_size=chunk_size):
+        *datos, rc_id, folio = row
+        yield datos + ['SÍ' if rc_id else 'NO', folio if rc_id else '-']
+
+
+def generar_xlsx(filas, columnas, hoja):
+    """
+    Escribe las filas en un libro openpyxl en modo write-only y lo deja en un
+    archivo temporal listo para enviarse por partes (memoria constante).
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    ws.append(columnas)
+    for fila in filas:
+        ws.append(fila)
+
+    archivo = tempfile.TemporaryFile()
+    wb.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+class _Eco:
+    """Pseudo-buffer para csv.writer: devuelve lo escrito en vez de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(filas, columnas):
+    """Genera un CSV (separado por ';', con BOM para Excel) línea por línea."""
+    writer = csv.writer(_Eco(), delimiter=';')
+    yield '\ufeff' + writer.writerow(columnas)
+    for fila in filas:
+        yield writer.writerow(fila)
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import RegistroPago, RecepcionConforme, FacturaAdquisicion
+from . import pdf_cache
+
+# Los PDFs en caché se identifican por la huella de su contenido, por lo que un
+# cambio nunca entrega un archivo obsoleto; estas señales solo liberan el disco
+# en cuanto el documento cambia.
+
+@receiver([post_save, post_delete], sender=RecepcionConforme)
+def invalidar_pdf_recepcion(sender, instance, **kwargs):
+    pdf_cache.invalidar(pdf_cache.TIPO_RECEPCION_CONFORME, instance.pk)
+
+@receiver([post_save, post_delete], sender=RegistroPago)
+def invalidar_pdf_registro_pago(sender, instance, **kwargs):
+    pdf_cache.invalidar(pdf_cache.TIPO_REGISTRO_PAGO, instance.pk)
+    if instance.recepcion_conforme_id:
+        pdf_cache.invalidar(pdf_cache.TIPO_RECEPCION_CONFORME, instance.recepcion_conforme_id)
+
+@receiver([post_save, post_delete], sender=FacturaAdquisicion)
+def invalidar_pdf_factura(sender, instance, **kwargs):
+    pdf_cache.invalidar(pdf_cache.TIPO_FACTURA_ADQUISICION, instance.pk)
+
+@receiver(m2m_changed, sender=FacturaAdquisicion.establecimientos.through)
+def invalidar_pdf_factura_establecimientos(sender, instance, action, **kwargs):
+    if action in ["post_add", "post_remove", "post_clear"]:
+        pdf_cache.invalidar(pdf_cache.TIPO_FACTURA_ADQUISICION, instance.pk)
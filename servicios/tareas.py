@@ -0,0 +1,25 @@
+import logging
+
+from core.cola import tarea
+from .lotes import generar, limpiar
+from .models import LotePDF
+
+logger = logging.getLogger('tareas')
+
+
+@tarea('servicios.lote_pdf_rc', max_intentos=2)
+def generar_lote_pdf_rc(lote_id):
+    """Genera el ZIP / PDF unido de un LotePDF de Recepciones Conformes."""
+    lote = LotePDF.objects.filter(pk=lote_id).first()
+    if lote is None:
+        logger.warning("Lote PDF #%s ya no existe", lote_id)
+        return
+    generar(lote)
+
+
+@tarea('servicios.limpiar_lotes_pdf', cada=6 * 3600, max_intentos=1)
+def limpiar_lotes_pdf():
+    """Borra los lotes de PDFs vencidos y sus archivos."""
+    eliminados = limpiar()
+    if eliminados:
+        logger.info("Lotes PDF vencidos eliminados: %s", eliminados)
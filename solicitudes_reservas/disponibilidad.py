@@ -0,0 +1,228 @@
+"""
+Motor de disponibilidad de los recursos reservables.
+
+La misma ocupación (Ocupacion) sirve para validar una solicitud y para
+buscar el próximo horario libre de un recurso:
+
+  - Reservas APROBADAS que se cruzan con el intervalo consultado.
+  - Bloqueos que aplican en alguna fecha del intervalo. La lógica de modos
+    de BloqueoHorario.aplica_en_fecha se expresa como un predicado SQL
+    (q_bloqueo_aplica), así los bloqueos DIA/RANGO ya vencidos no se leen
+    aunque se acumulen en la tabla.
+
+Ambas se cargan con una consulta cada una y luego se recorren en memoria.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import BloqueoHorario, ReservaSetting, SolicitudReserva
+
+# Jornada por defecto si no hay ReservaSetting
+HORA_INICIO_DEFECTO = time(7, 0)
+HORA_FIN_DEFECTO = time(17, 30)
+
+
+def cargar_ajustes(request=None):
+    """ReservaSetting vigente, consultado una sola vez por request."""
+    if request is not None and hasattr(request, '_ajustes_reserva'):
+        return request._ajustes_reserva
+    ajustes = ReservaSetting.objects.first()
+    if request is not None:
+        request._ajustes_reserva = ajustes
+    return ajustes
+
+
+def jornada(ajustes):
+    """(hora_inicio, hora_fin) de la jornada reservable."""
+    if ajustes is None:
+        return HORA_INICIO_DEFECTO, HORA_FIN_DEFECTO
+    return ajustes.hora_inicio, ajustes.hora_fin
+
+
+def puede_saltar_antelacion(user):
+    return bool(user and user.is_authenticated and (
+        user.is_superuser or user.has_perm('solicitudes_reservas.can_bypass_antelacion')
+    ))
+
+
+def dias_antelacion(recurso, user):
+    """Días de antelación exigidos a `user` para reservar `recurso`."""
+    if not recurso or puede_saltar_antelacion(user):
+        return 0
+    return recurso.dias_antelacion
+
+
+def q_bloqueo_aplica(desde, hasta=None):
+    """
+    Predicado de BloqueoHorario.aplica_en_fecha para alguna fecha de
+    [desde, hasta]: DIA en el rango, RANGO que se cruza (sin fecha_fin
+    vale solo su día de inicio) o INDEFINIDO ya iniciado.
+    """
+    hasta = hasta or desde
+    return Q(fecha_inicio__lte=hasta) & (
+        Q(modo='DIA', fecha_inicio__gte=desde)
+        | Q(modo='RANGO', fin_efectivo__gte=desde)
+        | Q(modo='INDEFINIDO')
+    )
+
+
+def bloqueos_en_fechas(recurso, desde, hasta=None):
+    """Bloqueos del recurso que aplican en alguna fecha de [desde, hasta]."""
+    return (
+        BloqueoHorario.objects
+        .filter(recurso=recurso)
+        .annotate(fin_efectivo=Coalesce('fecha_fin', 'fecha_inicio'))
+        .filter(q_bloqueo_aplica(desde, hasta))
+    )
+
+
+def _local(momento):
+    return timezone.localtime(momento) if timezone.is_aware(momento) else timezone.make_aware(momento)
+
+
+def _en_fecha(fecha, hora):
+    return timezone.make_aware(datetime.combine(fecha, hora))
+
+
+def _tramos_por_dia(inicio, fin):
+    """(fecha, hora_desde, hora_hasta) de cada día que toca [inicio, fin)."""
+    fecha = inicio.date()
+    tramos = []
+    while fecha <= fin.date():
+        desde = inicio.time() if fecha == inicio.date() else time.min
+        hasta = fin.time() if fecha == fin.date() else time.max
+        if hasta > desde:
+            tramos.append((fecha, desde, hasta))
+        fecha += timedelta(days=1)
+    return tramos
+
+
+def _redondear(momento, paso):
+    """Primer múltiplo de `paso` minutos (desde medianoche) en o después de `momento`."""
+    minutos = momento.hour * 60 + momento.minute + (1 if momento.second or momento.microsecond else 0)
+    resto = minutos % paso
+    base = momento.replace(hour=0, minute=0, second=0, microsecond=0)
+    return base + timedelta(minutes=minutos + (paso - resto if resto else 0))
+
+
+class Ocupacion:
+    """
+    Reservas aprobadas y bloqueos de un recurso entre `inicio` y `fin`
+    (datetimes con zona), cargados una vez. `excluir` es la solicitud en
+    edición, que no choca consigo misma.
+    """
+
+    def __init__(self, recurso, inicio, fin, excluir=None):
+        self.recurso = recurso
+        self.inicio = _local(inicio)
+        self.fin = _local(fin)
+        reservas = SolicitudReserva.objects.filter(
+            recurso=recurso,
+            estado='APROBADA',
+            fecha_inicio__lt=fin,
+            fecha_fin__gt=inicio,
+        ).order_by('fecha_inicio').only('id', 'titulo', 'fecha_inicio', 'fecha_fin')
+        if excluir is not None:
+            reservas = reservas.exclude(pk=excluir.pk)
+        self.reservas = list(reservas)
+
+        bloqueos = bloqueos_en_fechas(recurso, self.inicio.date(), self.fin.date())
+        if self.inicio.date() == self.fin.date():
+            bloqueos = bloqueos.filter(hora_inicio__lt=self.fin.time(), hora_fin__gt=self.inicio.time())
+        self.bloqueos = list(bloqueos.order_by('hora_inicio'))
+
+    def ocupados(self, fecha):
+        """Intervalos ocupados de `fecha`, ordenados, como datetimes locales."""
+        dia_inicio = _en_fecha(fecha, time.min)
+        dia_fin = dia_inicio + timedelta(days=1)
+        intervalos = []
+        for reserva in self.reservas:
+            desde, hasta = _local(reserva.fecha_inicio), _local(reserva.fecha_fin)
+            if desde < dia_fin and hasta > dia_inicio:
+                intervalos.append((max(desde, dia_inicio), min(hasta, dia_fin)))
+        for bloqueo in self.bloqueos:
+            if bloqueo.aplica_en_fecha(fecha):
+                intervalos.append((_en_fecha(fecha, bloqueo.hora_inicio), _en_fecha(fecha, bloqueo.hora_fin)))
+        return sorted(intervalos)
+
+    def conflictos(self, fi, ff):
+        """Todas las reservas aprobadas y bloqueos que impiden reservar [fi, ff)."""
+        fi, ff = _local(fi), _local(ff)
+        varios_dias = fi.date() != ff.date()
+        conflictos = []
+        for reserva in self.reservas:
+            desde, hasta = _local(reserva.fecha_inicio), _local(reserva.fecha_fin)
+            if desde < ff and hasta > fi:
+                conflictos.append({
+                    'tipo': 'reserva',
+                    'id': reserva.id,
+                    'titulo': reserva.titulo,
+                    'inicio': desde.isoformat(),
+                    'fin': hasta.isoformat(),
+                    'mensaje': f'El recurso ya tiene una reserva APROBADA para ese horario '
+                               f'({desde.strftime("%H:%M")} - {hasta.strftime("%H:%M")}).',
+                })
+        for fecha, hi, hf in _tramos_por_dia(fi, ff):
+            for bloqueo in self.bloqueos:
+                if not (bloqueo.hora_inicio < hf and bloqueo.hora_fin > hi and bloqueo.aplica_en_fecha(fecha)):
+                    continue
+                motivo = f' Motivo: {bloqueo.motivo}' if bloqueo.motivo else ''
+                el_dia = f' el {fecha.strftime("%d/%m/%Y")}' if varios_dias else ''
+                conflictos.append({
+                    'tipo': 'bloqueo',
+                    'id': bloqueo.id,
+                    'fecha': fecha.isoformat(),
+                    'inicio': _en_fecha(fecha, bloqueo.hora_inicio).isoformat(),
+                    'fin': _en_fecha(fecha, bloqueo.hora_fin).isoformat(),
+                    'motivo': bloqueo.motivo,
+                    'mensaje': f'El recurso tiene un horario bloqueado de {bloqueo.hora_inicio.strftime("%H:%M")} '
+                               f'a {bloqueo.hora_fin.strftime("%H:%M")}{el_dia}.{motivo}',
+                })
+        return conflictos
+
+    def proximo_libre(self, duracion, hora_inicio, hora_fin, paso=30):
+        """
+        Primer [inicio, fin) de `duracion` libre dentro de la jornada
+        (hora_inicio-hora_fin) entre self.inicio y self.fin, con inicio
+        alineado a `paso` minutos. None si no hay.
+        """
+        fecha = self.inicio.date()
+        while fecha <= self.fin.date():
+            ventana_fin = min(_en_fecha(fecha, hora_fin), self.fin)
+            cursor = _redondear(max(_en_fecha(fecha, hora_inicio), self.inicio), paso)
+            for desde, hasta in self.ocupados(fecha):
+                if cursor + duracion <= min(desde, ventana_fin):
+                    return cursor, cursor + duracion
+                if hasta > cursor:
+                    cursor = _redondear(hasta, paso)
+            if cursor + duracion <= ventana_fin:
+                return cursor, cursor + duracion
+            fecha += timedelta(days=1)
+        return None
+
+
+def inicio_minimo(recurso, user, paso=30):
+    """Primer instante que `user` puede reservar en `recurso` según la antelación exigida."""
+    ahora = timezone.localtime()
+    dias = dias_antelacion(recurso, user)
+    if dias:
+        return _en_fecha(ahora.date() + timedelta(days=dias + 1), time.min)
+    return _redondear(ahora, paso)
+
+
+def proximo_horario_libre(recurso, duracion, desde=None, dias=14, paso=30, user=None, request=None):
+    """
+    Próximo horario libre de `duracion` (timedelta) para `recurso` desde
+    `desde` (o lo antes que permita la antelación), buscando `dias` días.
+    Devuelve (inicio, fin) o None.
+    """
+    hora_inicio, hora_fin = jornada(cargar_ajustes(request))
+    minimo = inicio_minimo(recurso, user, paso)
+    desde = max(_local(desde), minimo) if desde else minimo
+    hasta = _en_fecha(desde.date() + timedelta(days=max(dias, 1) - 1), hora_fin)
+    if hasta <= desde:
+        return None
+    return Ocupacion(recurso, desde, hasta).proximo_libre(duracion, hora_inicio, hora_fin, paso)
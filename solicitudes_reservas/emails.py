@@ -5,6 +5,7 @@ import json
 import os
 from datetime import date
 import django.utils.timezone
+from core.cola import encolar, tarea
 
 # ── Contador diario de correos ────────────────────────────────────────────────
 _COUNTER_FILE = os.path.join(os.path.dirname(__file__), '.email_counter.json')
@@ -48,41 +49,44 @@ def _log_event(msg):
     except:
         pass
 
+@tarea('reservas.enviar_correo', max_intentos=4)
+def _enviar_correo(to_list, subject, html_body):
+    """Envía un correo (tarea de la cola) respetando el límite diario."""
+    daily_limit = getattr(settings, 'EMAIL_DAILY_LIMIT', 200)
+    with _counter_lock:
+        current = _get_daily_count()
+    if current >= daily_limit:
+        _log_event(f"[BLOQUEADO] Límite diario ({daily_limit}) alcanzado. No se envió: {subject}")
+        return
+
+    _log_event(f"[INTENTO] ({current + 1}/{daily_limit}) → {to_list} | {subject}")
+
+    try:
+        send_mail(
+            subject=subject,
+            message='',
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[r for r in to_list if r],
+            html_message=html_body,
+            fail_silently=False,
+        )
+    except Exception as e:
+        _log_event(f"[ERROR] Falló envío a {to_list}: {str(e)}")
+        print(f"[EMAIL ERROR] {e}")
+        raise  # la cola lo reintenta con backoff
+
+    # Solo los envíos exitosos consumen cupo: los reintentos no lo gastan de nuevo
+    with _counter_lock:
+        _increment_daily_count()
+    _log_event(f"[SUCCESS] Enviado a {to_list}")
+    print(f"[EMAIL OK] {to_list} | {subject}")
+
 def _safe_email(to_list, subject, html_body):
-    """Envía el correo de forma asíncrona (threading) y registra el resultado en un log."""
+    """Encola el correo en la cola de tareas (core/cola.py) y registra el resultado en un log."""
     if not to_list or not any(to_list):
         _log_event(f"[SKIP] No hay destinatarios para: {subject}")
         return
-
-    daily_limit = getattr(settings, 'EMAIL_DAILY_LIMIT', 200)
-
-    def _send():
-        with _counter_lock:
-            current = _get_daily_count()
-            if current >= daily_limit:
-                _log_event(f"[BLOQUEADO] Límite diario ({daily_limit}) alcanzado. No se envió: {subject}")
-                return
-            new_count = _increment_daily_count()
-
-        _log_event(f"[INTENTO] ({new_count}/{daily_limit}) → {to_list} | {subject}")
-        
-        try:
-            from django.core.mail import send_mail
-            send_mail(
-                subject=subject,
-                message='',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[r for r in to_list if r],
-                html_message=html_body,
-                fail_silently=False,
-            )
-            _log_event(f"[SUCCESS] Enviado a {to_list}")
-            print(f"[EMAIL OK] {to_list} | {subject}")
-        except Exception as e:
-            _log_event(f"[ERROR] Falló envío a {to_list}: {str(e)}")
-            print(f"[EMAIL ERROR] {e}")
-
-    threading.Thread(target=_send, daemon=True).start()
+    encolar('reservas.enviar_correo', to_list=list(to_list), subject=subject, html_body=html_body)
 
 
 def _base_template(titulo, color_titulo, contenido_html):
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 03:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('solicitudes_reservas', '0015_alter_solicitudreserva_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bloqueohorario',
+            index=models.Index(fields=['recurso', 'fecha_inicio'], name='bloqueo_recurso_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudreserva',
+            index=models.Index(fields=['recurso', 'estado', 'fecha_inicio'], name='reserva_recurso_estado_idx'),
+        ),
+    ]
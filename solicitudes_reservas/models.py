@@ -55,6 +55,10 @@ class BloqueoHorario(models.Model):
 
     class Meta:
         ordering = ['fecha_inicio', 'hora_inicio']
+        indexes = [
+            # disponibilidad.bloqueos_en_fechas: recurso + fecha_inicio <= fecha consultada
+            models.Index(fields=['recurso', 'fecha_inicio'], name='bloqueo_recurso_fecha_idx'),
+        ]
 
     def aplica_en_fecha(self, fecha):
         """Retorna True si este bloqueo aplica en la fecha dada."""
@@ -135,6 +139,10 @@ class SolicitudReserva(models.Model):
 
     class Meta:
         ordering = ['-fecha_inicio']
+        indexes = [
+            # Choques con reservas aprobadas (disponibilidad.Ocupacion)
+            models.Index(fields=['recurso', 'estado', 'fecha_inicio'], name='reserva_recurso_estado_idx'),
+        ]
         permissions = [
             ("can_change_reserva_name", "Puede cambiar el nombre de la reserva"),
             ("can_bypass_antelacion", "Puede saltar bloqueo de antelación"),
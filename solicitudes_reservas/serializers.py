@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import RecursoReservable, SolicitudReserva, BloqueoHorario, ReservaSetting
-from datetime import time, timedelta
+from .disponibilidad import Ocupacion, cargar_ajustes, dias_antelacion, jornada
+from datetime import timedelta
 from django.utils import timezone
 
 class RecursoReservableSerializer(serializers.ModelSerializer):
@@ -37,22 +38,20 @@ class SolicitudReservaSerializer(serializers.ModelSerializer):
     def validate(self, data):
         fi = data.get('fecha_inicio')
         ff = data.get('fecha_fin')
-        recurso = data.get('recurso')
+        # En ediciones parciales (public_manage) el recurso es el de la solicitud
+        recurso = data.get('recurso', getattr(self.instance, 'recurso', None))
 
         if fi and ff and ff <= fi:
             raise serializers.ValidationError({'fecha_fin': 'La hora de término debe ser posterior a la de inicio.'})
 
         # ─ Validación: bloqueo por antelación configurada ─
-        setting = ReservaSetting.objects.first()
+        request = self.context.get('request')
+        ajustes = cargar_ajustes(request)
         now = timezone.now()
-        user = self.context['request'].user
         
         if fi:
-            # Si el usuario tiene el permiso especial o es superusuario, saltamos la antelación
-            can_bypass = user.is_superuser or user.has_perm('solicitudes_reservas.can_bypass_antelacion')
-            
-            # Calculamos la fecha límite: Hoy + X días del recurso específico
-            x_dias = recurso.dias_antelacion if recurso and not can_bypass else 0
+            # Días del recurso específico; 0 si el usuario tiene el permiso especial o es superusuario
+            x_dias = dias_antelacion(recurso, getattr(request, 'user', None))
             fecha_limite = now.date() + timedelta(days=x_dias)
             
             if fi.date() <= fecha_limite:
@@ -69,8 +68,7 @@ class SolicitudReservaSerializer(serializers.ModelSerializer):
                     })
 
         # ─ Validación: hora de fin contra configuración global ─
-        setting = ReservaSetting.objects.first()
-        h_fin_limite = setting.hora_fin if setting else time(17, 30)
+        _, h_fin_limite = jornada(ajustes)
         
         if ff and ff.time() > h_fin_limite:
             raise serializers.ValidationError(
@@ -78,37 +76,13 @@ class SolicitudReservaSerializer(serializers.ModelSerializer):
             )
 
         if fi and ff and recurso:
-            # ─ Validar contra reservas aprobadas ─
-            qs = SolicitudReserva.objects.filter(
-                recurso=recurso,
-                estado='APROBADA',
-                fecha_inicio__lt=ff,
-                fecha_fin__gt=fi,
-            )
-            if self.instance:
-                qs = qs.exclude(pk=self.instance.pk)
-            if qs.exists():
-                c = qs.first()
-                raise serializers.ValidationError(
-                    f'El recurso ya tiene una reserva APROBADA para ese horario ({c.fecha_inicio.strftime("%H:%M")} - {c.fecha_fin.strftime("%H:%M")}).'
-                )
-
-            # ─ Validar contra bloqueos manuales ─
-            fecha = fi.date()
-            hi = fi.time()
-            hf = ff.time()
-            # Traer todos los bloqueos del recurso con solapamiento de HORA y verificar por modo
-            candidatos = BloqueoHorario.objects.filter(
-                recurso=recurso,
-                hora_inicio__lt=hf,
-                hora_fin__gt=hi,
-            )
-            bloqueo = next((b for b in candidatos if b.aplica_en_fecha(fecha)), None)
-            if bloqueo:
-                motivo = f' Motivo: {bloqueo.motivo}' if bloqueo.motivo else ''
-                raise serializers.ValidationError(
-                    f'El recurso tiene un horario bloqueado de {bloqueo.hora_inicio.strftime("%H:%M")} a {bloqueo.hora_fin.strftime("%H:%M")}.{motivo}'
-                )
+            # ─ Validar contra reservas aprobadas y bloqueos: se informan todos los choques ─
+            conflictos = Ocupacion(recurso, fi, ff, excluir=self.instance).conflictos(fi, ff)
+            if conflictos:
+                raise serializers.ValidationError({
+                    'non_field_errors': [c['mensaje'] for c in conflictos],
+                    'conflictos': conflictos,
+                })
 
         return data
 
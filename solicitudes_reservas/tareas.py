@@ -0,0 +1 @@
+from solicitudes_reservas import emails  # noqa: F401  registra reservas.enviar_correo
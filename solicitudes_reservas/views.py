@@ -10,12 +10,15 @@ from .serializers import (
     BloqueoHorarioSerializer,
     ReservaSettingSerializer,
 )
+from .disponibilidad import proximo_horario_libre
 from .emails import (
     enviar_correo_nueva_solicitud,
     enviar_correo_aprobacion,
     enviar_correo_rechazo,
 )
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
 
 
 class RecursoReservableViewSet(viewsets.ModelViewSet):
@@ -24,8 +27,8 @@ class RecursoReservableViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
     def get_permissions(self):
-        """Lectura: cualquier usuario. Escritura: solo staff."""
-        if self.action in ('list', 'retrieve'):
+        """Lectura (y próximo horario libre): cualquier usuario. Escritura: solo staff."""
+        if self.action in ('list', 'retrieve', 'proximo_libre'):
             return [permissions.AllowAny()]
         return [permissions.IsAuthenticated(), permissions.IsAdminUser()]
 
@@ -34,6 +37,47 @@ class RecursoReservableViewSet(viewsets.ModelViewSet):
             return RecursoReservable.objects.all()
         return RecursoReservable.objects.filter(activo=True)
 
+    # ─── Acción: Próximo horario libre ────────────────────────────────────────
+    @action(detail=True, methods=['get'])
+    def proximo_libre(self, request, pk=None):
+        """
+        Primer horario libre del recurso: ?duracion= (minutos, 60), ?desde=
+        (fecha o fecha-hora ISO; por defecto lo antes que permita la
+        antelación), ?dias= (días a revisar, 14) y ?paso= (minutos, 30).
+        """
+        recurso = self.get_object()
+        try:
+            duracion = int(request.query_params.get('duracion', 60))
+            dias = int(request.query_params.get('dias', 14))
+            paso = int(request.query_params.get('paso', 30))
+        except ValueError:
+            return Response({"detail": "duracion, dias y paso deben ser números enteros."}, status=400)
+        if not (1 <= duracion <= 24 * 60 and 1 <= dias <= 90 and 1 <= paso <= 240):
+            return Response({"detail": "Parámetros fuera de rango (duracion 1-1440, dias 1-90, paso 1-240)."}, status=400)
+
+        desde = None
+        if request.query_params.get('desde'):
+            try:
+                desde = parse_datetime(request.query_params['desde'])
+                if desde is None:
+                    fecha = parse_date(request.query_params['desde'])
+                    desde = datetime.combine(fecha, time.min) if fecha else None
+            except ValueError:
+                desde = None
+            if desde is None:
+                return Response({"detail": "desde debe ser una fecha (YYYY-MM-DD) o fecha-hora ISO."}, status=400)
+
+        libre = proximo_horario_libre(
+            recurso, timedelta(minutes=duracion), desde=desde, dias=dias, paso=paso,
+            user=request.user, request=request,
+        )
+        return Response({
+            'recurso': recurso.id,
+            'duracion': duracion,
+            'inicio': libre[0].isoformat() if libre else None,
+            'fin': libre[1].isoformat() if libre else None,
+        })
+
 
 class SolicitudReservaViewSet(viewsets.ModelViewSet):
     queryset = SolicitudReserva.objects.all()
@@ -152,7 +196,7 @@ class SolicitudReservaViewSet(viewsets.ModelViewSet):
             
         elif accion == 'UPDATE':
             # Aplicar cambios y resetear estado a PENDIENTE
-            serializer = SolicitudReservaSerializer(solicitud, data=request.data, partial=True)
+            serializer = SolicitudReservaSerializer(solicitud, data=request.data, partial=True, context={'request': request})
             if serializer.is_valid():
                 # Forzar estado a PENDIENTE si se edita (como requiere el usuario)
                 instance = serializer.save(estado='PENDIENTE', aprobado_por=None, fecha_aprobacion=None)